@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the time per simulated year of
+:meth:`biosim.simulation.BioSim.simulate` when every year is drawn and saved,
+with the graphics rendered by the simulation itself and by the rendering
+process of :mod:`biosim.rendering`.
+
+With the rendering process, the time per year approaches the larger of the
+simulation and the rendering time instead of their sum, given at least two
+cores. On a single core, the two modes take about the same time.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import os
+import tempfile
+import time
+
+from biosim.simulation import BioSim
+
+ISLAND_MAP = """\
+OOOOOOOOOOOOOOOOOOOOO
+OOOOOOOOSMMMMJJJJJJJO
+OSSSSSJJJJMMJJJJJJJOO
+OSSSSSSSSSMMJJJJJJOOO
+OSSSSSJJJJJJJJJJJJOOO
+OSSSSSJJJDDJJJSJJJOOO
+OSSJJJJJDDDJJJSSSSOOO
+OOSSSSJJJDDJJJSOOOOOO
+OSSSJJJJJDDJJJJJJJJOO
+OSSSSJJJJDDJJJJOOOOOO
+OOSSSSJJJJJJJJOOOOOOO
+OOOSSSSJJJJJJJOOOOOOO
+OOOOOOOOOOOOOOOOOOOOO"""
+
+
+def time_per_year(years, background_graphics, engine="object"):
+    """
+    Measures the average time of one simulated year, saving a frame every
+    year.
+
+    :param years: int, number of years to simulate.
+    :param background_graphics: bool, passed on to BioSim.
+    :param engine: str, passed on to BioSim.
+    :return: float, seconds per year.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        sim = BioSim(ISLAND_MAP, [
+            {"loc": (10, 10), "pop": [
+                {"species": "Herbivore", "age": 5, "weight": 20}
+                for _ in range(150)]},
+            {"loc": (10, 10), "pop": [
+                {"species": "Carnivore", "age": 5, "weight": 20}
+                for _ in range(40)]}], seed=1, engine=engine,
+            img_base=os.path.join(directory, "sim"),
+            background_graphics=background_graphics)
+        start = time.perf_counter()
+        sim.simulate(years, vis_years=1)
+        elapsed = time.perf_counter() - start
+        sim.make_movie("none")
+    return elapsed / years
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    print("{} cores".format(os.cpu_count()))
+    print("{:>26} {:>14}".format("mode", "ms per year"))
+    for name, background in (("inline", False), ("background", True)):
+        print("{:>26} {:>14.2f}".format(
+            name, 1e3 * time_per_year(60, background)))
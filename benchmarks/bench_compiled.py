@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of one simulated year with the 'object', 'array' and 'numba'
+engines of :class:`biosim.simulation.BioSim`, for 1 000, 10 000 and 100 000
+animals spread evenly over a 22x22 island, four herbivores for every
+carnivore.
+
+The first year of the compiled island is simulated before timing, so that the
+time to compile the kernels is not included. Without numba, the 'numba'
+column shows the kernels run as ordinary Python functions.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import random
+import time
+
+import biosim.compiled as bc
+import biosim.island as bi
+from bench_map_size import square_map
+
+MAP_SIZE = 22
+
+
+def populated(island, n_animals):
+    """
+    Spreads the animals evenly over the Jungle cells of the island.
+
+    :param island: Island.
+    :param n_animals: int, total number of animals.
+    :return: Island.
+    """
+    cells = [(row, col) for row in range(1, MAP_SIZE - 1)
+             for col in range(1, MAP_SIZE - 1)]
+    per_cell = n_animals // len(cells)
+    island.populate_the_island([{"loc": cell, "pop": [
+        {"species": "Herbivore" if i % 5 else "Carnivore", "age": 5,
+         "weight": 20} for i in range(per_cell)]} for cell in cells])
+    return island
+
+
+def time_per_year(island, years=2):
+    """
+    Measures the average time of one annual cycle, after a first year that
+    is not timed.
+
+    :param island: Island.
+    :param years: int, number of years to time.
+    :return: float, seconds per year.
+    """
+    island.annual_cycle()
+    start = time.perf_counter()
+    for _ in range(years):
+        island.annual_cycle()
+    return (time.perf_counter() - start) / years
+
+
+if __name__ == "__main__":
+    random.seed(1)
+    print("numba installed: {}".format(bc.NUMBA_AVAILABLE))
+    print("{:>10} {:>12} {:>12} {:>12} {:>10}".format(
+        "animals", "object ms", "array ms", "numba ms", "speed-up"))
+    for animals in (1000, 10000, 100000):
+        islands = (bi.Island(square_map(MAP_SIZE)),
+                   bi.ArrayIsland(square_map(MAP_SIZE), seed=1),
+                   bc.CompiledIsland(square_map(MAP_SIZE), seed=1))
+        seconds = [time_per_year(populated(island, animals))
+                   for island in islands]
+        print("{:>10} {:>12.1f} {:>12.1f} {:>12.1f} {:>10.1f}".format(
+            animals, *(1e3 * s for s in seconds), seconds[1] / seconds[2]))
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the time per simulated year of
+:meth:`biosim.simulation.BioSim.simulate` on the standard map, without
+history, and with the history written to ``.npz`` shards by
+:class:`biosim.export.NpzSink`, with and without the animals. The time of
+closing the sink, i.e. of writing the last shards, is given separately.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import tempfile
+import time
+
+import biosim.export as be
+import biosim.island as bi
+from biosim.simulation import BioSim
+
+
+def time_per_year(years, animals=None):
+    """
+    Measures the average time of one simulated year.
+
+    :param years: int, number of years to simulate.
+    :param animals: bool, passed on to the sink, or None for no history.
+    :return: tuple, seconds per year and seconds to close the sink.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        sink = None
+        if animals is not None:
+            sink = be.NpzSink(directory, chunk_years=50, animals=animals)
+        sim = BioSim(bi.Island.STANDARD_MAP.replace(" ", ""), [
+            {"loc": (6, 10), "pop": [
+                {"species": "Herbivore", "age": 5, "weight": 20}
+                for _ in range(500)] + [
+                {"species": "Carnivore", "age": 5, "weight": 20}
+                for _ in range(50)]}], seed=1, engine="array",
+            history=sink)
+        start = time.perf_counter()
+        sim.simulate(years, vis_years=0)
+        elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        if sink is not None:
+            sink.close()
+        return elapsed / years, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    print("{:>20} {:>14} {:>14}".format("history", "ms per year",
+                                        "ms to close"))
+    for name, animals in (("none", None), ("grids", False),
+                          ("grids and animals", True)):
+        per_year, closing = time_per_year(400, animals)
+        print("{:>20} {:>14.3f} {:>14.1f}".format(name, 1e3 * per_year,
+                                                  1e3 * closing))
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the time per simulated year of
+:meth:`biosim.simulation.BioSim.simulate` with and without graphics, on a
+small island where the simulation itself is cheap, so that the overhead of
+rendering dominates.
+
+Before rendering followed vis_years, every simulated year was rendered, as
+with vis_years=1. The Agg backend is used unless MPLBACKEND is set.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import os
+import time
+
+from biosim.simulation import BioSim
+
+ISLAND_MAP = """\
+OOOOOOOOOO
+OJJJJSSSSO
+OJJJJSSSSO
+OJJDDDDSSO
+OOOOOOOOOO"""
+
+
+def time_per_year(years=50, graphics=True, vis_years=1):
+    """
+    Measures the average time of one simulated year.
+
+    :param years: int, number of years to simulate.
+    :param graphics: bool, passed on to BioSim.
+    :param vis_years: int, years between visualization updates.
+    :return: float, seconds per year.
+    """
+    sim = BioSim(ISLAND_MAP, [{"loc": (2, 2), "pop": [
+        {"species": "Herbivore", "age": 5, "weight": 20}
+        for _ in range(50)]}], seed=1, graphics=graphics)
+    start = time.perf_counter()
+    sim.simulate(years, vis_years=vis_years)
+    return (time.perf_counter() - start) / years
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    print("{:>26} {:>14}".format("mode", "ms per year"))
+    for name, options in (("graphics=False", dict(graphics=False)),
+                          ("vis_years=0", dict(vis_years=0)),
+                          ("vis_years=10", dict(vis_years=10)),
+                          ("vis_years=1", dict(vis_years=1))):
+        print("{:>26} {:>14.2f}".format(
+            name, 1e3 * time_per_year(**options)))
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the time it takes to import :mod:`biosim.simulation` in a new
+interpreter, as measured by ``python -X importtime``, which leaves out the
+start-up of the interpreter itself.
+
+The script exits with status 1 if the best of the measurements is above
+IMPORT_BUDGET, or if any of the modules in LAZY_MODULES is imported, so that
+it can be run as a check.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import subprocess
+import sys
+
+IMPORT_BUDGET = 0.25
+LAZY_MODULES = ("matplotlib", "pandas", "numba", "biosim.compiled",
+                "biosim.tiled")
+
+
+def import_time(module, repeats=5):
+    """
+    Measures the cumulative import time of a module, and finds the modules
+    it loads.
+
+    :param module: str, name of the module.
+    :param repeats: int, number of new interpreters.
+    :return: tuple, best time in seconds and set of loaded modules.
+    """
+    times = []
+    for _ in range(repeats):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c",
+             "import " + module], capture_output=True, text=True,
+            check=True)
+        loaded = {}
+        for line in result.stderr.splitlines()[1:]:
+            _, cumulative, name = line.split("|")
+            loaded[name.strip()] = int(cumulative) * 1e-6
+        times.append(loaded[module])
+    return min(times), set(loaded)
+
+
+if __name__ == "__main__":
+    seconds, modules = import_time("biosim.simulation")
+    print("import biosim.simulation: {:.0f} ms (budget {:.0f} ms)".format(
+        1e3 * seconds, 1e3 * IMPORT_BUDGET))
+    print("import numpy alone: {:.0f} ms".format(
+        1e3 * import_time("numpy")[0]))
+    eager = [name for name in LAZY_MODULES if name in modules]
+    if eager:
+        print("imported, but should be lazy: " + ", ".join(eager))
+    sys.exit(seconds > IMPORT_BUDGET or bool(eager))
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of how the cost of one simulated year scales with the size of the
+island map.
+
+The island is a square of Jungle surrounded by Ocean, with a small herbivore
+population in the middle, so that the cost is dominated by visiting the cells.
+With the cell positions and neighbours looked up in tables built by
+:class:`biosim.island.Island`, the time per cell should stay roughly constant
+as the map grows.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import random
+import time
+
+import biosim.island as bi
+
+
+def square_map(size):
+    """
+    Creates a map string with size x size cells, all Jungle except for the
+    Ocean edges.
+
+    :param size: int, number of rows and columns.
+    :return: str.
+    """
+    ocean = "O" * size
+    jungle = "O" + "J" * (size - 2) + "O"
+    return "\n".join([ocean] + [jungle] * (size - 2) + [ocean])
+
+
+def time_per_year(size, years=3):
+    """
+    Measures the average time of one annual cycle.
+
+    :param size: int, number of rows and columns of the map.
+    :param years: int, number of years to simulate.
+    :return: float, seconds per year.
+    """
+    random.seed(1)
+    island = bi.Island(square_map(size))
+    island.populate_the_island([{
+        "loc": (size // 2, size // 2),
+        "pop": [{"species": "Herbivore", "age": 5, "weight": 20}
+                for _ in range(50)]}])
+
+    start = time.perf_counter()
+    for _ in range(years):
+        island.annual_cycle()
+    return (time.perf_counter() - start) / years
+
+
+if __name__ == "__main__":
+    print("{:>10} {:>8} {:>14} {:>14}".format(
+        "map", "cells", "ms per year", "us per cell"))
+    for map_size in (10, 20, 40, 80, 160):
+        seconds = time_per_year(map_size)
+        print("{:>10} {:>8} {:>14.2f} {:>14.2f}".format(
+            "{0}x{0}".format(map_size), map_size ** 2, 1e3 * seconds,
+            1e6 * seconds / map_size ** 2))
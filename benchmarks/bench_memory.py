@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the memory used per animal object, measured with
+:mod:`tracemalloc`. The animals of :mod:`biosim.animals` store their
+attributes in slots. For comparison, the same attributes are stored in the
+``__dict__`` of a plain object, as the animals did before.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import gc
+import tracemalloc
+
+import biosim.animals as ba
+
+
+class DictAnimal:
+    """
+    An animal with the attributes of :class:`biosim.animals.Animal` in a
+    ``__dict__``.
+    """
+
+    def __init__(self, weight, age):
+        """
+        Sets the attributes in the same order as the constructor of Animal.
+
+        :param weight: float, weight of the animal.
+        :param age: int, age of the animal.
+        """
+        self._phi = None
+        self._recompute_phi = True
+        self._weight = weight
+        self._age = age
+
+
+def bytes_per_animal(create, n_animals):
+    """
+    Measures the memory allocated per animal while a list of animals is
+    created.
+
+    :param create: callable, creates one animal from a weight.
+    :param n_animals: int, number of animals.
+    :return: float, bytes per animal.
+    """
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    animals = [create(20.0 + index % 100) for index in range(n_animals)]
+    size = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del animals
+    return size / n_animals
+
+
+if __name__ == "__main__":
+    n_animals = 10 ** 5
+    herbivore = ba.Herbivore.bind()
+    print("{:>22} {:>16}".format("representation", "bytes per animal"))
+    for name, create in (
+            ("__dict__", lambda weight: DictAnimal(weight, 5)),
+            ("__slots__, Herbivore",
+             lambda weight: ba.Herbivore(weight=weight, age=5)),
+            ("__slots__, bound",
+             lambda weight: herbivore(weight=weight, age=5))):
+        size = bytes_per_animal(create, n_animals)
+        print("{:>22} {:>16.1f}".format(name, size))
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the migration phase, reported as migrations per second.
+
+The animals are spread evenly over a square Jungle island, and one migration
+phase is timed for each engine. The object engine is only run for the
+smaller populations, as creating a million animal objects takes long.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import time
+
+import numpy as np
+
+import biosim.island as bi
+from bench_map_size import square_map
+
+
+def populated_island(engine, n_animals, size=102):
+    """
+    Creates an island with n_animals herbivores spread evenly over its
+    habitable cells.
+
+    :param engine: class, Island or ArrayIsland.
+    :param n_animals: int, number of herbivores.
+    :param size: int, number of rows and columns of the map.
+    :return: island object.
+    """
+    island = engine(square_map(size), seed=1)
+    per_cell = n_animals // len(island.habitable_cells)
+    island.populate_the_island([
+        {"loc": divmod(index, size),
+         "pop": [{"species": "Herbivore", "age": 5, "weight": 30}] * per_cell}
+        for index in island.habitable_cells])
+    return island
+
+
+def object_migrations(island):
+    """
+    Times one migration phase of the object engine.
+
+    :param island: Island object.
+    :return: tuple, number of migrations and seconds.
+    """
+    cells = {id(animal): index for index, cell in enumerate(island.cells)
+             for animal in cell.animal_population[0]}
+    start = time.perf_counter()
+    island.migrate()
+    seconds = time.perf_counter() - start
+    moved = sum(cells[id(animal)] != index
+                for index, cell in enumerate(island.cells)
+                for animal in cell.animal_population[0])
+    return moved, seconds
+
+
+def array_migrations(island):
+    """
+    Times one migration phase of the array engine.
+
+    :param island: ArrayIsland object.
+    :return: tuple, number of migrations and seconds.
+    """
+    cells = island.herbivores.cell.copy()
+    start = time.perf_counter()
+    island.migrate()
+    seconds = time.perf_counter() - start
+    return np.count_nonzero(island.herbivores.cell != cells), seconds
+
+
+if __name__ == "__main__":
+    print("{:>8} {:>10} {:>12} {:>10} {:>16}".format(
+        "engine", "animals", "migrations", "ms", "migrations / s"))
+    for engine, timer, sizes in (
+            (bi.Island, object_migrations, (100000, 300000)),
+            (bi.ArrayIsland, array_migrations, (100000, 300000, 1000000))):
+        for n in sizes:
+            migrations, elapsed = timer(populated_island(engine, n))
+            print("{:>8} {:>10} {:>12} {:>10.1f} {:>16.3g}".format(
+                "object" if engine is bi.Island else "array", n,
+                migrations, 1e3 * elapsed, migrations / elapsed))
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the number of normal draws and the time of creating animals
+and of simulating years with the 'object' engine. Animals only draw their
+birth weight from the random module when created with age 0, while the
+newborn weights of the reproduction phase are drawn from the NumPy
+generator of the island, see :meth:`biosim.landscape.Landscape.reproduction`,
+so the draws of both are counted.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import random
+import timeit
+
+import numpy as np
+
+import biosim.animals as ba
+import biosim.island as bi
+from biosim.simulation import BioSim
+
+
+class DrawCounter:
+    """
+    Counts the calls of random.normalvariate while it is installed.
+    """
+
+    def __init__(self):
+        """
+        This method creates variables needed for the class.
+        """
+        self.calls = 0
+        self._normalvariate = random.normalvariate
+
+    def __call__(self, mu, sigma):
+        self.calls += 1
+        return self._normalvariate(mu, sigma)
+
+    def __enter__(self):
+        random.normalvariate = self
+        return self
+
+    def __exit__(self, *exc_info):
+        random.normalvariate = self._normalvariate
+
+
+class GeneratorCounter:
+    """
+    Counts the values drawn by the normal method of a NumPy generator, and
+    passes everything else on to the generator.
+    """
+
+    def __init__(self, rng):
+        """
+        This method creates variables needed for the class.
+
+        :param rng: numpy.random.Generator.
+        """
+        self.calls = 0
+        self._rng = rng
+
+    def normal(self, loc=0.0, scale=1.0, size=None):
+        self.calls += 1 if size is None else int(np.prod(size))
+        return self._rng.normal(loc, scale, size)
+
+    def __getattr__(self, name):
+        return getattr(self._rng, name)
+
+
+def create(n_animals, age):
+    """
+    Creates herbivores of the given age.
+
+    :param n_animals: int, number of animals.
+    :param age: int, age of the animals.
+    :return: list.
+    """
+    return [ba.Herbivore(weight=20, age=age) for _ in range(n_animals)]
+
+
+if __name__ == "__main__":
+    n_animals = 10 ** 5
+    print("{:>24} {:>14} {:>8}".format("work", "normal draws", "ms"))
+    for age in (0, 5):
+        with DrawCounter() as counter:
+            create(n_animals, age)
+        seconds = min(timeit.repeat(lambda: create(n_animals, age),
+                                    number=1, repeat=5))
+        print("{:>24} {:>14} {:>8.1f}".format(
+            "1e5 animals of age {}".format(age), counter.calls,
+            1e3 * seconds))
+
+    sim = BioSim(bi.Island.STANDARD_MAP.replace(" ", ""), [
+        {"loc": (6, 10), "pop": [
+            {"species": "Herbivore", "age": 5, "weight": 20}
+            for _ in range(2000)] + [
+            {"species": "Carnivore", "age": 5, "weight": 20}
+            for _ in range(200)]}], seed=1, engine="object")
+    generator = GeneratorCounter(sim.island.rng)
+    sim.island.rng = generator
+    animal_years = 0
+    with DrawCounter() as counter:
+        start = timeit.default_timer()
+        for _ in range(30):
+            animal_years += sim.num_animals
+            sim.simulate(1, vis_years=0)
+        seconds = timeit.default_timer() - start
+    print("{:>24} {:>14} {:>8.1f}".format(
+        "30 years, object engine", counter.calls + generator.calls,
+        1e3 * seconds))
+    print("{} animals at the start of the years, {} animals at the "
+          "end".format(animal_years, sim.num_animals))
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the time of reading the animal parameters, from the
+``default_parameters`` dict of a class and from an immutable parameter set,
+see :mod:`biosim.parameters`, and of the time of one year of the 'object'
+engine, where every animal reads its parameters several times.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import timeit
+
+import biosim.animals as ba
+import biosim.island as bi
+from biosim.simulation import BioSim
+
+
+def simulation():
+    """
+    Creates a simulation of the standard map, with animals spread over the
+    island by a few simulated years.
+
+    :return: BioSim.
+    """
+    sim = BioSim(bi.Island.STANDARD_MAP.replace(" ", ""), [
+        {"loc": (6, 10), "pop": [
+            {"species": "Herbivore", "age": 5, "weight": 20}
+            for _ in range(500)] + [
+            {"species": "Carnivore", "age": 5, "weight": 20}
+            for _ in range(50)]}], seed=1, engine="object")
+    sim.simulate(20, vis_years=0)
+    return sim
+
+
+if __name__ == "__main__":
+    herbivore = ba.Herbivore(age=5, weight=20)
+    for name, statement in (
+            ("dict", 'animal.default_parameters["phi_age"]'),
+            ("parameter set", "animal.parameters.phi_age")):
+        seconds = min(timeit.repeat(statement, globals={"animal": herbivore},
+                                    number=10 ** 6, repeat=5))
+        print("{:>14} {:8.1f} ns per read".format(name, 1e3 * seconds))
+
+    sim = simulation()
+    print("{} animals".format(sim.num_animals))
+    seconds = min(timeit.repeat(sim.island.annual_cycle, number=1, repeat=10))
+    print("annual cycle {:8.1f} ms".format(1e3 * seconds))
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the time of seeding the standard map with many animals, given
+as a list of dictionaries to
+:meth:`biosim.island.Island.populate_the_island`, and as columns to
+:meth:`biosim.island.Island.populate_from_arrays`. The animals are spread
+over all Jungle cells.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import time
+
+import numpy as np
+
+import biosim.island as bi
+
+
+def columns(island, n_animals):
+    """
+    Creates the columns of a population of herbivores and carnivores spread
+    over the Jungle cells of the island.
+
+    :param island: biosim.island.Island.
+    :param n_animals: int, number of animals.
+    :return: tuple, loc_row, loc_col, species, age and weight.
+    """
+    cell = np.resize(island.jungle_cells, n_animals)
+    row, col = np.divmod(cell, island.numpy_map.shape[1])
+    species = np.where(np.arange(n_animals) % 5 == 0, "Carnivore",
+                       "Herbivore")
+    return row, col, species, np.full(n_animals, 5), np.full(n_animals, 20.0)
+
+
+def dictionaries(row, col, species, age, weight):
+    """
+    Converts the columns to the list of dictionaries of the original
+    interface, with one entry per cell.
+
+    :return: list.
+    """
+    population = {}
+    for r, c, s, a, w in zip(row.tolist(), col.tolist(), species.tolist(),
+                             age.tolist(), weight.tolist()):
+        population.setdefault((r, c), []).append(
+            {"species": s, "age": a, "weight": w})
+    return [{"loc": loc, "pop": pop} for loc, pop in population.items()]
+
+
+def time_loading(island_class, n_animals):
+    """
+    Measures the time of seeding a new island in both ways.
+
+    :param island_class: class, biosim.island.Island or ArrayIsland.
+    :param n_animals: int, number of animals.
+    :return: tuple, seconds with dictionaries and with columns.
+    """
+    data = columns(island_class(), n_animals)
+    population = dictionaries(*data)
+    island = island_class()
+    start = time.perf_counter()
+    island.populate_the_island(population)
+    with_dictionaries = time.perf_counter() - start
+    island = island_class()
+    start = time.perf_counter()
+    island.populate_from_arrays(*data)
+    return with_dictionaries, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    print("{:>12} {:>10} {:>16} {:>12}".format(
+        "island", "animals", "dictionaries s", "columns s"))
+    for island_class, n_animals in ((bi.Island, 100000),
+                                    (bi.ArrayIsland, 1000000)):
+        print("{:>12} {:>10} {:>16.3f} {:>12.3f}".format(
+            island_class.__name__, n_animals,
+            *time_loading(island_class, n_animals)))
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of carnivore predation in a single dense cell with 2 000
+herbivores and 200 carnivores.
+
+The predation of earlier versions, where every carnivore rebuilt the list of
+surviving herbivores, is reproduced by :func:`list_predation` for
+comparison with :meth:`biosim.landscape.Landscape.eat_request_carnivore`. The
+mean number of herbivores killed is printed for both, and for the list
+predation with every carnivore trying the herbivores in order of ascending
+fitness, as the new predation does.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import random
+import time
+
+import biosim.animals as ba
+import biosim.landscape as bl
+
+
+def dense_cell(n_herbivores=2000, n_carnivores=200):
+    """
+    Creates a Jungle cell with animals of random weight, sorted by fitness.
+
+    :param n_herbivores: int.
+    :param n_carnivores: int.
+    :return: Jungle.
+    """
+    cell = bl.Jungle()
+    cell.cell_population(
+        [{"species": "Herbivore", "age": random.randint(1, 20),
+          "weight": random.uniform(5, 40)} for _ in range(n_herbivores)] +
+        [{"species": "Carnivore", "age": random.randint(1, 20),
+          "weight": random.uniform(5, 40)} for _ in range(n_carnivores)])
+    cell.sort_by_fitness()
+    return cell
+
+
+def list_predation(cell, keep_order=False):
+    """
+    Predation where every carnivore walks the reversed list of herbivores
+    and builds a new list of the survivors. As in earlier versions, the new
+    list is in reverse order, so every other carnivore tries the fittest
+    herbivores first, unless keep_order is True.
+
+    :param cell: Landscape.
+    :param keep_order: bool, if True, the survivors are stored in the order
+                       of the original list.
+    """
+    max_feed = ba.Carnivore.default_parameters["F"]
+    beta = ba.Carnivore.default_parameters["beta"]
+    for carnivore in cell.animal_population[1]:
+        survivors = []
+        weight_eaten = 0
+        for herbivore in cell.animal_population[0][::-1]:
+            if weight_eaten < max_feed and \
+                    random.random() < carnivore.eating_probability(herbivore):
+                meal = min(herbivore.weight, max_feed - weight_eaten)
+                carnivore.weight += beta * meal
+                weight_eaten += meal
+            else:
+                survivors.append(herbivore)
+        cell.animal_population[0] = survivors[::-1] if keep_order \
+            else survivors
+
+
+def time_predation(predation, repeats=20):
+    """
+    Measures the average time of predation in a dense cell.
+
+    :param predation: callable, taking the cell.
+    :param repeats: int, number of cells.
+    :return: tuple, seconds per cell and mean number of herbivores killed.
+    """
+    random.seed(1)
+    seconds, killed = 0, 0
+    for _ in range(repeats):
+        cell = dense_cell()
+        n_herbivores = cell.number_of_herbivores
+        start = time.perf_counter()
+        predation(cell)
+        seconds += time.perf_counter() - start
+        killed += n_herbivores - cell.number_of_herbivores
+    return seconds / repeats, killed / repeats
+
+
+if __name__ == "__main__":
+    print("{:>20} {:>10} {:>10}".format("predation", "ms", "killed"))
+    for name, function in (
+            ("list per carnivore", list_predation),
+            ("list, ascending", lambda cell: list_predation(cell, True)),
+            ("mask per cell", bl.Landscape.eat_request_carnivore)):
+        seconds, killed = time_predation(function)
+        print("{:>20} {:>10.1f} {:>10.1f}".format(name, 1e3 * seconds, killed))
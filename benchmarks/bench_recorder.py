@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the time of recording the per-cell statistics of one year,
+with :class:`biosim.recorder.Recorder` and, as was done before, by building
+:attr:`biosim.simulation.BioSim.animal_distribution` every year.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import time
+
+import biosim.island as bi
+import biosim.recorder as br
+from biosim.simulation import BioSim
+
+
+def simulation(engine):
+    """
+    Creates a simulation of the standard map, with animals spread over the
+    island by a few simulated years.
+
+    :param engine: str, passed on to BioSim.
+    :return: BioSim.
+    """
+    sim = BioSim(bi.Island.STANDARD_MAP.replace(" ", ""), [
+        {"loc": (6, 10), "pop": [
+            {"species": "Herbivore", "age": 5, "weight": 20}
+            for _ in range(500)] + [
+            {"species": "Carnivore", "age": 5, "weight": 20}
+            for _ in range(50)]}], seed=1, engine=engine)
+    sim.simulate(20, vis_years=0)
+    return sim
+
+
+def time_per_record(function, repeats=100):
+    """
+    Measures the average time of a call of the function.
+
+    :param function: callable.
+    :param repeats: int, number of calls.
+    :return: float, seconds per call.
+    """
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats
+
+
+if __name__ == "__main__":
+    print("{:>8} {:>26} {:>14}".format("engine", "method", "ms per year"))
+    for engine in ("object", "array"):
+        sim = simulation(engine)
+        recorder = br.Recorder(sim.island.numpy_map.shape)
+        for name, function in (
+                ("animal_distribution", lambda: sim.animal_distribution),
+                ("Recorder, all metrics",
+                 lambda: recorder.record(0, sim.island))):
+            print("{:>8} {:>26} {:>14.3f}".format(
+                engine, name, 1e3 * time_per_record(function)))
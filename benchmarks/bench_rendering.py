@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the time of :meth:`biosim.simulation.BioSim.update_graphics`
+over a long simulation rendered every year. As the lines of the population
+graph are reused, and, when the backend supports blitting, only the
+heatmaps and the years of the lines since the previous frame are drawn, the
+time per frame should stay about the same from the first to the last
+years. The median of each window of frames is shown, as single frames vary
+with the load of the machine.
+
+The Agg backend is used unless MPLBACKEND is set.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import os
+import statistics
+import time
+
+from biosim.simulation import BioSim
+
+
+def frame_times(years):
+    """
+    Simulates a small island, rendering every year, and measures the time
+    of each update of the graphics.
+
+    :param years: int, number of years.
+    :return: list, seconds per frame.
+    """
+    sim = BioSim("OOOO\nOJSO\nOOOO", [{"loc": (1, 1), "pop": [
+        {"species": "Herbivore", "age": 5, "weight": 20}
+        for _ in range(10)]}], seed=1, ymax_animals=200)
+    times = []
+    update_graphics = sim.update_graphics
+
+    def timed_update():
+        start = time.perf_counter()
+        update_graphics()
+        times.append(time.perf_counter() - start)
+
+    sim.update_graphics = timed_update
+    sim.simulate(years, vis_years=1)
+    return times
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    n_years = 2000
+    frames = frame_times(n_years)
+    print("{:>20} {:>14}".format("frames", "ms per frame"))
+    for first in (1, n_years // 2, n_years - 100):
+        window = frames[first:first + 100]
+        print("{:>20} {:>14.2f}".format(
+            "{}-{}".format(first, first + len(window) - 1),
+            1e3 * statistics.median(window)))
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the time of the reproduction phase of one cell of the
+'object' engine, per animal, for growing numbers of animals, see
+:meth:`biosim.landscape.Landscape.reproduction`. The cell is given a NumPy
+generator, as by the island.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import random
+import time
+
+import numpy as np
+
+import biosim.landscape as bl
+
+
+def cell(n_animals):
+    """
+    Creates a jungle cell with herbivores and a tenth as many carnivores, of
+    weights around the least weight that allows a birth.
+
+    :param n_animals: int, number of herbivores.
+    :return: biosim.landscape.Jungle.
+    """
+    jungle = bl.Jungle()
+    jungle.cell_population(
+        [{"species": "Herbivore", "age": 5,
+          "weight": random.uniform(20, 60)} for _ in range(n_animals)] +
+        [{"species": "Carnivore", "age": 5,
+          "weight": random.uniform(15, 50)}
+         for _ in range(n_animals // 10)])
+    return jungle
+
+
+def time_per_animal(n_animals, repeats=5):
+    """
+    Measures the shortest time of the reproduction phase of a new cell,
+    divided by the number of animals.
+
+    :param n_animals: int, number of herbivores.
+    :param repeats: int, number of cells.
+    :return: float, seconds per animal.
+    """
+    best = float("inf")
+    rng = np.random.default_rng(1)
+    for _ in range(repeats):
+        jungle = cell(n_animals)
+        start = time.perf_counter()
+        jungle.reproduction(rng)
+        best = min(best, time.perf_counter() - start)
+    return best / (n_animals + n_animals // 10)
+
+
+if __name__ == "__main__":
+    random.seed(1)
+    print("{:>10} {:>18}".format("herbivores", "us per animal"))
+    for n_animals in (10, 100, 1000, 10000, 100000):
+        print("{:>10} {:>18.3f}".format(
+            n_animals, 1e6 * time_per_animal(n_animals)))
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the number of runs per second of a parameter sweep with
+:class:`biosim.sweep.Sweep`, against the same runs simulated one after the
+other in this process. The sweep should approach one run per core at a
+time.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import os
+import time
+
+import biosim.sweep as bs
+from biosim.simulation import BioSim
+
+ISLAND_MAP = """\
+OOOOOOOOOO
+OJJJJSSSSO
+OJJJJSSSSO
+OJJDDDDSSO
+OOOOOOOOOO"""
+INI_POP = [{"loc": (2, 2), "pop": [
+    {"species": "Herbivore", "age": 5, "weight": 20}
+    for _ in range(100)] + [
+    {"species": "Carnivore", "age": 5, "weight": 20} for _ in range(20)]}]
+GRID = {"Herbivore": {"zeta": [3.0, 3.5]},
+        "Carnivore": {"F": [30.0, 50.0], "DeltaPhiMax": [5.0, 10.0]}}
+SEEDS = range(4)
+YEARS = 50
+
+
+def sequential():
+    """
+    Simulates all runs of the sweep one after the other.
+
+    :return: float, runs per second.
+    """
+    base = bs.current_parameters()
+    runs = bs.Sweep(ISLAND_MAP, INI_POP, GRID, SEEDS, YEARS).runs
+    start = time.perf_counter()
+    for parameters, seed in runs:
+        bs.set_parameters(base)
+        bs.set_parameters(parameters)
+        BioSim(ISLAND_MAP, INI_POP, seed, engine="array").simulate(
+            YEARS, vis_years=0)
+    bs.set_parameters(base)
+    return len(runs) / (time.perf_counter() - start)
+
+
+def swept(processes):
+    """
+    Runs the sweep in a pool of workers.
+
+    :param processes: int, number of workers.
+    :return: float, runs per second.
+    """
+    sweep = bs.Sweep(ISLAND_MAP, INI_POP, GRID, SEEDS, YEARS,
+                     processes=processes, engine="array")
+    start = time.perf_counter()
+    results = sweep.run()
+    return len(results) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    print("{} cores".format(os.cpu_count()))
+    print("{:>20} {:>12}".format("mode", "runs per s"))
+    print("{:>20} {:>12.2f}".format("sequential", sequential()))
+    for n_processes in (1, 2, 4):
+        print("{:>20} {:>12.2f}".format(
+            "sweep, {} workers".format(n_processes), swept(n_processes)))
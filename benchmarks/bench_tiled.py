@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the tiled island, see :mod:`biosim.tiled`, on a large map with
+both species in every cell, for different numbers of worker processes.
+
+Each tile is kept by its own worker process, and only the border rows and
+the migrants are sent between processes every year. The speed-up is limited
+by the number of cores, and by the rows of the map, as there is one tile per
+row at most.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import os
+import time
+
+import biosim.island as bi
+import biosim.tiled as bt
+from bench_map_size import square_map
+
+
+def populated(island, size):
+    """
+    Places 20 herbivores and 5 carnivores in every Jungle cell.
+
+    :param island: Island.
+    :param size: int, number of rows and columns of the map.
+    :return: Island.
+    """
+    island.populate_the_island([{"loc": (row, col), "pop": [
+        {"species": "Herbivore", "age": 5, "weight": 20}
+        for _ in range(20)] + [
+        {"species": "Carnivore", "age": 5, "weight": 20}
+        for _ in range(5)]}
+        for row in range(1, size - 1) for col in range(1, size - 1)])
+    return island
+
+
+def time_per_year(island, years=5):
+    """
+    Measures the average time of one annual cycle.
+
+    :param island: Island.
+    :param years: int, number of years to simulate.
+    :return: float, seconds per year.
+    """
+    island.annual_cycle()
+    start = time.perf_counter()
+    for _ in range(years):
+        island.annual_cycle()
+    return (time.perf_counter() - start) / years
+
+
+if __name__ == "__main__":
+    map_size = 100
+    print("{} cells, {} cores".format(map_size ** 2, os.cpu_count()))
+    print("{:>12} {:>14}".format("workers", "s per year"))
+    print("{:>12} {:>14.2f}".format("array", time_per_year(
+        populated(bi.ArrayIsland(square_map(map_size), seed=1), map_size))))
+    for workers in (1, 2, 4, 8):
+        tiled_island = populated(
+            bt.TiledIsland(square_map(map_size), workers=workers, seed=1),
+            map_size)
+        print("{:>12} {:>14.2f}".format(workers, time_per_year(tiled_island)))
+        tiled_island.close()
@@ -19,18 +19,49 @@ __email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
 import math
 import random
 
+import numpy as np
+
+import biosim.parameters as bpa
+
 
 class Animal:
     """
     This class creates an idea Animal, not specifying the -vore-type.
+
+    The parameters of a species are read from :attr:`parameters`, an
+    immutable :class:`biosim.parameters.AnimalParameters` built from
+    ``default_parameters``. Each island binds its own subclass of every
+    species, see :meth:`bind`, so that simulations do not share parameters.
+
+    The attributes of an animal are stored in slots instead of a
+    ``__dict__``, which makes every animal object smaller. Subclasses must
+    declare ``__slots__`` as well, to keep it that way.
+
+    An animal draws its birth weight from the random module when it is
+    created with age 0, and draws nothing when created with an age above 0.
+    Births are decided for all animals of a cell at once, see
+    :meth:`biosim.landscape.Landscape.reproduction`, which creates the
+    newborns with :meth:`newborn`.
     """
 
+    __slots__ = ("_age", "_weight", "_phi", "_recompute_phi")
+
     default_parameters = {"w_birth": None, "sigma_birth": None, "beta": None,
                           "eta": None, "a_half": None, "phi_age": None,
                           "w_half": None, "phi_weight": None, "mu": None,
                           "lambda": None, "gamma": None, "zeta": None,
                           "xi": None, "omega": None, "F": None,
                           "DeltaPhiMax": None}
+    parameters = bpa.AnimalParameters(default_parameters)
+
+    def __init_subclass__(cls, **kwargs):
+        """
+        Builds the parameter set of a subclass that defines its own default
+        parameters.
+        """
+        super().__init_subclass__(**kwargs)
+        if "default_parameters" in vars(cls):
+            cls.parameters = bpa.AnimalParameters(cls.default_parameters)
 
     def __init__(self, weight=default_parameters["w_birth"], age=0):
         """
@@ -43,17 +74,29 @@ class Animal:
         self._phi = None    # Initialised by fitness property
         self._recompute_phi = True
 
+        p = self.parameters
         if age == 0:
-            self.weight = random.normalvariate(
-                weight, self.default_parameters["sigma_birth"]
-            )
+            self.weight = random.normalvariate(weight, p.sigma_birth)
         else:
             self.weight = weight
         self.age = age
-        self.newborn_weight = random.normalvariate(
-            self.default_parameters["w_birth"],
-            self.default_parameters["sigma_birth"]
-        )
+
+    @classmethod
+    def newborn(cls, weight):
+        """
+        Creates an animal of age 0 with the given weight, without drawing
+        it, for the newborns of
+        :meth:`biosim.landscape.Landscape.reproduction`.
+
+        :param weight: float, birth weight of the animal.
+        :return: Animal.
+        """
+        animal = cls.__new__(cls)
+        animal._phi = None
+        animal._recompute_phi = True
+        animal._weight = weight
+        animal._age = 0
+        return animal
 
     @classmethod
     def set_animal_parameters(cls, new_parameters):
@@ -67,12 +110,46 @@ class Animal:
         :math:`\\Delta\\Phi_{max}` are identical for all animals of the same
         species, but may be different between herbivores and carnivores.
 
+        The parameter set of the class is replaced by a new one, so the
+        parameters of the class must not be changed by writing to
+        ``default_parameters`` directly.
+
         :param new_parameters: dict, dictionary with the new parameter values.
                                Only keys from the default parameter value dict
                                are valid.
         """
-        for key in new_parameters:
-            cls.default_parameters[key] = new_parameters[key]
+        cls.parameters = cls.parameters.replace(new_parameters)
+        cls.default_parameters.update(new_parameters)
+
+    @classmethod
+    def bind(cls, parameters=None):
+        """
+        Creates a subclass of the species with its own parameters, which can
+        be set without changing those of the species or of other subclasses.
+        Animals of the subclass are instances of the species. The subclass
+        and its animals can be pickled, see
+        :class:`biosim.parameters.BoundType`.
+
+        :param parameters: dict or AnimalParameters, parameters of the
+                           subclass. Defaults to those of the species.
+        :return: class.
+        """
+        if parameters is None:
+            parameters = cls.parameters
+        return bpa.BoundType(cls.__name__, (cls,), {
+            "__module__": cls.__module__, "__qualname__": cls.__qualname__,
+            "__doc__": cls.__doc__, "__slots__": (),
+            "default_parameters": dict(parameters)})
+
+    @classmethod
+    def _bind_arguments(cls):
+        """
+        The arguments of :meth:`bind` that create a class like this one,
+        e.g. when a bound class is unpickled.
+
+        :return: tuple.
+        """
+        return (cls.parameters,)
 
     def aging(self):
         """
@@ -118,69 +195,7 @@ class Animal:
         of :math:`\\eta w`, where :math:`\\eta` is a parameter value for the
         animal, and :math:`w` is the animal's current weight.
         """
-        self.weight = self.weight - (
-                self.default_parameters["eta"] * self.weight
-        )
-
-    def reproduction_probability(self, n_animals):
-        """
-        Estimates the probability of reproduction for the given animal
-        according to the equation
-
-        .. math::
-
-            min(1, \gamma \\times \phi \\times (N-1),
-
-        where :math:`N` is the number of conspecific animals at the start of
-        the breeding season, and :math:`\\gamma` and :math:`\\phi` are
-        species-specific parameter values. This means that the reproduction
-        probability is 0 if there is only one individual of a species in the
-        given cell.
-
-        Furthermore, the probability is also 0 if the weight is
-
-        .. math::
-
-            w < \\zeta (w_{birth} + \sigma_{birth}),
-
-        where :math:`\\zeta, w_{birth}` and :math:`\\sigma_{birth}` are all
-        species-specific parameter values.
-
-        :param n_animals: integer, number of animals that may reproduce.
-        :return reproduction_success: bool, the animal reproduces or not.
-        """
-
-        if self.weight < self.default_parameters["zeta"] * (
-                self.default_parameters["w_birth"] + (
-                self.default_parameters["sigma_birth"])):
-            reproduction_prob = 0
-        elif self.weight < self.newborn_weight:
-            reproduction_prob = 0
-        else:
-            reproduction_prob = min(
-                [1, self.default_parameters["gamma"] * self.fitness * (
-                        n_animals - 1)])
-
-        reproduction_success = random.random() <= reproduction_prob
-        return reproduction_success
-
-    def update_weight_after_birth(self):
-        r"""
-        If reproduction is successful  a new animal is born, and the mother's
-        weight is reduced by the equation
-
-        .. math::
-
-            w = \xi * N(w_{birth}, \sigma_{birth}),
-
-        where :math:`N(w_{birth}, \sigma_{birth})` is the newborn's weight
-        that is normally distributed with mean :math:`w_{birth}` and
-        standard deviation :math:`\sigma_{birth}`, and :math:`\xi` is a
-        parameter value for the animal.
-        """
-        self.weight = self.weight - (
-                self.default_parameters["xi"] * self.newborn_weight
-        )
+        self.weight = self.weight - self.parameters.eta * self.weight
 
     def death(self):
         """
@@ -192,7 +207,7 @@ class Animal:
 
         :return: bool.
         """
-        death_prob = self.default_parameters["omega"] * (1 - self.fitness)
+        death_prob = self.parameters.omega * (1 - self.fitness)
         return random.random() < death_prob
 
     @property
@@ -219,22 +234,66 @@ class Animal:
             q^{\pm}(x, x_{\\frac{1}{2}}, \phi) = \\frac{1}{1 + e^{\pm \phi(x
              - x_{\\frac{1}{2}})}}
 
+        The logistic functions are evaluated as
+
+        .. math::
+
+            q^{\\pm}(x, x_{\\frac{1}{2}}, \\phi) = \\frac{1}{2}\\left(1 -
+            \\tanh\\frac{\\pm \\phi(x - x_{\\frac{1}{2}})}{2}\\right),
+
+        which is the same function, but does not overflow for extreme ages
+        and weights.
+
         :return: float.
         """
 
         if not self._recompute_phi:
             return self._phi
         else:
-            self._phi = 1 / (1 + math.exp(self.default_parameters["phi_age"] *
-                                          (
-                        self.age - self.default_parameters["a_half"]
-                ))) * 1 / (1 + math.exp(
-                    -self.default_parameters["phi_weight"] * (
-                            self.weight - self.default_parameters["w_half"])))
+            p = self.parameters
+            self._phi = 0.25 * (1 - math.tanh(
+                p.phi_age / 2 * (self.age - p.a_half)
+            )) * (1 + math.tanh(
+                p.phi_weight / 2 * (self.weight - p.w_half)
+            ))
             self._recompute_phi = False
 
             return self._phi
 
+    @classmethod
+    def batch_fitness(cls, age, weight):
+        """
+        Calculates the fitness of many animals of the species in one NumPy
+        call, using the same formula as :attr:`fitness`. The arrays may hold
+        the animals of one cell or of the whole island.
+
+        :param age: array_like, ages of the animals.
+        :param weight: array_like, weights of the animals.
+        :return: numpy.ndarray.
+        """
+        age = np.asarray(age, dtype=float)
+        weight = np.asarray(weight, dtype=float)
+        p = cls.parameters
+        return 0.25 * (1 - np.tanh(p.phi_age / 2 * (age - p.a_half))) * (
+                1 + np.tanh(p.phi_weight / 2 * (weight - p.w_half)))
+
+    @classmethod
+    def population_fitness(cls, animals):
+        """
+        Calculates the fitness of a list of animals of the species with
+        :meth:`batch_fitness`, and stores the result in each animal so that
+        :attr:`fitness` does not have to recompute it.
+
+        :param animals: list, animals of the species.
+        :return: numpy.ndarray.
+        """
+        phi = cls.batch_fitness([animal.age for animal in animals],
+                                [animal.weight for animal in animals])
+        for animal, fitness in zip(animals, phi.tolist()):
+            animal._phi = fitness
+            animal._recompute_phi = False
+        return phi
+
     def migration_probability(self):
         """
         Probability for the animal to migrate. The probability is calculated
@@ -243,7 +302,7 @@ class Animal:
         :return: bool.
         """
         migration_probability = random.random() <= (
-                self.default_parameters["mu"] * self.fitness
+                self.parameters.mu * self.fitness
         )
         return migration_probability
 
@@ -254,6 +313,8 @@ class Herbivore(Animal):
     default parameters.
     """
 
+    __slots__ = ()
+
     default_parameters = {"w_birth": 8.0, "sigma_birth": 1.5, "beta": 0.9,
                           "eta": 0.05, "a_half": 40.0, "phi_age": 0.2,
                           "w_half": 10.0, "phi_weight": 0.1, "mu": 0.25,
@@ -266,7 +327,7 @@ class Herbivore(Animal):
         constructor of superclass.
         """
         if weight is None:
-            weight = self.default_parameters["w_birth"]
+            weight = self.parameters.w_birth
         super().__init__(weight=weight, age=age)
 
     def eating(self, fodder):
@@ -279,16 +340,7 @@ class Herbivore(Animal):
 
         :param fodder: float, amount of fodder eaten by the herbivore.
         """
-        self.weight += fodder * self.default_parameters["beta"]
-
-    def move(self, cell):
-        """
-        This method appends the herbivore to a list of the new population
-        of the cell.
-
-        :param cell: object, landscape type of the position in island map.
-        """
-        cell.new_population[0].append(self)
+        self.weight += fodder * self.parameters.beta
 
 
 class Carnivore(Animal):
@@ -297,6 +349,8 @@ class Carnivore(Animal):
     default parameters.
     """
 
+    __slots__ = ()
+
     default_parameters = {"w_birth": 6.0, "sigma_birth": 1.0, "beta": 0.75,
                           "eta": 0.125, "a_half": 60.0, "phi_age": 0.4,
                           "w_half": 4.0, "phi_weight": 0.4, "mu": 0.4,
@@ -310,7 +364,7 @@ class Carnivore(Animal):
         constructor of superclass.
         """
         if weight is None:
-            weight = self.default_parameters["w_birth"]
+            weight = self.parameters.w_birth
         super().__init__(weight=weight, age=age)
 
     def eating_probability(self, herbivores):
@@ -333,7 +387,7 @@ class Carnivore(Animal):
         :param herbivores: list of herbivores.
         :return: float, probability of eating.
         """
-        delta_phi_max = self.default_parameters["DeltaPhiMax"]
+        delta_phi_max = self.parameters.DeltaPhiMax
 
         if self.fitness <= herbivores.fitness:
             return 0
@@ -342,46 +396,62 @@ class Carnivore(Animal):
         else:
             return 1
 
-    def eating(self, herbivores):
+    def hunt(self, prey, prey_fitness, killed):
         """
-        Calculates the new weight of the carnivore after eating fodder.
-        The carnivores weight increases by :math:`\\beta w_{herb}`, where
-        :math:`w_{herb}` is the weight of the herbivore killed, or the
-        weight amount of the herbivore that the carnivore eats to
-        become satiated.
+        The carnivore tries to kill the herbivores in the given order, each
+        with the probability of :meth:`eating_probability`, until it has
+        eaten :math:`F` or has tried all of them. Its weight increases by
+        :math:`\\beta w_{herb}` for every herbivore killed, where
+        :math:`w_{herb}` is the weight of the herbivore, or the amount the
+        carnivore eats to become satiated.
+
+        Herbivores already marked as killed are skipped, and no random number
+        is drawn when the probability is 0 or 1.
 
-        :param herbivores: float, amount of fodder eaten by the herbivore.
-        :return herbivores_not_eaten: list of surviving herbivores.
+        :param prey: list of herbivores.
+        :param prey_fitness: list, fitness of each herbivore.
+        :param killed: list of bool, True for herbivores that have been
+                       killed. Updated in place.
         """
-        herbivores_not_eaten = []
+        p = self.parameters
+        max_feed = p.F
+        delta_phi_max = p.DeltaPhiMax
+        beta = p.beta
         weight_eaten = 0
-        max_feed = self.default_parameters["F"]
-
-        for herbivore in herbivores[::-1]:
-            if weight_eaten < max_feed \
-                    and random.random() < self.eating_probability(herbivore):
-                if weight_eaten + herbivore.weight > max_feed:
-                    herbivore.weight = max_feed - weight_eaten
-                    self.weight += (
-                            self.default_parameters["beta"] * herbivore.weight
-                    )
-                    weight_eaten = max_feed
-
-                else:
-                    self.weight += (
-                            self.default_parameters["beta"] * herbivore.weight
-                    )
-                    weight_eaten += herbivore.weight
+        fitness = self.fitness
+
+        for index, herbivore in enumerate(prey):
+            if weight_eaten >= max_feed:
+                break
+            if killed[index]:
+                continue
+            difference = fitness - prey_fitness[index]
+            if difference <= 0 or (
+                    difference < delta_phi_max and
+                    random.random() >= difference / delta_phi_max):
+                continue
+
+            killed[index] = True
+            if weight_eaten + herbivore.weight > max_feed:
+                self.weight += beta * (max_feed - weight_eaten)
+                weight_eaten = max_feed
             else:
-                herbivores_not_eaten.append(herbivore)
+                self.weight += beta * herbivore.weight
+                weight_eaten += herbivore.weight
+            fitness = self.fitness
 
-        return herbivores_not_eaten
-
-    def move(self, cell):
+    def eating(self, herbivores):
         """
-        This method appends the carnivore to a list of the new population
-        of the cell.
+        The carnivore tries to kill the herbivores in the list in reverse
+        order, which is ascending fitness when the list is sorted by
+        descending fitness, see :meth:`hunt`.
 
-        :param cell: object, landscape type of the position in map.
-        """
-        cell.new_population[1].append(self)
+        :param herbivores: list of herbivores.
+        :return herbivores_not_eaten: list of surviving herbivores, in the
+                                      order they were tried.
+        """
+        prey = herbivores[::-1]
+        killed = [False] * len(prey)
+        self.hunt(prey, [herbivore.fitness for herbivore in prey], killed)
+        return [herbivore for herbivore, dead in zip(prey, killed)
+                if not dead]
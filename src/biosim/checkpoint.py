@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`biosim.checkpoint` saves the complete state of a simulation to a file,
+and restores it, so that a long simulation can be resumed after a crash.
+
+A checkpoint is a compressed ``.npz`` file. The animals are stored as one
+array per species and attribute, see
+:meth:`biosim.island.Island.animal_state`, together with the fodder, the
+state of the random module and the population totals. A JSON document in the
+array "meta" holds the island map, the engine, the year, the animal and
+landscape parameters of the simulation and the state of the NumPy generator
+of the island.
+Nothing is pickled.
+
+A simulation resumed from a checkpoint gives exactly the same results as one
+that was not interrupted. The graphics, the recorder and the history sink
+are not part of the checkpoint.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import json
+import os
+import random
+
+import numpy as np
+
+FORMAT_VERSION = 2
+
+
+def save(sim, path):
+    """
+    Saves the state of a simulation. The file is written under a temporary
+    name and renamed when complete, so an existing checkpoint is never left
+    half written.
+
+    :param sim: biosim.simulation.BioSim.
+    :param path: str or os.PathLike, path of the checkpoint.
+    """
+    path = os.fspath(path)
+    version, internal_state, gauss_next = random.getstate()
+    parameters = {name: parameter_set.as_dict()
+                  for name, parameter_set in sim.island.parameters.items()}
+    meta = {
+        "format": FORMAT_VERSION,
+        "island_map": sim.island.island_map,
+        "engine": sim.engine,
+        "active_set": sim.active_set,
+        "workers": sim.workers,
+        "year": sim.last_year_simulated,
+        "img_ctr": sim._img_ctr,
+        "animal_parameters": {
+            name: parameters[name] for name in ("Herbivore", "Carnivore")},
+        "landscape_parameters": {
+            code: parameters[code] for code in "JSDMO"},
+        "random_version": version,
+        "random_gauss_next": gauss_next,
+        "rng_state": sim.island.rng.bit_generator.state,
+    }
+    arrays = sim.island.animal_state()
+    arrays.update(
+        meta=np.array(json.dumps(meta)),
+        fodder=sim.island.fodder,
+        random_state=np.array(internal_state, dtype=np.uint32),
+        herbivore_list=np.array(sim.herbivore_list, dtype=np.int64),
+        carnivore_list=np.array(sim.carnivore_list, dtype=np.int64))
+
+    with open(path + ".tmp", "wb") as file:
+        np.savez_compressed(file, **arrays)
+    os.replace(path + ".tmp", path)
+
+
+def load(sim_class, path, **options):
+    """
+    Creates a simulation in the state saved in a checkpoint, with the
+    animal and landscape parameters of the saved simulation. The state of
+    the random module is restored as well, since it is shared by all
+    simulations.
+
+    :param sim_class: class, :class:`biosim.simulation.BioSim`.
+    :param path: str or os.PathLike, path of the checkpoint.
+    :param options: keyword arguments of BioSim that are not part of the
+                    state, e.g. img_base.
+    :return: biosim.simulation.BioSim.
+    """
+    with np.load(path, allow_pickle=False) as checkpoint:
+        arrays = {name: checkpoint[name] for name in checkpoint.files}
+    meta = json.loads(str(arrays.pop("meta")))
+    if meta["format"] != FORMAT_VERSION:
+        raise ValueError("Unknown checkpoint format " +
+                         repr(meta["format"]) + ".")
+
+    parameters = dict(meta["animal_parameters"],
+                      **meta["landscape_parameters"])
+    sim = sim_class(meta["island_map"], [], seed=0, engine=meta["engine"],
+                    active_set=meta["active_set"], workers=meta["workers"],
+                    parameters=parameters, **options)
+    sim.island.set_animal_state(arrays)
+    sim.island.fodder[...] = arrays["fodder"]
+    sim.island.rng.bit_generator.state = meta["rng_state"]
+    sim.last_year_simulated = meta["year"]
+    sim._img_ctr = meta["img_ctr"]
+    sim.herbivore_list = arrays["herbivore_list"].tolist()
+    sim.carnivore_list = arrays["carnivore_list"].tolist()
+
+    random.setstate((meta["random_version"],
+                     tuple(arrays["random_state"].tolist()),
+                     meta["random_gauss_next"]))
+    return sim
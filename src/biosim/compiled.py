@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`biosim.compiled` defines kernels for the inner loops of the annual
+cycle, compiled with numba when it is installed. The kernels work on the
+arrays of :mod:`biosim.population`, with the animals sorted by cell, and
+loop over the animals one by one, as the methods of
+:mod:`biosim.landscape` and :mod:`biosim.animals` do, instead of building
+temporary arrays.
+
+If numba can not be imported, the kernels are ordinary Python functions.
+They give the same results, but are far slower than the NumPy
+implementation in :mod:`biosim.population`, which
+:class:`biosim.simulation.BioSim` then uses instead.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import math
+
+import numpy as np
+
+import biosim.island as bi
+import biosim.population as bp
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+NUMBA_AVAILABLE = numba is not None
+
+
+def _kernel(function):
+    """
+    Compiles the function in nopython mode if numba is available.
+
+    :param function: callable.
+    :return: callable.
+    """
+    if numba is None:
+        return function
+    return numba.njit(cache=True)(function)
+
+
+if NUMBA_AVAILABLE:
+    @_kernel
+    def seed(value):
+        """
+        Seeds the random number generator used by the kernels. Compiled
+        kernels have a generator of their own, separate from the one of
+        NumPy.
+
+        :param value: int.
+        """
+        np.random.seed(value)
+
+    @_kernel
+    def uniform():
+        """
+        Draws a number from the generator of the kernels, uniformly in
+        [0, 1).
+
+        :return: float.
+        """
+        return np.random.random()
+else:
+    # Without numba, the kernels draw from a generator of this module, so
+    # that the global generator of NumPy is left alone. It is a Mersenne
+    # Twister, as the generator of compiled kernels, and gives the same
+    # numbers for the same seed.
+    _generator = np.random.RandomState()
+
+    def seed(value):
+        """
+        Seeds the random number generator used by the kernels.
+
+        :param value: int.
+        """
+        _generator.seed(value)
+
+    def uniform():
+        """
+        Draws a number from the generator of the kernels, uniformly in
+        [0, 1).
+
+        :return: float.
+        """
+        return _generator.random_sample()
+
+
+@_kernel
+def animal_fitness(age, weight, a_half, phi_age, w_half, phi_weight):
+    """
+    Fitness of a single animal, see :attr:`biosim.animals.Animal.fitness`.
+
+    :return: float.
+    """
+    return 0.25 * (1 - math.tanh(phi_age / 2 * (age - a_half))) * (
+            1 + math.tanh(phi_weight / 2 * (weight - w_half)))
+
+
+@_kernel
+def fitness(age, weight, a_half, phi_age, w_half, phi_weight):
+    """
+    Fitness of every animal.
+
+    :param age: numpy.ndarray.
+    :param weight: numpy.ndarray.
+    :return: numpy.ndarray.
+    """
+    result = np.empty(len(age))
+    for i in range(len(age)):
+        result[i] = animal_fitness(age[i], weight[i], a_half, phi_age,
+                                   w_half, phi_weight)
+    return result
+
+
+@_kernel
+def eat_fodder(fodder, cell, weight, appetite, beta):
+    """
+    Every herbivore eats the amount appetite, or what is left of the fodder
+    in its cell, in the order of the arrays. Fodder and weight are updated
+    in place.
+
+    :param fodder: numpy.ndarray, fodder in each cell.
+    :param cell: numpy.ndarray, cell of each herbivore.
+    :param weight: numpy.ndarray, weight of each herbivore.
+    :param appetite: float, the parameter :math:`F`.
+    :param beta: float, the parameter :math:`\\beta`.
+    """
+    for i in range(len(cell)):
+        eaten = min(appetite, fodder[cell[i]])
+        fodder[cell[i]] -= eaten
+        weight[i] += beta * eaten
+
+
+@_kernel
+def hunt(herb_start, herb_end, herb_weight, herb_fitness,
+         carn_start, carn_end, carn_age, carn_weight, carn_fitness,
+         appetite, beta, delta_phi_max, a_half, phi_age, w_half, phi_weight):
+    """
+    Every carnivore tries to kill the herbivores of its cell in order of
+    ascending fitness, until it has eaten the amount appetite or has tried
+    all of them, as in :meth:`biosim.animals.Carnivore.eating`. The
+    carnivores hunt in the order of the arrays, and the herbivores must be
+    sorted by descending fitness in each cell. The weight and fitness of the
+    carnivores are updated in place.
+
+    :return: numpy.ndarray, True for killed herbivores.
+    """
+    killed = np.zeros(len(herb_weight), dtype=np.bool_)
+    for c in range(len(carn_start)):
+        if herb_end[c] == herb_start[c]:
+            continue
+        for carnivore in range(carn_start[c], carn_end[c]):
+            eaten = 0.0
+            for herbivore in range(herb_end[c] - 1, herb_start[c] - 1, -1):
+                if eaten >= appetite:
+                    break
+                if killed[herbivore]:
+                    continue
+                difference = carn_fitness[carnivore] - herb_fitness[
+                    herbivore]
+                if difference <= 0:
+                    probability = 0.0
+                elif difference < delta_phi_max:
+                    probability = difference / delta_phi_max
+                else:
+                    probability = 1.0
+                if uniform() < probability:
+                    killed[herbivore] = True
+                    meal = min(herb_weight[herbivore], appetite - eaten)
+                    eaten += meal
+                    carn_weight[carnivore] += beta * meal
+                    carn_fitness[carnivore] = animal_fitness(
+                        carn_age[carnivore], carn_weight[carnivore],
+                        a_half, phi_age, w_half, phi_weight)
+    return killed
+
+
+@_kernel
+def reproduction(weight, fitness, n_in_cell, chance, newborn_weight,
+                 gamma, zeta, w_birth, sigma_birth, xi):
+    """
+    Decides which animals give birth, as in
+    :meth:`biosim.population.SpeciesPopulation.reproduction`, and subtracts
+    :math:`\\xi` times the weight of the newborn from the mothers, in place.
+
+    :param chance: numpy.ndarray, uniform random numbers.
+    :param newborn_weight: numpy.ndarray, weight of the possible newborns.
+    :return: numpy.ndarray, True for animals giving birth.
+    """
+    birth = np.zeros(len(weight), dtype=np.bool_)
+    for i in range(len(weight)):
+        if (weight[i] >= zeta * (w_birth + sigma_birth) and
+                weight[i] >= newborn_weight[i] and
+                chance[i] < min(1.0, gamma * fitness[i] * (n_in_cell[i] - 1))):
+            birth[i] = True
+            weight[i] -= xi * newborn_weight[i]
+    return birth
+
+
+@_kernel
+def death(fitness, chance, omega):
+    """
+    Decides which animals die, with probability :math:`\\omega(1-\\Phi)`.
+
+    :param chance: numpy.ndarray, uniform random numbers.
+    :return: numpy.ndarray, True for animals that die.
+    """
+    dies = np.empty(len(fitness), dtype=np.bool_)
+    for i in range(len(fitness)):
+        dies[i] = chance[i] < omega * (1 - fitness[i])
+    return dies
+
+
+class CompiledPopulation(bp.SpeciesPopulation):
+    """
+    This class stores all animals of one species as contiguous arrays, and
+    carries out the phases of the annual cycle with the kernels of this
+    module.
+    """
+
+    def _fitness_parameters(self):
+        """
+        The parameters of the fitness formula.
+
+        :return: tuple.
+        """
+        p = self.parameters
+        return p.a_half, p.phi_age, p.w_half, p.phi_weight
+
+    def update_fitness(self):
+        """
+        Recomputes the fitness of all animals.
+        """
+        self.fitness = fitness(self.age, self.weight,
+                               *self._fitness_parameters())
+
+    def eat_fodder(self, fodder):
+        """
+        Herbivores eat in order of descending fitness in each cell, see
+        :func:`eat_fodder`. Assumes that the animals are sorted by fitness.
+
+        :param fodder: numpy.ndarray, fodder in each cell. Updated in place.
+        """
+        p = self.parameters
+        eat_fodder(fodder, self.cell, self.weight, float(p.F), float(p.beta))
+        self.update_fitness()
+
+    def hunt(self, herbivores, rng, n_cells):
+        """
+        Carnivores eat in order of descending fitness in each cell, see
+        :func:`hunt`. The kernel is seeded from rng. Assumes that the
+        herbivores are sorted by fitness.
+
+        :param herbivores: SpeciesPopulation, the prey.
+        :param rng: numpy.random.Generator.
+        :param n_cells: int, number of cells on the island.
+        """
+        if len(herbivores) == 0 or len(self) == 0:
+            return
+        p = self.parameters
+        self.sort_by_fitness()
+        seed(int(rng.integers(2 ** 32)))
+        killed = hunt(*herbivores.cell_slices(n_cells), herbivores.weight,
+                      herbivores.fitness, *self.cell_slices(n_cells),
+                      self.age, self.weight, self.fitness, float(p.F),
+                      float(p.beta), float(p.DeltaPhiMax),
+                      *self._fitness_parameters())
+        herbivores.keep(~killed)
+
+    def reproduction(self, rng, n_cells):
+        """
+        Every animal gives birth as in
+        :meth:`biosim.population.SpeciesPopulation.reproduction`, with the
+        same random numbers, decided by :func:`reproduction`.
+
+        :param rng: numpy.random.Generator.
+        :param n_cells: int, number of cells on the island.
+        """
+        n_animals = len(self)
+        if n_animals == 0:
+            return
+        p = self.parameters
+        newborn_weight = rng.normal(p.w_birth, p.sigma_birth, n_animals)
+        birth = reproduction(
+            self.weight, self.fitness, self.count_per_cell(n_cells)[self.cell],
+            rng.random(n_animals), newborn_weight, float(p.gamma),
+            float(p.zeta), float(p.w_birth), float(p.sigma_birth),
+            float(p.xi))
+        self.update_fitness()
+        self.add(np.zeros(np.count_nonzero(birth)), newborn_weight[birth],
+                 self.cell[birth])
+
+    def death(self, rng):
+        """
+        Every animal dies with probability :math:`\\omega(1-\\Phi)`, decided
+        by :func:`death`.
+
+        :param rng: numpy.random.Generator.
+        """
+        self.update_fitness()
+        self.keep(~death(self.fitness, rng.random(len(self)),
+                         float(self.parameters.omega)))
+
+
+class CompiledIsland(bi.ArrayIsland):
+    """
+    This class generates the island with the animals stored as arrays, and
+    the annual cycle carried out by the kernels of this module.
+    """
+
+    def __init__(self, island_map=None, seed=None):
+        """
+        This method creates variables needed for the class.
+
+        :param island_map: str, multi-line string specifying the island.
+        :param seed: int, seed of the random number generator.
+        """
+        super().__init__(island_map, seed=seed)
+
+        self.herbivores = CompiledPopulation(self.animal_types[0])
+        self.carnivores = CompiledPopulation(self.animal_types[1])
@@ -0,0 +1,523 @@
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`biosim.export` defines sinks that write the history of a simulation to
+disk in chunks while it runs, and readers that read it back lazily.
+
+Every year, a sink takes a snapshot of the island: the number of herbivores
+and carnivores and the fodder in every cell, and optionally the species,
+age, weight and position of every animal. The snapshots are collected in
+memory until a chunk of years is complete, and the chunk is then handed to a
+writer thread, which writes it as one shard while the simulation goes on.
+The number of chunks waiting to be written is bounded, so that memory use
+stays bounded if the disk can not keep up.
+
+Two formats are supported:
+
+    * :class:`NpzSink` writes one uncompressed ``.npz`` file per chunk.
+      :class:`NpzHistory` reads the arrays back memory-mapped, so only the
+      years that are used are read from disk.
+    * :class:`ParquetSink` writes one Parquet file of cell statistics, and
+      optionally one of animals, per chunk, with pandas. Writing Parquet
+      requires pyarrow or fastparquet. :class:`ParquetHistory` reads one
+      shard at a time, when a year in it is requested.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import abc
+import bisect
+import glob
+import os
+import queue
+import struct
+import threading
+import zipfile
+
+import numpy as np
+
+GRIDS = ("herbivores", "carnivores", "fodder")
+ANIMAL_COLUMNS = ("year", "species", "age", "weight", "row", "col")
+
+
+class HistorySink(abc.ABC):
+    """
+    This class collects snapshots of an island into chunks, and writes the
+    chunks in a background thread. Subclasses define the file format, and
+    can not be created without :meth:`write_chunk`.
+    """
+
+    extension = None
+
+    def __init__(self, directory, chunk_years=100, animals=False,
+                 queue_size=2):
+        """
+        This method creates variables needed for the class.
+
+        :param directory: str, directory of the shards. It is created if it
+                          does not exist.
+        :param chunk_years: int, number of years in each shard.
+        :param animals: bool, if True, the age, weight and position of every
+                        animal are written as well.
+        :param queue_size: int, largest number of chunks waiting to be
+                           written. When it is reached, the simulation
+                           waits for the writer.
+        """
+        if chunk_years < 1:
+            raise ValueError("The number of years in a chunk must be at "
+                             "least 1.")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.chunk_years = chunk_years
+        self.animals = animals
+        self.n_shards = 0
+        self.last_year = None
+        self._chunk = []
+        self._error = None
+        self._chunks = queue.Queue(queue_size)
+        self._writer = threading.Thread(target=self._write_chunks,
+                                        daemon=True)
+        self._writer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def shard_path(self, index):
+        """
+        The path of a shard.
+
+        :param index: int, number of the shard.
+        :return: str.
+        """
+        return os.path.join(self.directory,
+                            "history_{:05d}{}".format(index, self.extension))
+
+    def write(self, year, island):
+        """
+        Takes a snapshot of the island, and hands the chunk over to the
+        writer when it is complete. The snapshot is a copy, so the island
+        may change while the chunk is written.
+
+        :param year: int, the year that has been simulated.
+        :param island: biosim.island.Island.
+        """
+        self._check_writer()
+        herbivores, carnivores = island.count_grids
+        snapshot = {"year": year, "herbivores": herbivores,
+                    "carnivores": carnivores,
+                    "fodder": island.fodder.copy()}
+        if self.animals:
+            snapshot["animals"] = island.animal_arrays()
+        self._chunk.append(snapshot)
+        self.last_year = year
+        if len(self._chunk) == self.chunk_years:
+            self.flush()
+
+    def flush(self):
+        """
+        Hands the years collected so far over to the writer as one shard,
+        without waiting for it to be written.
+        """
+        if self._chunk:
+            self._put((self.n_shards, self._chunk))
+            self.n_shards += 1
+            self._chunk = []
+
+    def close(self):
+        """
+        Writes the remaining years, and waits until all shards are written.
+        """
+        if self._writer.is_alive():
+            self.flush()
+            self._put(None)
+            self._writer.join()
+        self._check_writer()
+
+    def _put(self, item):
+        """
+        Puts an item into the queue of the writer, and waits while the
+        queue is full.
+
+        :param item: tuple or None.
+        """
+        while True:
+            try:
+                self._chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                self._check_writer()
+
+    def _check_writer(self):
+        """
+        Raises the error that stopped the writer, if any.
+        """
+        if self._error is not None:
+            raise RuntimeError("Writing the history failed.") from self._error
+
+    def _write_chunks(self):
+        """
+        Writes the chunks from the queue until it receives None.
+        """
+        while True:
+            item = self._chunks.get()
+            if item is None:
+                return
+            if self._error is not None:
+                continue
+            index, chunk = item
+            try:
+                self.write_chunk(self.shard_path(index), chunk)
+            except Exception as error:
+                self._error = error
+
+    @staticmethod
+    def chunk_arrays(chunk):
+        """
+        Stacks the snapshots of a chunk into arrays: one element per year
+        for "years", one grid per year for each of :data:`GRIDS`, and, if
+        the animals are included, one element per animal for each of
+        :data:`ANIMAL_COLUMNS`, with "animal_" prepended to the names.
+        Species are 0 for herbivores and 1 for carnivores.
+
+        :param chunk: list, snapshots.
+        :return: dict.
+        """
+        arrays = {"years": np.array([snapshot["year"] for snapshot in chunk],
+                                    dtype=np.int64)}
+        for grid in GRIDS:
+            arrays[grid] = np.stack([snapshot[grid] for snapshot in chunk])
+        if "animals" in chunk[0]:
+            cols = chunk[0]["fodder"].shape[1]
+            columns = {column: [] for column in ANIMAL_COLUMNS}
+            for snapshot in chunk:
+                for species, (age, weight, cell) in enumerate(
+                        snapshot["animals"]):
+                    columns["year"].append(np.full(len(age),
+                                                   snapshot["year"]))
+                    columns["species"].append(np.full(len(age), species,
+                                                      dtype=np.int8))
+                    columns["age"].append(age)
+                    columns["weight"].append(weight)
+                    columns["row"].append(cell // cols)
+                    columns["col"].append(cell % cols)
+            for column, values in columns.items():
+                arrays["animal_" + column] = np.concatenate(values)
+        return arrays
+
+    @abc.abstractmethod
+    def write_chunk(self, path, chunk):
+        """
+        Writes a chunk as one shard.
+
+        :param path: str, path of the shard.
+        :param chunk: list, snapshots.
+        """
+
+
+class NpzSink(HistorySink):
+    """
+    This class writes the history as uncompressed ``.npz`` shards, with the
+    arrays of :meth:`HistorySink.chunk_arrays`.
+    """
+
+    extension = ".npz"
+
+    def write_chunk(self, path, chunk):
+        """
+        Writes a chunk as one ``.npz`` file. It is written under a temporary
+        name and renamed when complete.
+
+        :param path: str, path of the shard.
+        :param chunk: list, snapshots.
+        """
+        with open(path + ".tmp", "wb") as file:
+            np.savez(file, **self.chunk_arrays(chunk))
+        os.replace(path + ".tmp", path)
+
+
+class ParquetSink(HistorySink):
+    """
+    This class writes the history as Parquet shards, one of cell statistics
+    with the columns year, row, col and :data:`GRIDS`, and, if the animals
+    are included, one with the columns :data:`ANIMAL_COLUMNS`.
+    """
+
+    extension = ".parquet"
+
+    def write_chunk(self, path, chunk):
+        """
+        Writes a chunk as one or two Parquet files.
+
+        :param path: str, path of the shard.
+        :param chunk: list, snapshots.
+        """
+        import pandas as pd
+
+        arrays = self.chunk_arrays(chunk)
+        n_years, rows, cols = arrays["fodder"].shape
+        cells = pd.DataFrame({
+            "year": np.repeat(arrays["years"], rows * cols),
+            "row": np.tile(np.repeat(np.arange(rows), cols), n_years),
+            "col": np.tile(np.arange(cols), n_years * rows)})
+        for grid in GRIDS:
+            cells[grid] = arrays[grid].reshape(-1)
+        cells.to_parquet(path, index=False)
+        if self.animals:
+            pd.DataFrame({column: arrays["animal_" + column]
+                          for column in ANIMAL_COLUMNS}).to_parquet(
+                _animal_path(path), index=False)
+
+
+def _animal_path(path):
+    """
+    The path of the animal table belonging to a Parquet shard.
+
+    :param path: str, path of the shard.
+    :return: str.
+    """
+    return path[:-len(".parquet")] + "_animals.parquet"
+
+
+def load_npz_member(path, name):
+    """
+    Memory-maps an array stored uncompressed in an ``.npz`` file, without
+    reading it. Compressed arrays are read instead. The array must not hold
+    Python objects.
+
+    :param path: str, path of the ``.npz`` file.
+    :param name: str, name of the array.
+    :return: numpy.ndarray.
+    """
+    with zipfile.ZipFile(path) as archive:
+        info = archive.getinfo(name + ".npy")
+        if info.compress_type != zipfile.ZIP_STORED:
+            with archive.open(info) as member:
+                return np.lib.format.read_array(member)
+    with open(path, "rb") as file:
+        # The data of a stored member follow its local file header, whose
+        # file name and extra field lengths are at byte 26.
+        file.seek(info.header_offset + 26)
+        name_length, extra_length = struct.unpack("<HH", file.read(4))
+        file.seek(name_length + extra_length, os.SEEK_CUR)
+        version = np.lib.format.read_magic(file)
+        if version == (1, 0):
+            header = np.lib.format.read_array_header_1_0(file)
+        else:
+            header = np.lib.format.read_array_header_2_0(file)
+        shape, fortran_order, dtype = header
+        offset = file.tell()
+    if 0 in shape:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset,
+                     shape=shape, order="F" if fortran_order else "C")
+
+
+class History(abc.ABC):
+    """
+    This class reads the history written by a sink back, shard by shard.
+    Subclasses define the file format, and can not be created without
+    :meth:`read_years`, :meth:`grids` and :meth:`animals`.
+    """
+
+    extension = None
+
+    def __init__(self, directory):
+        """
+        This method creates variables needed for the class. Only the years
+        of every shard are read.
+
+        :param directory: str, directory of the shards.
+        """
+        self.paths = sorted(glob.glob(os.path.join(
+            directory, "history_[0-9][0-9][0-9][0-9][0-9]" +
+            self.extension)))
+        self._shard_years = [self.read_years(path) for path in self.paths]
+        self._first_years = [years[0] for years in self._shard_years]
+
+    def __len__(self):
+        """
+        Number of years in the history.
+        """
+        return sum(len(years) for years in self._shard_years)
+
+    @property
+    def years(self):
+        """
+        All years in the history.
+
+        :return: numpy.ndarray.
+        """
+        if not self._shard_years:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(self._shard_years)
+
+    def locate(self, year):
+        """
+        Finds the shard of a year, and the position of the year in it.
+
+        :param year: int.
+        :return: tuple, index of the shard and of the year.
+        """
+        shard = bisect.bisect_right(self._first_years, year) - 1
+        if shard >= 0:
+            position = np.searchsorted(self._shard_years[shard], year)
+            if (position < len(self._shard_years[shard]) and
+                    self._shard_years[shard][position] == year):
+                return shard, int(position)
+        raise KeyError("Year {} is not in the history.".format(year))
+
+    @abc.abstractmethod
+    def read_years(self, path):
+        """
+        Reads the years of a shard.
+
+        :param path: str, path of the shard.
+        :return: numpy.ndarray.
+        """
+
+    @abc.abstractmethod
+    def grids(self, year):
+        """
+        The grids of :data:`GRIDS` of one year.
+
+        :param year: int.
+        :return: dict, one array with the shape of the map for each grid.
+        """
+
+    @abc.abstractmethod
+    def animals(self, year):
+        """
+        The animals of one year.
+
+        :param year: int.
+        :return: dict, one array for each of :data:`ANIMAL_COLUMNS` except
+                 year, with one element per animal.
+        """
+
+
+class NpzHistory(History):
+    """
+    This class reads the history written by :class:`NpzSink`, with all
+    arrays memory-mapped.
+    """
+
+    extension = ".npz"
+
+    def read_years(self, path):
+        """
+        Reads the years of a shard.
+
+        :param path: str, path of the shard.
+        :return: numpy.ndarray.
+        """
+        return np.array(load_npz_member(path, "years"))
+
+    def shard(self, index):
+        """
+        The memory-mapped arrays of one shard, see
+        :meth:`HistorySink.chunk_arrays`.
+
+        :param index: int, number of the shard.
+        :return: dict.
+        """
+        with zipfile.ZipFile(self.paths[index]) as archive:
+            names = [name[:-len(".npy")] for name in archive.namelist()]
+        return {name: load_npz_member(self.paths[index], name)
+                for name in names}
+
+    def grid(self, name):
+        """
+        One grid in all years, as a list with one memory-mapped array of
+        shape (years, rows, cols) per shard.
+
+        :param name: str, one of :data:`GRIDS`.
+        :return: list.
+        """
+        return [load_npz_member(path, name) for path in self.paths]
+
+    def grids(self, year):
+        """
+        The grids of :data:`GRIDS` of one year, as memory-mapped arrays.
+
+        :param year: int.
+        :return: dict, one array with the shape of the map for each grid.
+        """
+        shard, position = self.locate(year)
+        return {name: load_npz_member(self.paths[shard], name)[position]
+                for name in GRIDS}
+
+    def animals(self, year):
+        """
+        The animals of one year, as memory-mapped arrays.
+
+        :param year: int.
+        :return: dict, one array for each of :data:`ANIMAL_COLUMNS` except
+                 year, with one element per animal.
+        """
+        shard, _ = self.locate(year)
+        path = self.paths[shard]
+        animal_years = load_npz_member(path, "animal_year")
+        start, end = np.searchsorted(animal_years, [year, year + 1])
+        return {column: load_npz_member(path, "animal_" + column)[start:end]
+                for column in ANIMAL_COLUMNS[1:]}
+
+
+class ParquetHistory(History):
+    """
+    This class reads the history written by :class:`ParquetSink`, one shard
+    at a time, with pandas.
+    """
+
+    extension = ".parquet"
+
+    def read_years(self, path):
+        """
+        Reads the years of a shard.
+
+        :param path: str, path of the shard.
+        :return: numpy.ndarray.
+        """
+        import pandas as pd
+
+        return np.unique(pd.read_parquet(path, columns=["year"])["year"])
+
+    def grids(self, year):
+        """
+        The grids of :data:`GRIDS` of one year.
+
+        :param year: int.
+        :return: dict, one array with the shape of the map for each grid.
+        """
+        import pandas as pd
+
+        shard, _ = self.locate(year)
+        cells = pd.read_parquet(self.paths[shard],
+                                filters=[("year", "==", year)])
+        shape = (cells["row"].max() + 1, cells["col"].max() + 1)
+        result = {}
+        for name in GRIDS:
+            grid = np.zeros(shape, dtype=cells[name].dtype)
+            grid[cells["row"], cells["col"]] = cells[name]
+            result[name] = grid
+        return result
+
+    def animals(self, year):
+        """
+        The animals of one year.
+
+        :param year: int.
+        :return: dict, one array for each of :data:`ANIMAL_COLUMNS` except
+                 year, with one element per animal.
+        """
+        import pandas as pd
+
+        shard, _ = self.locate(year)
+        animals = pd.read_parquet(_animal_path(self.paths[shard]),
+                                  filters=[("year", "==", year)])
+        return {column: animals[column].to_numpy()
+                for column in ANIMAL_COLUMNS[1:]}
@@ -12,9 +12,13 @@ __author__ = "Erik Rullestad", "Håvard Molversmyr"
 __email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
 
 
+import random
+
 import numpy as np
 
+import biosim.animals as ba
 import biosim.landscape as bl
+import biosim.population as bp
 
 
 class Island:
@@ -22,6 +26,13 @@ class Island:
     This class generates the island Rossumøya and its ecosystem behaviour.
     """
 
+    LANDSCAPE_TYPES = {"J": bl.Jungle, "S": bl.Savannah, "D": bl.Desert,
+                       "M": bl.Mountain, "O": bl.Ocean}
+    PHASES_BEFORE_MIGRATION = ("sort_by_fitness", "eat_request_herbivore",
+                               "eat_request_carnivore", "reproduction")
+    PHASES_AFTER_MIGRATION = ("aging", "weight_loss", "death")
+    RANDOM_PHASES = ("reproduction",)
+
     STANDARD_MAP = """\
                        OOOOOOOOOOOOOOOOOOOOO
                        OOOOOOOOSMMMMJJJJJJJO
@@ -37,10 +48,28 @@ class Island:
                        OOOSSSSJJJJJJJOOOOOOO
                        OOOOOOOOOOOOOOOOOOOOO"""
 
-    def __init__(self, island_map=None):
+    def __init__(self, island_map=None, active_set=False, seed=None):
         """
         This method creates variables needed for the class.
+
+        :param island_map: str, multi-line string specifying the island.
+        :param active_set: bool, if True, the phases of the annual cycle
+                           skip every habitable cell without animals. The
+                           fodder of all cells still regrows.
+        :param seed: int, seed of the NumPy random number generator used for
+                     vectorised phases. If None, the seed is drawn from the
+                     random module, so that seeding random is enough to make
+                     the island reproducible.
+
+        The island binds its own subclasses of the animal and landscape
+        classes, with the parameters the classes have when the island is
+        created, see :meth:`set_parameters`.
         """
+        self.animal_types = tuple(species.bind()
+                                  for species in (ba.Herbivore, ba.Carnivore))
+        self.landscape_types = {
+            code: landscape.bind(self.animal_types)
+            for code, landscape in self.LANDSCAPE_TYPES.items()}
 
         if island_map is None:
             self.island_map = self.STANDARD_MAP
@@ -51,6 +80,51 @@ class Island:
         self.validate_map_string()
         self.numpy_map = self.landscape_position_in_map()
 
+        self.n_cells = self.numpy_map.size
+        self.row_position, self.col_position = np.divmod(
+            np.arange(self.n_cells), self.numpy_map.shape[1])
+        self.neighbours = self.neighbour_table()
+        self.cells = list(self.numpy_map.flat)
+        self.cell_positions = {
+            cell: divmod(index, self.numpy_map.shape[1])
+            for index, cell in enumerate(self.cells)
+        }
+        self.surrounding_cells = [
+            tuple(self.cells[neighbour] for neighbour in neighbours
+                  if neighbour >= 0)
+            for neighbours in self.neighbours
+        ]
+
+        self.habitable = np.array([cell.habitable for cell in self.cells])
+        self.habitable_cells = np.flatnonzero(self.habitable)
+        self.landscape_codes = np.array(list("".join(self.string_map)))
+        self.jungle_cells = np.flatnonzero(self.landscape_codes == "J")
+        self.savannah_cells = np.flatnonzero(self.landscape_codes == "S")
+        self.active_set = active_set
+        self._visited = None
+
+        self.fodder = np.zeros(self.numpy_map.shape)
+        self.f_max = np.zeros(self.numpy_map.shape)
+        self.alpha = np.zeros(self.numpy_map.shape)
+        for index, cell in enumerate(self.cells):
+            cell.bind_fodder(self.fodder.reshape(-1), index)
+        self.update_fodder_parameters()
+
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.rng = np.random.default_rng(seed)
+
+    def __setstate__(self, state):
+        """
+        Restores a pickled island. The cells are pickled with their own
+        fodder, and are bound to the fodder array of the island again.
+
+        :param state: dict.
+        """
+        self.__dict__.update(state)
+        for index, cell in enumerate(self.cells):
+            cell.bind_fodder(self.fodder.reshape(-1), index)
+
     def validate_map_string(self):
         """
         Validates that a the input map string follows the constraints of the
@@ -93,80 +167,408 @@ class Island:
             (len(self.string_map), len(self.string_map[0])), dtype=object)
         for x, line in enumerate(self.string_map):
             for y, cell in enumerate(line):
-                if cell == "J":
-                    numpy_map[x, y] = bl.Jungle()
-                elif cell == "S":
-                    numpy_map[x, y] = bl.Savannah()
-                elif cell == "D":
-                    numpy_map[x, y] = bl.Desert()
-                elif cell == "M":
-                    numpy_map[x, y] = bl.Mountain()
-                elif cell == "O":
-                    numpy_map[x, y] = bl.Ocean()
+                numpy_map[x, y] = self.landscape_types[cell]()
         return numpy_map
 
+    def neighbour_table(self):
+        """
+        Finds the flat index of the four neighbours of every cell, in the
+        order below, above, right and left. Neighbours outside of the map are
+        given the index -1.
+
+        :return: numpy.ndarray, shape (cells, 4).
+        """
+        rows, cols = self.numpy_map.shape
+        own = np.arange(self.n_cells)
+        x, y = self.row_position, self.col_position
+        return np.column_stack((
+            np.where(x + 1 < rows, own + cols, -1),
+            np.where(x - 1 >= 0, own - cols, -1),
+            np.where(y + 1 < cols, own + 1, -1),
+            np.where(y - 1 >= 0, own - 1, -1),
+        ))
+
+    @property
+    def parameters(self):
+        """
+        The parameter sets of the island, see :mod:`biosim.parameters`.
+
+        :return: dict, parameter sets by species or landscape code.
+        """
+        parameters = {species.__name__: species.parameters
+                      for species in self.animal_types}
+        parameters.update({code: land.parameters
+                           for code, land in self.landscape_types.items()})
+        return parameters
+
+    def set_animal_parameters(self, species, params):
+        """
+        Sets parameters of the animals of one species on this island only.
+        The parameter set of the species is replaced by a new one, which
+        applies from the next phase of the annual cycle.
+
+        :param species: str, "Herbivore" or "Carnivore".
+        :param params: dict, the new parameter values.
+        """
+        for animal_type in self.animal_types:
+            if animal_type.__name__ == species:
+                animal_type.set_animal_parameters(params)
+                return
+        raise ValueError("Unknown species " + repr(species) + ". Allowed "
+                         "species: Herbivore and Carnivore.")
+
+    def set_landscape_parameters(self, landscape, params):
+        """
+        Sets parameters of one landscape type on this island only.
+
+        :param landscape: str, code letter of the landscape type.
+        :param params: dict, the new parameter values.
+        """
+        if landscape not in self.landscape_types:
+            raise ValueError("Unknown landscape " + repr(landscape) +
+                             ". Allowed landscapes: J, S, D, M and O.")
+        self.landscape_types[landscape].set_landscape_parameters(params)
+        self.update_fodder_parameters()
+
+    def set_parameters(self, parameters):
+        """
+        Sets parameters of several species and landscape types on this
+        island only.
+
+        :param parameters: dict, for each species or landscape code a dict
+                           of the new parameter values, e.g.
+                           {"Herbivore": {"zeta": 3.0}, "J": {"f_max": 700}}
+        """
+        for name, params in parameters.items():
+            if name in self.landscape_types:
+                self.set_landscape_parameters(name, params)
+            else:
+                self.set_animal_parameters(name, params)
+
+    def landscape_parameter(self, name):
+        """
+        Collects the current value of a landscape parameter for every cell.
+
+        :param name: str, name of the parameter, e.g. "f_max".
+        :return: numpy.ndarray, the parameter value with the shape of the
+                 map, or 0 for landscape types without the parameter.
+        """
+        values = {code: land.parameters[name] or 0
+                  for code, land in self.landscape_types.items()}
+        return np.array([values[code] for code in self.landscape_codes],
+                        dtype=float).reshape(self.numpy_map.shape)
+
+    def update_fodder_parameters(self):
+        """
+        Updates the maximum fodder :math:`f_{max}` and the regrowth rate
+        :math:`\\alpha` of every cell from the landscape parameters. Jungle
+        cells have regrowth rate 1, as they are refilled every year, and
+        cells without fodder have regrowth rate 0. This is done by
+        :meth:`set_landscape_parameters`, and must be done after setting the
+        parameters of the classes in :attr:`landscape_types` directly.
+        """
+        self.f_max[...] = self.landscape_parameter("f_max")
+        self.alpha[...] = self.landscape_parameter("alpha")
+        self.alpha.flat[self.jungle_cells] = 1
+
+    def regenerate(self):
+        """
+        Regenerates the fodder of all cells in one update,
+
+        .. math::
+
+            f_{ij} \\gets f_{max} - (1 - \\alpha)(f_{max} - f_{ij}),
+
+        which gives :math:`f_{max}` in Jungle cells and the same regrowth as
+        :meth:`biosim.landscape.Savannah.regenerate` in Savannah cells.
+        """
+        self.fodder[...] = self.f_max - (1 - self.alpha) * (
+                self.f_max - self.fodder)
+
     def find_cell_position(self, cell):
         """
-        Finds the numpy map coordinates of the cell.
+        Finds the numpy map coordinates of the cell, from the index built
+        when the island was created.
 
         :param cell: a landscape object in the numpy map.
         :return position: tuple (cell coordinates).
         """
-        coord_array = np.where(self.numpy_map == cell)
-        x, y = coord_array[0][0], coord_array[1][0]
-        position = tuple([x, y])
-        return position
+        return self.cell_positions[cell]
 
     def find_surrounding_cells(self, position):
         """
         Collects a cell's neighbouring landscape types, i.e. the set
-        :math:`C^{(i)}`.
+        :math:`C^{(i)}`, from the table built when the island was created.
 
         :param position: tuple (cell coordinates).
-        :return neighbour_cells: list, objects of adjacent cells.
+        :return neighbour_cells: tuple, objects of adjacent cells.
         """
-        neighbour_cells = []
         x, y = position
-        if x + 1 < len(self.numpy_map):
-            neighbour_cells.append(self.numpy_map[x + 1, y])
-        if x - 1 >= 0:
-            neighbour_cells.append(self.numpy_map[x - 1, y])
-        if y + 1 < len(self.numpy_map[0]):
-            neighbour_cells.append(self.numpy_map[x, y + 1])
-        if y - 1 >= 0:
-            neighbour_cells.append(self.numpy_map[x, y - 1])
-        return neighbour_cells
+        return self.surrounding_cells[x * self.numpy_map.shape[1] + y]
 
     def annual_cycle(self):
         """
-        This method carries out one cycle on the island.
+        This method carries out one cycle on the island. The fodder of all
+        cells is regenerated first, then the habitable cells are visited.
+        Ocean and Mountain cells are never visited, as they can not hold
+        animals.
+
+        The cycle consists of phases, and every phase is carried out for all
+        visited cells before the next phase starts. Apart from migration, the
+        phases only involve a single cell, so the order in which cells are
+        visited does not matter. Migration writes to a separate buffer that
+        replaces the populations once all cells are done, see
+        :meth:`migrate`.
+
+        In active set mode, cells without animals are skipped, as none of the
+        phases would change them. The visited cells are found at the start of
+        the cycle and again after migration, see :meth:`find_visited_cells`.
 
         :return total_species_population: tuple, first element is
                                          herbivore population and second
                                          element is carnivore population.
         """
-        for row in self.numpy_map:
-            for cell in row:
-                # Will only call on cells that have regenerate method, as only
-                # the subclasses Jungle and Savannah has this method.
-                if callable(getattr(cell, "regenerate", None)):
-                    cell.regenerate()
-                cell.sort_by_fitness()
-                cell.eat_request_herbivore()
-                cell.eat_request_carnivore()
-                cell.reproduction()
-
-                position = self.find_cell_position(cell)
-                neighbour_cells = self.find_surrounding_cells(position)
-                cell.migrate(neighbour_cells)
-
-                cell.update_cell_population()
-                cell.aging()
-                cell.weight_loss()
-                cell.death()
+        self.regenerate()
+        self._visited = self.find_visited_cells()
+        for phase in self.PHASES_BEFORE_MIGRATION:
+            self.run_phase(phase)
+        self.migrate()
+        self._visited = self.find_visited_cells()
+        for phase in self.PHASES_AFTER_MIGRATION:
+            self.run_phase(phase)
+        self._visited = None
 
         return self.total_species_population
 
+    def find_visited_cells(self):
+        """
+        Finds the cells to visit, i.e. the habitable cells, without those
+        that have no animals in active set mode. The empty cells are found
+        from the number of animals of each species in every cell.
+
+        :return: numpy.ndarray, indices of the cells.
+        """
+        if not self.active_set:
+            return self.habitable_cells
+        n_herbivores, n_carnivores = self.species_counts()
+        return self.habitable_cells[
+            (n_herbivores + n_carnivores)[self.habitable_cells] > 0]
+
+    def visited_cells(self):
+        """
+        The cells visited by the phases of the annual cycle, as found at the
+        start of the cycle or after migration. Cells emptied by an earlier
+        phase of the same part of the cycle are still visited, which does not
+        change them. Outside the annual cycle, the cells are found anew.
+
+        :return: numpy.ndarray, indices of the cells.
+        """
+        if self._visited is None:
+            return self.find_visited_cells()
+        return self._visited
+
+    def run_phase(self, phase):
+        """
+        Carries out a phase of the annual cycle in every visited cell.
+
+        :param phase: str, name of a method of
+                      :class:`biosim.landscape.Landscape` that only
+                      involves the cell itself, e.g. "aging". Phases in
+                      RANDOM_PHASES are given the NumPy generator of the
+                      island.
+        """
+        args = (self.rng,) if phase in self.RANDOM_PHASES else ()
+        for index in self.visited_cells():
+            getattr(self.cells[index], phase)(*args)
+
+    def species_counts(self):
+        """
+        Finds the number of herbivores and the number of carnivores in every
+        cell.
+
+        :return: tuple, two arrays with one element per cell.
+        """
+        return tuple(
+            np.fromiter((len(cell.animal_population[index])
+                         for cell in self.cells), int, self.n_cells)
+            for index in range(2))
+
+    def species_statistics(self):
+        """
+        Finds, for both species, the number of animals, their total weight
+        and the sum of their fitness in every cell. The fitness is computed
+        with one NumPy call per species, see
+        :meth:`biosim.animals.Animal.batch_fitness`.
+
+        :return: tuple, for each species a tuple of three arrays with one
+                 element per cell.
+        """
+        statistics = []
+        for index, species in enumerate(self.animal_types):
+            counts = np.fromiter(
+                (len(cell.animal_population[index]) for cell in self.cells),
+                int, self.n_cells)
+            animals = [animal for cell in self.cells
+                       for animal in cell.animal_population[index]]
+            cell_index = np.repeat(np.arange(self.n_cells), counts)
+            weight = np.array([animal.weight for animal in animals],
+                              dtype=float)
+            fitness = species.batch_fitness(
+                [animal.age for animal in animals], weight)
+            statistics.append((
+                counts,
+                np.bincount(cell_index, weight, minlength=self.n_cells),
+                np.bincount(cell_index, fitness, minlength=self.n_cells)))
+        return tuple(statistics)
+
+    def animal_arrays(self):
+        """
+        Collects the age, weight and flat cell index of every animal, for
+        both species.
+
+        :return: tuple, for each species a tuple of three arrays with one
+                 element per animal.
+        """
+        arrays = []
+        for index in range(2):
+            counts = np.fromiter(
+                (len(cell.animal_population[index]) for cell in self.cells),
+                int, self.n_cells)
+            animals = [animal for cell in self.cells
+                       for animal in cell.animal_population[index]]
+            arrays.append((
+                np.array([animal.age for animal in animals], dtype=np.int64),
+                np.array([animal.weight for animal in animals], dtype=float),
+                np.repeat(np.arange(self.n_cells), counts)))
+        return tuple(arrays)
+
+    @property
+    def count_grids(self):
+        """
+        The number of herbivores and carnivores in every cell, as arrays
+        with the shape of the map, found in one pass over the cells.
+
+        :return: tuple, herbivore and carnivore counts.
+        """
+        return tuple(counts.reshape(self.numpy_map.shape)
+                     for counts in self.species_counts())
+
+    def cell_statistics(self):
+        """
+        Finds the number of herbivores, the number of carnivores and the
+        total herbivore mass of every cell.
+
+        :return: tuple, three arrays with one element per cell.
+        """
+        return self.species_counts() + (
+            np.array([cell.sum_of_herbivore_mass for cell in self.cells],
+                     dtype=float),)
+
+    def migration_probability(self):
+        """
+        Calculates the probability of moving from each cell to each of its
+        neighbours, for both species, as the propensity of moving to the
+        neighbour, see :meth:`biosim.landscape.Landscape.propensity`, divided
+        by the sum of the propensities of all four neighbours. The
+        propensities :math:`e^{\\lambda \\epsilon}` of all cells are computed
+        as one array per species, see :meth:`propensity_exponents`, and
+        normalised in log space, see :meth:`normalise_propensities`.
+
+        :return: tuple, arrays of shape (cells, 4) for herbivores and
+                 carnivores. Rows of cells without habitable neighbours are
+                 zero.
+        """
+        n_herbivores, n_carnivores, herb_mass = self.cell_statistics()
+        return tuple(
+            # The last element is looked up by neighbours outside the map
+            self.normalise_propensities(
+                np.append(exponent, -np.inf)[self.neighbours])
+            for exponent in self.propensity_exponents(
+                self.animal_types, self.fodder.reshape(-1), n_herbivores,
+                n_carnivores, herb_mass, self.habitable))
+
+    @staticmethod
+    def propensity_exponents(animal_types, fodder, n_herbivores,
+                             n_carnivores, herb_mass, habitable):
+        """
+        Calculates the exponents :math:`\\lambda \\epsilon` of the migration
+        propensities of a set of cells, for both species.
+
+        :param animal_types: tuple, herbivore and carnivore classes.
+        :param fodder: numpy.ndarray, fodder of each cell.
+        :param n_herbivores: numpy.ndarray, herbivores in each cell.
+        :param n_carnivores: numpy.ndarray, carnivores in each cell.
+        :param herb_mass: numpy.ndarray, herbivore mass in each cell.
+        :param habitable: numpy.ndarray, bool, whether animals can move to
+                          each cell.
+        :return: tuple, herbivore and carnivore arrays, -inf in cells that
+                 are not habitable.
+        """
+        herb_parameters, carn_parameters = (
+            species.parameters for species in animal_types)
+        herb_abundance = fodder / ((n_herbivores + 1) * herb_parameters.F)
+        carn_abundance = herb_mass / ((n_carnivores + 1) * carn_parameters.F)
+        return tuple(
+            np.where(habitable, parameters.lambda_ * abundance, -np.inf)
+            for parameters, abundance in ((herb_parameters, herb_abundance),
+                                          (carn_parameters, carn_abundance)))
+
+    @staticmethod
+    def normalise_propensities(exponent):
+        """
+        Normalises the propensities :math:`e^{\\lambda \\epsilon}` of moving
+        to each of the four neighbours of a set of cells to probabilities.
+        The largest exponent of each cell is subtracted first, so that large
+        relative fodder abundances do not overflow.
+
+        :param exponent: numpy.ndarray, shape (cells, 4), -inf for
+                         neighbours animals can not move to.
+        :return: numpy.ndarray, shape (cells, 4). Rows of cells without
+                 habitable neighbours are zero.
+        """
+        largest = exponent.max(axis=1, keepdims=True)
+        propensity = np.zeros_like(exponent)
+        open_cells = np.isfinite(largest[:, 0])
+        propensity[open_cells] = np.exp(
+            exponent[open_cells] - largest[open_cells])
+        total = propensity.sum(axis=1, keepdims=True)
+        return np.divide(propensity, total, out=propensity, where=total > 0)
+
+    def migrate(self):
+        """
+        Migrates the animals of all visited cells in two steps. First, the
+        migration probabilities are computed once for the whole island, and
+        every cell decides where its animals go, see
+        :meth:`biosim.landscape.Landscape.migration_destinations`. Then the
+        animals are written to a destination buffer holding the new
+        population of every cell, which replaces the populations of all cells
+        at once. No animal can thus move twice, and no cell sees animals move
+        in before all cells have decided.
+        """
+        herb_probability, carn_probability = self.migration_probability()
+        visited = self.visited_cells()
+        destinations = [
+            self.cells[index].migration_destinations(
+                [herb_probability[index], carn_probability[index]], self.rng)
+            for index in visited
+        ]
+
+        buffer = {}
+        for index, cell_destinations in zip(visited, destinations):
+            for species, destination in enumerate(cell_destinations):
+                targets = np.where(destination < 0, index,
+                                   self.neighbours[index, destination])
+                for animal, target in zip(
+                        self.cells[index].animal_population[species],
+                        targets.tolist()):
+                    buffer.setdefault(target, [[], []])[species].append(
+                        animal)
+
+        for index in visited:
+            self.cells[index].animal_population = [[], []]
+        for index, population in buffer.items():
+            self.cells[index].animal_population = population
+
     @property
     def population_in_each_cell(self):
         """
@@ -176,24 +578,8 @@ class Island:
         :return: numpy.ndarray, the herbivore and carnivore population in the
                  first and second element of each list, respectively.
         """
-        number_of_herbivores = []
-        number_of_carnivores = []
-        row_position = []
-        col_position = []
-
-        for row in self.numpy_map:
-            for cell in row:
-                position = self.find_cell_position(cell)
-                row_position.append(position[0])
-                col_position.append(position[1])
-                number_of_herbivores.append(
-                    len(cell.animal_population[0]))
-                number_of_carnivores.append(
-                    len(cell.animal_population[1]))
-
-        return np.column_stack((row_position, col_position,
-                                number_of_herbivores,
-                                number_of_carnivores))
+        return np.column_stack((self.row_position, self.col_position) +
+                               self.species_counts())
 
     @property
     def total_species_population(self):
@@ -278,4 +664,331 @@ class Island:
                                      " integer.\n2. Animal weight has to be"
                                      " a non-negative number(float).")
 
-            cell.cell_population(dictionary["pop"])
+            self.place_population((map_row, map_col), dictionary["pop"])
+
+    def place_population(self, position, population):
+        """
+        Puts a validated population in the cell at the given position.
+
+        :param position: tuple (cell coordinates).
+        :param population: list, dictionaries with keys "species", "age" and
+                           "weight".
+        """
+        self.numpy_map[position].cell_population(population)
+
+    def populate_from_arrays(self, loc_row, loc_col, species, age, weight):
+        """
+        Populates the island with animals given as columns, one element per
+        animal, instead of one dictionary per animal as in
+        :meth:`populate_the_island`. The columns are validated with one
+        NumPy operation per condition, and the animals are inserted in
+        their cells in one go.
+
+        :param loc_row: array_like, row of each animal.
+        :param loc_col: array_like, column of each animal.
+        :param species: array_like, "Herbivore" or "Carnivore", or the
+                        codes 0 and 1, for each animal.
+        :param age: array_like, non-negative integer age of each animal.
+        :param weight: array_like, non-negative weight of each animal.
+        """
+        loc_row, loc_col, age, weight = (
+            np.asarray(column) for column in (loc_row, loc_col, age, weight))
+        species = np.asarray(species)
+        if species.dtype.kind == "S":
+            species = species.astype(str)
+        if not len(loc_row) == len(loc_col) == len(species) == len(age) == \
+                len(weight):
+            raise ValueError("All columns must have one element per "
+                             "animal.")
+
+        rows, cols = self.numpy_map.shape
+        if (np.any(loc_row != np.floor(loc_row)) or
+                np.any((loc_row < 0) | (loc_row >= rows))):
+            raise ValueError("This x-value is not valid, please enter an "
+                             "integer between 0 and " + str(rows - 1))
+        if (np.any(loc_col != np.floor(loc_col)) or
+                np.any((loc_col < 0) | (loc_col >= cols))):
+            raise ValueError("This y-value is not valid, please enter an "
+                             "integer between 0 and " + str(cols - 1))
+        cell = (loc_row * cols + loc_col).astype(np.intp)
+        if not np.all(self.habitable[cell]):
+            raise ValueError("Animals can not stay in Mountain or Ocean. "
+                             "Allowed landscapes: Jungle, Savannah and "
+                             "Desert.")
+
+        # The codes are checked before they are cast, so that out of range
+        # codes can not wrap around to 0 or 1
+        if species.dtype.kind in "iu":
+            known = np.isin(species, (0, 1))
+        else:
+            known = np.isin(species, ("Herbivore", "Carnivore"))
+        if not np.all(known):
+            raise ValueError("Unknown species. Allowed species: Herbivore "
+                             "and Carnivore.")
+        if species.dtype.kind in "iu":
+            code = species.astype(np.int8)
+        else:
+            code = (species == "Carnivore").astype(np.int8)
+
+        if (not np.all(np.isfinite(age)) or
+                not np.all(np.isfinite(weight)) or np.any(age < 0) or
+                np.any(weight < 0) or np.any(age != np.floor(age))):
+            raise ValueError("Violated one/both of two conditions:\n"
+                             "1. Animal age has to be a non-negative"
+                             " integer.\n2. Animal weight has to be"
+                             " a non-negative number(float).")
+
+        self.place_arrays(cell, code, age.astype(np.int64),
+                          weight.astype(float))
+
+    def place_arrays(self, cell, code, age, weight):
+        """
+        Puts validated animals in their cells, in the order of the arrays,
+        as if they were given to :meth:`place_population` in that order.
+
+        :param cell: numpy.ndarray, flat cell index of each animal.
+        :param code: numpy.ndarray, 0 for herbivores and 1 for carnivores.
+        :param age: numpy.ndarray, age of each animal.
+        :param weight: numpy.ndarray, weight of each animal.
+        """
+        species = self.animal_types
+        for index, kind, animal_age, animal_weight in zip(
+                cell.tolist(), code.tolist(), age.tolist(), weight.tolist()):
+            self.cells[index].animal_population[kind].append(
+                species[kind](age=animal_age, weight=animal_weight))
+
+    def animal_state(self):
+        """
+        Packs the complete state of every animal into arrays, in the order
+        of the animals in their cells, for checkpoints. The fitness is NaN
+        for animals whose fitness is to be recomputed. The newborn weight is
+        not packed, as it is drawn anew whenever a birth is attempted.
+
+        :return: dict, arrays named by species and attribute.
+        """
+        state = {}
+        arrays = self.animal_arrays()
+        for index, name in enumerate(("herbivore", "carnivore")):
+            age, weight, cell = arrays[index]
+            animals = [animal for cell in self.cells
+                       for animal in cell.animal_population[index]]
+            state[name + "_age"] = age
+            state[name + "_weight"] = weight
+            state[name + "_cell"] = cell
+            state[name + "_fitness"] = np.array(
+                [np.nan if animal._recompute_phi else animal._phi
+                 for animal in animals], dtype=float)
+        return state
+
+    def set_animal_state(self, state):
+        """
+        Replaces all animals by those packed by :meth:`animal_state`. The
+        animals are restored without drawing random numbers.
+
+        :param state: dict, arrays named by species and attribute.
+        """
+        for cell in self.cells:
+            cell.animal_population = [[], []]
+        for index, (name, species) in enumerate(
+                zip(("herbivore", "carnivore"), self.animal_types)):
+            for age, weight, cell, fitness in zip(
+                    state[name + "_age"].tolist(),
+                    state[name + "_weight"].tolist(),
+                    state[name + "_cell"].tolist(),
+                    state[name + "_fitness"].tolist()):
+                animal = species.__new__(species)
+                animal._age = age
+                animal._weight = weight
+                animal._recompute_phi = fitness != fitness
+                animal._phi = None if animal._recompute_phi else fitness
+                self.cells[cell].animal_population[index].append(animal)
+
+
+class ArrayIsland(Island):
+    """
+    This class generates the island with the animals stored as arrays, see
+    :mod:`biosim.population`. Every phase of the annual cycle is carried out
+    for all cells at once, and the random numbers are drawn from a NumPy
+    generator.
+    """
+
+    def __init__(self, island_map=None, seed=None):
+        """
+        This method creates variables needed for the class.
+
+        :param island_map: str, multi-line string specifying the island.
+        :param seed: int, seed of the random number generator.
+        """
+        super().__init__(island_map, seed=seed)
+
+        self.herbivores = bp.SpeciesPopulation(self.animal_types[0])
+        self.carnivores = bp.SpeciesPopulation(self.animal_types[1])
+
+    def place_population(self, position, population):
+        """
+        Adds a validated population to the arrays of each species.
+
+        :param position: tuple (cell coordinates).
+        :param population: list, dictionaries with keys "species", "age" and
+                           "weight".
+        """
+        cell = position[0] * self.numpy_map.shape[1] + position[1]
+        for species, animals in (
+                (self.herbivores,
+                 [a for a in population if a["species"] == "Herbivore"]),
+                (self.carnivores,
+                 [a for a in population if a["species"] != "Herbivore"])):
+            age = np.array([a["age"] for a in animals], dtype=np.int64)
+            weight = np.array([a["weight"] for a in animals], dtype=float)
+            # Animals of age 0 get a birth weight drawn around the given
+            # weight, as in the constructor of biosim.animals.Animal.
+            newborn = age == 0
+            weight[newborn] = self.rng.normal(
+                weight[newborn], species.parameters.sigma_birth)
+            species.add(age, weight, np.full(len(animals), cell))
+
+    def place_arrays(self, cell, code, age, weight):
+        """
+        Adds validated animals to the arrays of each species. Animals of age
+        0 get a birth weight drawn around the given weight, with one draw
+        for all of them.
+
+        :param cell: numpy.ndarray, flat cell index of each animal.
+        :param code: numpy.ndarray, 0 for herbivores and 1 for carnivores.
+        :param age: numpy.ndarray, age of each animal.
+        :param weight: numpy.ndarray, weight of each animal.
+        """
+        for index, species in enumerate((self.herbivores, self.carnivores)):
+            selected = code == index
+            species_weight = weight[selected]
+            newborn = age[selected] == 0
+            species_weight[newborn] = self.rng.normal(
+                species_weight[newborn], species.parameters.sigma_birth)
+            species.add(age[selected], species_weight, cell[selected])
+
+    def eat_request_carnivore(self):
+        """
+        Carnivores eat in order of descending fitness in each cell, see
+        :meth:`biosim.population.SpeciesPopulation.hunt`.
+        """
+        self.carnivores.hunt(self.herbivores, self.rng, self.n_cells)
+
+    def species_counts(self):
+        """
+        Finds the number of herbivores and the number of carnivores in every
+        cell.
+
+        :return: tuple, two arrays with one element per cell.
+        """
+        return (self.herbivores.count_per_cell(self.n_cells),
+                self.carnivores.count_per_cell(self.n_cells))
+
+    def cell_statistics(self):
+        """
+        Finds the number of herbivores, the number of carnivores and the
+        total herbivore mass of every cell.
+
+        :return: tuple, three arrays with one element per cell.
+        """
+        return self.species_counts() + (
+            self.herbivores.mass_per_cell(self.n_cells),)
+
+    def animal_arrays(self):
+        """
+        Copies the age, weight and flat cell index of every animal, for both
+        species.
+
+        :return: tuple, for each species a tuple of three arrays with one
+                 element per animal.
+        """
+        return tuple((species.age.copy(), species.weight.copy(),
+                      species.cell.copy())
+                     for species in (self.herbivores, self.carnivores))
+
+    def animal_state(self):
+        """
+        Copies the arrays of both species, for checkpoints.
+
+        :return: dict, arrays named by species and attribute.
+        """
+        state = {}
+        for name, species in (("herbivore", self.herbivores),
+                              ("carnivore", self.carnivores)):
+            for attribute in ("age", "weight", "fitness", "cell"):
+                state[name + "_" + attribute] = getattr(
+                    species, attribute).copy()
+        return state
+
+    def set_animal_state(self, state):
+        """
+        Replaces the arrays of both species by those packed by
+        :meth:`animal_state`.
+
+        :param state: dict, arrays named by species and attribute.
+        """
+        for name, species in (("herbivore", self.herbivores),
+                              ("carnivore", self.carnivores)):
+            for attribute, dtype in (("age", np.int64), ("weight", float),
+                                     ("fitness", float), ("cell", np.intp)):
+                setattr(species, attribute, np.array(
+                    state[name + "_" + attribute], dtype=dtype))
+
+    def species_statistics(self):
+        """
+        Finds, for both species, the number of animals, their total weight
+        and the sum of their fitness in every cell.
+
+        :return: tuple, for each species a tuple of three arrays with one
+                 element per cell.
+        """
+        return tuple(
+            (species.count_per_cell(self.n_cells),
+             species.mass_per_cell(self.n_cells),
+             np.bincount(species.cell, weights=species.fitness,
+                         minlength=self.n_cells))
+            for species in (self.herbivores, self.carnivores))
+
+    def migrate(self):
+        """
+        Migrates the animals of both species, with the migration
+        probabilities computed once for the whole island.
+        """
+        herb_probability, carn_probability = self.migration_probability()
+        self.herbivores.migrate(self.rng, herb_probability, self.neighbours)
+        self.carnivores.migrate(self.rng, carn_probability, self.neighbours)
+
+    def annual_cycle(self):
+        """
+        This method carries out one cycle on the island, with each phase
+        carried out for all cells before the next phase starts.
+
+        :return total_species_population: tuple, first element is
+                                         herbivore population and second
+                                         element is carnivore population.
+        """
+        self.regenerate()
+        self.herbivores.sort_by_fitness()
+        self.herbivores.eat_fodder(self.fodder.reshape(-1))
+        self.eat_request_carnivore()
+
+        for species in (self.herbivores, self.carnivores):
+            species.reproduction(self.rng, self.n_cells)
+
+        self.migrate()
+
+        for species in (self.herbivores, self.carnivores):
+            species.aging()
+            species.weight_loss()
+            species.death(self.rng)
+
+        return self.total_species_population
+
+    @property
+    def total_species_population(self):
+        """
+        Finds the total number of herbivores and carnivores on the island, in
+        the first and second element of the returned tuple, respectively.
+
+        :return: tuple.
+        """
+        return len(self.herbivores), len(self.carnivores)
@@ -15,24 +15,70 @@ __email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
 import math
 import random
 
+import numpy as np
+
 import biosim.animals as ba
+import biosim.parameters as bpa
 
 
 class Landscape:
     """
     This class decides the behaviour of the landscape.
+
+    As for the animals, the parameters are read from :attr:`parameters`,
+    and each island binds its own subclass of every landscape type, whose
+    cells hold animals of the species bound by the island, see
+    :meth:`bind`.
     """
 
     default_parameters = {"f_max": 0}
+    parameters = bpa.LandscapeParameters(default_parameters)
     habitable = None
+    animal_types = (ba.Herbivore, ba.Carnivore)
+
+    def __init_subclass__(cls, **kwargs):
+        """
+        Builds the parameter set of a subclass that defines its own default
+        parameters.
+        """
+        super().__init_subclass__(**kwargs)
+        if "default_parameters" in vars(cls):
+            cls.parameters = bpa.LandscapeParameters(cls.default_parameters)
 
     def __init__(self):
         """
         This method creates variables needed for the class.
         """
-        self.f = self.default_parameters["f_max"]
+        self._fodder = np.array([self.parameters.f_max], dtype=float)
+        self._fodder_index = 0
         self.animal_population = [[], []]
-        self.new_population = [[], []]
+
+    @property
+    def f(self):
+        """
+        Returns the amount of fodder in the cell.
+        """
+        return self._fodder[self._fodder_index]
+
+    @f.setter
+    def f(self, new_f):
+        """
+        Sets the amount of fodder in the cell.
+        """
+        self._fodder[self._fodder_index] = new_f
+
+    def bind_fodder(self, fodder, index):
+        """
+        Makes the fodder of the cell a view into an array holding the fodder
+        of all cells, e.g. :attr:`biosim.island.Island.fodder`. The current
+        amount of fodder of the cell is written to the array.
+
+        :param fodder: numpy.ndarray, one-dimensional view of the fodder.
+        :param index: int, index of the cell in the array.
+        """
+        fodder[index] = self.f
+        self._fodder = fodder
+        self._fodder_index = index
 
     @classmethod
     def set_landscape_parameters(cls, new_parameters):
@@ -40,12 +86,56 @@ class Landscape:
         This method allows for manual setting of landscape parameters,
         i.e. to change parameter values from default values to desired values.
 
+        The parameter set of the class is replaced by a new one.
+
         :param new_parameters: dict, dictionary with the new parameter values.
                                Only keys from the default parameter value dict
                                are valid.
         """
-        for key in new_parameters:
-            cls.default_parameters[key] = new_parameters[key]
+        cls.parameters = cls.parameters.replace(new_parameters)
+        cls.default_parameters.update(new_parameters)
+
+    @classmethod
+    def bind(cls, animal_types, parameters=None):
+        """
+        Creates a subclass of the landscape type with its own parameters,
+        whose cells hold animals of the given species classes, e.g. those
+        bound by :meth:`biosim.animals.Animal.bind`.
+
+        :param animal_types: tuple, herbivore and carnivore classes.
+        :param parameters: dict or LandscapeParameters, parameters of the
+                           subclass. Defaults to those of the landscape type.
+        :return: class.
+        """
+        if parameters is None:
+            parameters = cls.parameters
+        return bpa.BoundType(cls.__name__, (cls,), {
+            "__module__": cls.__module__, "__qualname__": cls.__qualname__,
+            "__doc__": cls.__doc__,
+            "default_parameters": dict(parameters),
+            "animal_types": tuple(animal_types)})
+
+    @classmethod
+    def _bind_arguments(cls):
+        """
+        The arguments of :meth:`bind` that create a class like this one,
+        e.g. when a bound class is unpickled.
+
+        :return: tuple.
+        """
+        return cls.animal_types, cls.parameters
+
+    def __getstate__(self):
+        """
+        Pickles the cell with its own amount of fodder only, instead of the
+        array of all cells it may be bound to, see :meth:`bind_fodder`.
+
+        :return: dict.
+        """
+        state = self.__dict__.copy()
+        state["_fodder"] = np.array([self.f], dtype=float)
+        state["_fodder_index"] = 0
+        return state
 
     def cell_population(self, population=None):
         """
@@ -53,16 +143,15 @@ class Landscape:
 
         :param population: list.
         """
+        herbivore, carnivore = self.animal_types
         for animal in population:
             if animal["species"] == "Herbivore":
                 self.animal_population[0].append(
-                    ba.Herbivore(age=animal["age"],
-                                 weight=animal["weight"])
+                    herbivore(age=animal["age"], weight=animal["weight"])
                 )
             else:
                 self.animal_population[1].append(
-                    ba.Carnivore(age=animal["age"],
-                                 weight=animal["weight"])
+                    carnivore(age=animal["age"], weight=animal["weight"])
                 )
 
     @property
@@ -93,17 +182,28 @@ class Landscape:
         """
         return sum([herb.weight for herb in self.animal_population[0]])
 
+    def update_fitness(self):
+        """
+        Computes the fitness of all animals in the cell with one NumPy call
+        per species, see :meth:`biosim.animals.Animal.population_fitness`.
+
+        :return: list, arrays with the fitness of the herbivores and the
+                 carnivores, in the order of the animal population lists.
+        """
+        return [animal_type.population_fitness(animals)
+                for animal_type, animals in zip(self.animal_types,
+                                                self.animal_population)]
+
     def sort_by_fitness(self):
         """
         Updates and sorts animals in a specific cell by fitness, in descending
         order.
         """
-        self.animal_population[0] = sorted(self.animal_population[0],
-                                           key=lambda x: x.fitness,
-                                           reverse=True)
-        self.animal_population[1] = sorted(self.animal_population[1],
-                                           key=lambda x: x.fitness,
-                                           reverse=True)
+        for index, fitness in enumerate(self.update_fitness()):
+            animals = self.animal_population[index]
+            self.animal_population[index] = [
+                animals[i] for i in np.argsort(-fitness, kind="stable")
+            ]
 
     def weight_loss(self):
         """
@@ -126,56 +226,119 @@ class Landscape:
     def death(self):
         """
         Updates the animal population list with the surviving animals after
-        every year.
+        every year. Each animal dies with the probability given in
+        :meth:`biosim.animals.Animal.death`, computed for all animals of a
+        species at once.
         """
+        for index, fitness in enumerate(self.update_fitness()):
+            death_probability = self.animal_types[index].parameters.omega * (
+                    1 - fitness)
+            self.animal_population[index] = [
+                animal for animal, probability in zip(
+                    self.animal_population[index], death_probability.tolist())
+                if not random.random() < probability
+            ]
 
-        self.animal_population[0] = [
-            animal for animal in self.animal_population[0] if not
-            animal.death()
-        ]
-        self.animal_population[1] = [
-            animal for animal in self.animal_population[1] if not
-            animal.death()
-        ]
-
-    def reproduction(self):
-        """
-        Finds out which animals for each species that reproduce, based on
-        reproduction probability, and adds a newborn of that species
-        to the cell.
+    def reproduction(self, rng=None):
         """
-        for species in self.animal_population:
-            newborn_animals = []
-            for animal in species:
-                if animal.reproduction_probability(len(species)):
-                    if isinstance(animal, ba.Herbivore):
-                        newborn_animals.append(ba.Herbivore())
-                    elif isinstance(animal, ba.Carnivore):
-                        newborn_animals.append(ba.Carnivore())
-                    animal.update_weight_after_birth()
-            species.extend(newborn_animals)
+        Finds out which animals for each species that reproduce, and adds a
+        newborn of that species to the cell for each of them.
+
+        An animal can only give birth if there are at least two animals of
+        its species in the cell, and if its weight is at least
+
+        .. math::
+
+            \\zeta (w_{birth} + \\sigma_{birth}).
+
+        For each species, the weights of the newborns of these animals are
+        drawn from :math:`N(w_{birth}, \\sigma_{birth})` in one normal
+        draw, and an animal that weighs at least its newborn gives birth
+        with the probability
+
+        .. math::
+
+            min(1, \\gamma \\times \\phi \\times (N-1)),
+
+        decided by one uniform draw, where :math:`N` is the number of
+        animals of the species in the cell. The newborns are created with
+        the drawn weights, and the weights of their mothers are reduced by
+        :math:`\\xi` times those weights.
+
+        All draws come from rng, which the island seeds from the seed of the
+        simulation: one normal and one uniform number per animal heavy
+        enough to give birth, per species and cell, every year.
+
+        :param rng: numpy.random.Generator. If not given, one is seeded from
+                    the random module.
+        """
+        if rng is None:
+            rng = np.random.default_rng(random.getrandbits(64))
+        for animal_type, species, fitness in zip(
+                self.animal_types, self.animal_population,
+                self.update_fitness()):
+            n_animals = len(species)
+            if n_animals < 2:
+                continue
+            p = animal_type.parameters
+            weight = np.fromiter((animal.weight for animal in species),
+                                 float, n_animals)
+            heavy = np.flatnonzero(
+                weight >= p.zeta * (p.w_birth + p.sigma_birth))
+            newborn_weight = rng.normal(p.w_birth, p.sigma_birth, len(heavy))
+            probability = np.minimum(
+                1, p.gamma * fitness[heavy] * (n_animals - 1))
+            birth = (weight[heavy] >= newborn_weight) & (
+                    rng.random(len(heavy)) < probability)
+
+            mothers = heavy[birth].tolist()
+            newborn_weight = newborn_weight[birth]
+            for mother, new_weight in zip(
+                    mothers, (weight[mothers] -
+                              p.xi * newborn_weight).tolist()):
+                species[mother].weight = new_weight
+            species.extend([animal_type.newborn(birth_weight)
+                            for birth_weight in newborn_weight.tolist()])
 
     def eat_request_herbivore(self):
         """
         Herbivores eats after request and update of available fodder.
         """
+        fodder = float(self.f)
+        appetite = self.animal_types[0].parameters.F
         for herbivore in self.animal_population[0]:
-            request = herbivore.default_parameters["F"]
-            if request <= self.f:
-                self.f -= request
+            request = appetite
+            if request <= fodder:
+                fodder -= request
             else:
-                request = self.f
-                self.f = 0
+                request = fodder
+                fodder = 0
             herbivore.eating(request)
+        self.f = fodder
 
     def eat_request_carnivore(self):
         """
-        Carnivore eats after request.
-        """
+        Carnivores eat in the order of the carnivore list, each trying to
+        kill the herbivores in order of ascending fitness, see
+        :meth:`biosim.animals.Carnivore.hunt`. The fitness of the herbivores
+        is computed once, kills are marked in a list of flags shared by all
+        carnivores, and the surviving herbivores are kept at the end, in
+        their previous order.
+        """
+        herbivores = self.animal_population[0]
+        if not herbivores or not self.animal_population[1]:
+            return
+        # Herbivores are sorted by descending fitness before they eat
+        prey = herbivores[::-1]
+        prey_fitness = self.animal_types[0].population_fitness(prey).tolist()
+        killed = [False] * len(prey)
         for carnivore in self.animal_population[1]:
-            self.animal_population[0] = carnivore.eating(
-                self.animal_population[0]
-            )
+            carnivore.hunt(prey, prey_fitness, killed)
+
+        self.animal_population[0] = [
+            herbivore for herbivore, dead in zip(herbivores, killed[::-1])
+            if not dead
+        ]
 
     @property
     def available_fodder_herbivore(self):
@@ -195,7 +358,7 @@ class Landscape:
         :return: float.
         """
         return self.f / ((self.number_of_herbivores + 1) *
-                         ba.Herbivore.default_parameters["F"])
+                         self.animal_types[0].parameters.F)
 
     @property
     def available_fodder_carnivore(self):
@@ -216,7 +379,7 @@ class Landscape:
         """
         return self.sum_of_herbivore_mass / (
                 (self.number_of_carnivores + 1) *
-                ba.Carnivore.default_parameters["F"])
+                self.animal_types[1].parameters.F)
 
     def propensity(self):
         """
@@ -240,11 +403,11 @@ class Landscape:
                  in first and second element of the tuple, respectively.
         """
         herbivore_propensity = math.exp(
-                    ba.Herbivore.default_parameters["lambda"] *
+                    self.animal_types[0].parameters.lambda_ *
                     self.available_fodder_herbivore
         )
         carnivore_propensity = math.exp(
-                    ba.Carnivore.default_parameters["lambda"] *
+                    self.animal_types[1].parameters.lambda_ *
                     self.available_fodder_carnivore
         )
 
@@ -253,79 +416,39 @@ class Landscape:
         else:
             return tuple([0, 0])
 
-    def directional_probability(self, animal, neighbour_cells):
-        """
-        This method estimates the propensity for each neighbouring cell, and
-        calculates the probability of herbivores migrating to that cell.
-        Stores the result in a list.
-
-        The propensity-dependent probability is calculated according to the
-        equation
-
-        .. math::
-
-            p_{i \\rightarrow j} = \\frac{\\pi_{i \\rightarrow j}}
-            {\\sum_{j \\in C^{(i)}} \\pi_{i \\rightarrow j}}
-
-        :param animal: object, either herbivore or carnivore.
-        :param neighbour_cells: list, the four adjacent cells.
-        :return probability_list: list, probabilities of moving to an
-                                  adjacent cell.
-        """
-        if isinstance(animal, ba.Herbivore):
-            propensities = [cell.propensity()[0]
-                            for cell in neighbour_cells]
-            probability_list = [propensity / sum(propensities)
-                                for propensity in propensities]
-        else:
-            propensities = [cell.propensity()[1]
-                            for cell in neighbour_cells]
-            probability_list = [propensity / sum(propensities)
-                                for propensity in propensities]
-        return probability_list
-
-    def choose_migration_cell(self, animal, neighbour_cells, probability_list):
-        """
-        A method to choose which of the adjacent cell the animal should
-        migrate to, given that it migrates, and moves the animal to that cell.
-
-        :param animal: object, either herbivore or carnivore.
-        :param probability_list: list, probabilities of moving to an adjacent
-                                 cell.
-        :param neighbour_cells: list, objects of adjacent cells.
-        """
-        p = random.random()
-        i = 0
-        while p > sum(probability_list[0:i]):
-            i += 1
-        animal.move(neighbour_cells[i - 1])
-
-    def migrate(self, neighbour_cells):
-        """
-        A method that migrates all animals in a cell iteratively.
-
-        :param neighbour_cells: list, objects of adjacent cells.
-        """
-        for species in self.animal_population:
-            if len(species) > 0:
-                probability_list = self.directional_probability(
-                    species[0], neighbour_cells)
-                for animal in species:
-                    if animal.migration_probability():
-                        self.choose_migration_cell(
-                            animal, neighbour_cells, probability_list)
-                    else:
-                        if isinstance(animal, ba.Herbivore):
-                            ba.Herbivore.move(animal, cell=self)
-                        elif isinstance(animal, ba.Carnivore):
-                            ba.Carnivore.move(animal, cell=self)
-
-    def update_cell_population(self):
-        """
-        Updates the animal population in the specific cell.
-        """
-        self.animal_population = self.new_population
-        self.new_population = [[], []]
+    def migration_destinations(self, probabilities, rng):
+        """
+        Decides which animals in the cell migrate, and where. For each
+        species, one array of random numbers decides which animals move, each
+        with the probability of
+        :meth:`biosim.animals.Animal.migration_probability`, and a second one
+        chooses the destination of every moving animal by searching the
+        cumulative directional probabilities.
+
+        Only the cell itself is read, so the destinations of all cells can be
+        found before any animal is moved.
+
+        :param probabilities: list, the directional probabilities of
+                              herbivores and carnivores.
+        :param rng: numpy.random.Generator.
+        :return: list, one array per species with the index of the
+                 neighbour each animal moves to, or -1 if it stays.
+        """
+        destinations = []
+        fitness = self.update_fitness()
+        for index, species in enumerate(self.animal_population):
+            cumulative = np.cumsum(probabilities[index])
+            moving = rng.random(len(species)) < self.animal_types[
+                index].parameters.mu * fitness[index]
+            if not cumulative[-1] > 0:
+                moving[:] = False
+            destination = np.full(len(species), -1)
+            destination[moving] = np.minimum(np.searchsorted(
+                cumulative,
+                rng.random(np.count_nonzero(moving)) * cumulative[-1],
+                side="right"), len(cumulative) - 1)
+            destinations.append(destination)
+        return destinations
 
 
 class Jungle(Landscape):
@@ -345,7 +468,7 @@ class Jungle(Landscape):
             f_{ij} \gets f_{max}^{Jungle}
 
         """
-        self.f = self.default_parameters["f_max"]
+        self.f = self.parameters.f_max
 
 
 class Savannah(Landscape):
@@ -367,8 +490,8 @@ class Savannah(Landscape):
         where :math:`\\alpha` is a parameter value for the savannah landscape
         type
         """
-        self.f += self.default_parameters["alpha"] * \
-            (self.default_parameters["f_max"] - self.f)
+        p = self.parameters
+        self.f += p.alpha * (p.f_max - self.f)
 
 
 class Desert(Landscape):
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`biosim.parameters` defines immutable sets of animal and landscape
+parameters.
+
+Every island has its own parameter sets, bound to its own subclasses of the
+animal and landscape classes, see :meth:`biosim.animals.Animal.bind` and
+:meth:`biosim.landscape.Landscape.bind`. A parameter set can not be
+changed: setting parameters replaces the set by a new one. Simulations in
+the same process, e.g. in different threads, therefore never see each
+other's parameters.
+
+The values are stored in slots and read as attributes, e.g.
+``parameters.phi_age``, which is cheaper than looking them up in a dict.
+As lambda is a keyword, the parameter "lambda" is read as ``lambda_``. The
+values can also be read by name, e.g. ``parameters["lambda"]``.
+
+The bound subclasses have the name of the class they are bound from, so they
+can not be pickled by name. They are created by :class:`BoundType`, and are
+pickled as a call of ``bind`` of that class with their current parameters.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import copyreg
+
+
+def _attribute(name):
+    """
+    The name of the attribute holding a parameter.
+
+    :param name: str, name of the parameter.
+    :return: str.
+    """
+    return "lambda_" if name == "lambda" else name
+
+
+class ParameterSet:
+    """
+    This class holds an immutable set of parameter values. Subclasses list
+    the names of the parameters, and parameters that are not given are None.
+    """
+
+    __slots__ = ()
+    NAMES = ()
+
+    def __init__(self, values=None):
+        """
+        This method creates variables needed for the class.
+
+        :param values: dict, parameter values by name.
+        """
+        values = {} if values is None else dict(values)
+        self.check_names(values)
+        for name in self.NAMES:
+            object.__setattr__(self, _attribute(name), values.get(name))
+
+    @classmethod
+    def check_names(cls, names):
+        """
+        Checks that all names are names of parameters of the set.
+
+        :param names: iterable, names of parameters.
+        """
+        for name in names:
+            if name not in cls.NAMES:
+                raise ValueError("Unknown parameter " + repr(name) +
+                                 ". Allowed parameters: " +
+                                 ", ".join(cls.NAMES) + ".")
+
+    def __setattr__(self, name, value):
+        raise AttributeError("A parameter set can not be changed, use "
+                             "replace to create a new one.")
+
+    def __delattr__(self, name):
+        raise AttributeError("A parameter set can not be changed, use "
+                             "replace to create a new one.")
+
+    def __getitem__(self, name):
+        if name not in self.NAMES:
+            raise KeyError(name)
+        return getattr(self, _attribute(name))
+
+    def __iter__(self):
+        return iter(self.NAMES)
+
+    def __len__(self):
+        return len(self.NAMES)
+
+    def keys(self):
+        """
+        The names of the parameters.
+
+        :return: tuple.
+        """
+        return self.NAMES
+
+    def as_dict(self):
+        """
+        Copies the parameter values into a dict.
+
+        :return: dict, parameter values by name.
+        """
+        return {name: self[name] for name in self.NAMES}
+
+    def replace(self, new_parameters):
+        """
+        Creates a set with some of the values replaced.
+
+        :param new_parameters: dict, the new parameter values by name.
+        :return: ParameterSet, of the same class.
+        """
+        self.check_names(new_parameters)
+        values = self.as_dict()
+        values.update(new_parameters)
+        return type(self)(values)
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.as_dict() == other.as_dict()
+
+    def __hash__(self):
+        return hash(tuple(self[name] for name in self.NAMES))
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, ", ".join(
+            "{}={!r}".format(name, self[name]) for name in self.NAMES))
+
+    def __reduce__(self):
+        return type(self), (self.as_dict(),)
+
+
+class AnimalParameters(ParameterSet):
+    """
+    This class holds the parameters of an animal species, see
+    :meth:`biosim.animals.Animal.set_animal_parameters`.
+    """
+
+    NAMES = ("w_birth", "sigma_birth", "beta", "eta", "a_half", "phi_age",
+             "w_half", "phi_weight", "mu", "lambda", "gamma", "zeta", "xi",
+             "omega", "F", "DeltaPhiMax")
+    __slots__ = tuple(_attribute(name) for name in NAMES)
+
+
+class LandscapeParameters(ParameterSet):
+    """
+    This class holds the parameters of a landscape type, see
+    :meth:`biosim.landscape.Landscape.set_landscape_parameters`.
+    """
+
+    NAMES = ("f_max", "alpha")
+    __slots__ = NAMES
+
+
+class BoundType(type):
+    """
+    The metaclass of the subclasses created by
+    :meth:`biosim.animals.Animal.bind` and
+    :meth:`biosim.landscape.Landscape.bind`.
+    """
+
+
+def _reduce_bound_type(cls):
+    """
+    Pickles a bound class as a call of bind of the class it is bound from,
+    with the arguments given by its ``_bind_arguments``.
+
+    :param cls: BoundType, the bound class.
+    :return: tuple, the bind method and its arguments.
+    """
+    return cls.__bases__[0].bind, cls._bind_arguments()
+
+
+copyreg.pickle(BoundType, _reduce_bound_type)
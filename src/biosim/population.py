@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`biosim.population` defines a structure-of-arrays representation of an
+animal population. Instead of one Herbivore or Carnivore object per animal,
+all animals of one species on the island are stored as contiguous NumPy
+arrays of age, weight, fitness and cell index, and every phase of the annual
+cycle is carried out on these arrays at once.
+
+The formulas are the same as in :mod:`biosim.animals`, and the parameters are
+read from the parameter set of the animal class the population is created
+with, usually the class bound by the island, so parameters set through
+``set_animal_parameters`` apply to both representations. Each phase reads
+the parameter set once.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import numpy as np
+
+POPULATION_COLUMNS = ("loc_row", "loc_col", "species", "age", "weight")
+
+
+def read_population(path):
+    """
+    Opens the columns of a population stored in a file, for
+    :meth:`biosim.island.Island.populate_from_arrays`, without reading
+    them. The file is either a ``.npy`` file of a structured array with the
+    fields of :data:`POPULATION_COLUMNS`, or an ``.npz`` file with one array
+    for each of them. The arrays are memory-mapped where possible, i.e.
+    unless they are compressed.
+
+    :param path: str, path of the file.
+    :return: numpy.ndarray or dict, indexed by the column names.
+    """
+    import biosim.export as be
+
+    path = str(path)
+    if path.endswith(".npz"):
+        return {column: be.load_npz_member(path, column)
+                for column in POPULATION_COLUMNS}
+    return np.load(path, mmap_mode="r", allow_pickle=False)
+
+
+class SpeciesPopulation:
+    """
+    This class stores all animals of one species as contiguous arrays.
+    """
+
+    def __init__(self, species):
+        """
+        This method creates variables needed for the class.
+
+        :param species: class, :class:`biosim.animals.Herbivore` or
+                        :class:`biosim.animals.Carnivore`, whose parameters
+                        apply to the animals.
+        """
+        self.species = species
+        self.age = np.empty(0, dtype=np.int64)
+        self.weight = np.empty(0, dtype=float)
+        self.fitness = np.empty(0, dtype=float)
+        self.cell = np.empty(0, dtype=np.intp)
+
+    def __len__(self):
+        """
+        Number of animals in the population.
+        """
+        return len(self.age)
+
+    @property
+    def parameters(self):
+        """
+        The current parameters of the species.
+
+        :return: biosim.parameters.AnimalParameters.
+        """
+        return self.species.parameters
+
+    def add(self, age, weight, cell):
+        """
+        Adds animals to the population.
+
+        :param age: array_like, ages of the new animals.
+        :param weight: array_like, weights of the new animals.
+        :param cell: array_like, flat cell index of the new animals.
+        """
+        age = np.asarray(age, dtype=np.int64)
+        weight = np.asarray(weight, dtype=float)
+        self.age = np.concatenate((self.age, age))
+        self.weight = np.concatenate((self.weight, weight))
+        self.cell = np.concatenate(
+            (self.cell, np.asarray(cell, dtype=np.intp)))
+        self.fitness = np.concatenate(
+            (self.fitness, self.species.batch_fitness(age, weight)))
+
+    def keep(self, mask):
+        """
+        Keeps only the animals selected by the boolean mask or index array.
+
+        :param mask: numpy.ndarray, animals to keep.
+        """
+        self.age = self.age[mask]
+        self.weight = self.weight[mask]
+        self.fitness = self.fitness[mask]
+        self.cell = self.cell[mask]
+
+    def update_fitness(self):
+        """
+        Recomputes the fitness of all animals.
+        """
+        self.fitness = self.species.batch_fitness(self.age, self.weight)
+
+    def sort_by_fitness(self):
+        """
+        Sorts the animals by cell index, and by fitness in descending order
+        within each cell.
+        """
+        self.keep(np.lexsort((-self.fitness, self.cell)))
+
+    def count_per_cell(self, n_cells):
+        """
+        Finds the number of animals in each cell.
+
+        :param n_cells: int, number of cells on the island.
+        :return: numpy.ndarray.
+        """
+        return np.bincount(self.cell, minlength=n_cells)
+
+    def mass_per_cell(self, n_cells):
+        """
+        Finds the total weight of the animals in each cell.
+
+        :param n_cells: int, number of cells on the island.
+        :return: numpy.ndarray.
+        """
+        return np.bincount(self.cell, weights=self.weight,
+                           minlength=n_cells)
+
+    def cell_slices(self, n_cells):
+        """
+        Finds where each cell starts and ends in the arrays. Assumes that the
+        animals are sorted by cell.
+
+        :param n_cells: int, number of cells on the island.
+        :return: tuple, start and end index of each cell.
+        """
+        end = np.cumsum(self.count_per_cell(n_cells))
+        start = end - self.count_per_cell(n_cells)
+        return start, end
+
+    def eat_fodder(self, fodder):
+        """
+        Herbivores eat in order of descending fitness in each cell, each
+        requesting the amount :math:`F`, until the fodder of the cell is
+        gone. Assumes that the animals are sorted by fitness.
+
+        :param fodder: numpy.ndarray, fodder in each cell. Updated in place.
+        """
+        if len(self) == 0:
+            return
+        p = self.parameters
+        appetite = p.F
+        start, end = self.cell_slices(len(fodder))
+        rank = np.arange(len(self)) - start[self.cell]
+        eaten = np.clip(fodder[self.cell] - appetite * rank, 0, appetite)
+        self.weight += p.beta * eaten
+        fodder -= np.minimum(fodder, appetite * (end - start))
+        self.update_fitness()
+
+    def hunt(self, herbivores, rng, n_cells):
+        """
+        Carnivores eat in order of descending fitness in each cell. Each
+        carnivore tries to kill the herbivores in order of ascending fitness,
+        as in :meth:`biosim.animals.Carnivore.eating`, until it is satiated
+        or has tried all herbivores. Killed herbivores are removed at the end.
+
+        As in the object representation, the herbivores keep the order given
+        by sorting them before they eat, so they must be sorted by
+        :meth:`sort_by_fitness` first.
+
+        :param herbivores: SpeciesPopulation, the prey.
+        :param rng: numpy.random.Generator.
+        :param n_cells: int, number of cells on the island.
+        """
+        if len(herbivores) == 0 or len(self) == 0:
+            return
+        p = self.parameters
+        self.sort_by_fitness()
+        herb_start, herb_end = herbivores.cell_slices(n_cells)
+        carn_start, carn_end = self.cell_slices(n_cells)
+        killed = np.zeros(len(herbivores), dtype=bool)
+
+        hunting_grounds = np.flatnonzero(
+            (herb_end > herb_start) & (carn_end > carn_start))
+        for cell in hunting_grounds:
+            # Herbivores of the cell in order of ascending fitness
+            prey = np.arange(herb_end[cell] - 1, herb_start[cell] - 1, -1)
+            for carnivore in range(carn_start[cell], carn_end[cell]):
+                prey = prey[~killed[prey]]
+                if len(prey) == 0:
+                    break
+                chance = rng.random(len(prey))
+                fitness = self.fitness[carnivore]
+                weight_eaten = 0
+                first = 0
+                while weight_eaten < p.F and first < len(prey):
+                    kill_probability = np.clip(
+                        (fitness - herbivores.fitness[prey[first:]]) /
+                        p.DeltaPhiMax, 0, 1)
+                    kills = np.flatnonzero(
+                        chance[first:] < kill_probability)
+                    if len(kills) == 0:
+                        break
+                    herbivore = prey[first + kills[0]]
+                    killed[herbivore] = True
+                    meal = min(herbivores.weight[herbivore],
+                               p.F - weight_eaten)
+                    weight_eaten += meal
+                    self.weight[carnivore] += p.beta * meal
+                    fitness = float(self.species.batch_fitness(
+                        self.age[carnivore], self.weight[carnivore]))
+                    self.fitness[carnivore] = fitness
+                    first += kills[0] + 1
+
+        herbivores.keep(~killed)
+
+    def reproduction(self, rng, n_cells):
+        """
+        Every animal gives birth with probability
+        :math:`min(1, \\gamma \\times \\Phi \\times (N-1))`, given that its
+        weight satisfies the same conditions as in
+        :meth:`biosim.landscape.Landscape.reproduction`. The newborns
+        are added to the cell of the mother.
+
+        :param rng: numpy.random.Generator.
+        :param n_cells: int, number of cells on the island.
+        """
+        n_animals = len(self)
+        if n_animals == 0:
+            return
+        p = self.parameters
+        newborn_weight = rng.normal(p.w_birth, p.sigma_birth, n_animals)
+        n_in_cell = self.count_per_cell(n_cells)[self.cell]
+        probability = np.minimum(1, p.gamma * self.fitness * (
+                n_in_cell - 1))
+        can_give_birth = (
+            (self.weight >= p.zeta * (p.w_birth + p.sigma_birth))
+            & (self.weight >= newborn_weight)
+        )
+        birth = can_give_birth & (rng.random(n_animals) < probability)
+
+        self.weight[birth] -= p.xi * newborn_weight[birth]
+        self.update_fitness()
+        self.add(np.zeros(np.count_nonzero(birth)), newborn_weight[birth],
+                 self.cell[birth])
+
+    def migrate(self, rng, probability, neighbours):
+        """
+        Every animal migrates with probability :math:`\\mu \\Phi` to one of
+        the neighbouring cells, chosen according to the directional
+        probabilities of its current cell.
+
+        :param rng: numpy.random.Generator.
+        :param probability: numpy.ndarray, shape (cells, 4), probability of
+                            moving from each cell to each of its neighbours.
+        :param neighbours: numpy.ndarray, shape (cells, 4), flat index of the
+                           neighbours of each cell.
+        """
+        if len(self) == 0:
+            return
+        moving = np.flatnonzero(
+            rng.random(len(self)) < self.parameters.mu * self.fitness)
+        cumulative = np.cumsum(probability[self.cell[moving]], axis=1)
+        choice = rng.random(len(moving)) * cumulative[:, -1]
+        direction = np.minimum(
+            np.count_nonzero(choice[:, None] >= cumulative, axis=1), 3)
+
+        # Animals surrounded by Mountain and Ocean only stay where they are.
+        can_move = cumulative[:, -1] > 0
+        moving, direction = moving[can_move], direction[can_move]
+        self.cell[moving] = neighbours[self.cell[moving], direction]
+
+    def aging(self):
+        """
+        The age of all animals is incremented by one.
+        """
+        self.age += 1
+
+    def weight_loss(self):
+        """
+        All animals lose the weight :math:`\\eta w`.
+        """
+        self.weight -= self.parameters.eta * self.weight
+
+    def death(self, rng):
+        """
+        Every animal dies with probability :math:`\\omega(1-\\Phi)`.
+
+        :param rng: numpy.random.Generator.
+        """
+        self.update_fitness()
+        dies = rng.random(len(self)) < self.parameters.omega * (
+                1 - self.fitness)
+        self.keep(~dies)
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`biosim.recorder` defines a recorder of per-year, per-cell statistics
+of a simulation. The statistics of each recorded year are appended to one
+NumPy buffer of shape (years, rows, cols, metrics), which is allocated for a
+number of years at a time and doubled in size when it is full, so that
+recording does not build new objects every year.
+
+The metrics that can be recorded are
+
+    * "herbivores" and "carnivores", the number of animals of each species,
+    * "herbivore_mass" and "carnivore_mass", their total weight,
+    * "herbivore_fitness" and "carnivore_fitness", their mean fitness, NaN
+      in cells without animals of the species,
+    * "fodder", the fodder left in the cell at the end of the year.
+
+The memory used is bounded by recording fewer metrics, or only every few
+years.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import numpy as np
+
+
+class Recorder:
+    """
+    This class records statistics of every cell of an island in chosen
+    years.
+    """
+
+    METRICS = ("herbivores", "carnivores", "herbivore_mass",
+               "carnivore_mass", "herbivore_fitness", "carnivore_fitness",
+               "fodder")
+
+    def __init__(self, shape, metrics=None, interval=1, capacity=64):
+        """
+        This method creates variables needed for the class.
+
+        :param shape: tuple, number of rows and columns of the island.
+        :param metrics: list, names of the metrics to record, in the order
+                        of the last axis of :attr:`data`. All metrics are
+                        recorded if None.
+        :param interval: int, years between recorded years. Years that are
+                         multiples of the interval are recorded.
+        :param capacity: int, number of years the buffer holds at first.
+        """
+        if metrics is None:
+            metrics = self.METRICS
+        metrics = tuple(metrics)
+        for metric in metrics:
+            if metric not in self.METRICS:
+                raise ValueError("Unknown metric " + repr(metric) +
+                                 ". Allowed metrics: " +
+                                 ", ".join(self.METRICS) + ".")
+        if len(set(metrics)) != len(metrics):
+            raise ValueError("Each metric can only be recorded once.")
+        if interval < 1:
+            raise ValueError("The interval must be at least 1.")
+
+        self.shape = tuple(shape)
+        self.metrics = metrics
+        self.interval = interval
+        self._years = np.empty(capacity, dtype=np.int64)
+        self._buffer = np.empty((capacity,) + self.shape + (len(metrics),))
+        self._length = 0
+
+    def __len__(self):
+        """
+        Number of recorded years.
+        """
+        return self._length
+
+    @property
+    def years(self):
+        """
+        The recorded years.
+
+        :return: numpy.ndarray.
+        """
+        return self._years[:self._length]
+
+    @property
+    def data(self):
+        """
+        The recorded statistics, with shape (years, rows, cols, metrics).
+        This is a view of the buffer, which is valid until the next year is
+        recorded.
+
+        :return: numpy.ndarray.
+        """
+        return self._buffer[:self._length]
+
+    def metric(self, name):
+        """
+        The recorded values of one metric.
+
+        :param name: str, name of the metric.
+        :return: numpy.ndarray, shape (years, rows, cols).
+        """
+        return self.data[..., self.metrics.index(name)]
+
+    def _grow(self):
+        """
+        Doubles the number of years the buffer holds.
+        """
+        capacity = max(1, 2 * len(self._years))
+        years = np.empty(capacity, dtype=np.int64)
+        years[:self._length] = self.years
+        buffer = np.empty((capacity,) + self._buffer.shape[1:])
+        buffer[:self._length] = self.data
+        self._years, self._buffer = years, buffer
+
+    def _statistics(self, island):
+        """
+        Computes the recorded metrics of every cell of the island.
+
+        :param island: biosim.island.Island.
+        :return: dict, flat array with one element per cell for each metric.
+        """
+        values = {}
+        if any(metric.endswith(("_mass", "_fitness"))
+               for metric in self.metrics):
+            for name, (counts, mass, fitness) in zip(
+                    ("herbivore", "carnivore"),
+                    island.species_statistics()):
+                values[name + "s"] = counts
+                values[name + "_mass"] = mass
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    values[name + "_fitness"] = fitness / counts
+        elif "herbivores" in self.metrics or "carnivores" in self.metrics:
+            values["herbivores"], values["carnivores"] = \
+                island.species_counts()
+        values["fodder"] = island.fodder.reshape(-1)
+        return values
+
+    def record(self, year, island):
+        """
+        Appends the statistics of the island, if the year is a multiple of
+        the interval.
+
+        :param year: int, the year that has been simulated.
+        :param island: biosim.island.Island.
+        """
+        if year % self.interval != 0:
+            return
+        if self._length == len(self._years):
+            self._grow()
+        values = self._statistics(island)
+        row = self._buffer[self._length]
+        for index, metric in enumerate(self.metrics):
+            row[..., index] = values[metric].reshape(self.shape)
+        self._years[self._length] = year
+        self._length += 1
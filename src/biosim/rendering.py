@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`biosim.rendering` defines a worker process that draws and saves the
+graphics of a simulation, so that simulating and rendering overlap on
+different cores.
+
+In each visualization year, :class:`biosim.simulation.BioSim` puts a
+:class:`Snapshot` into a bounded queue: the population totals since the last
+snapshot, and the count and fodder grids as NumPy arrays. The snapshots are
+copies, so the simulation may go on while they are drawn. When the queue is
+full, the simulation waits for the worker, which keeps the number of frames
+in memory bounded.
+
+The worker keeps a :class:`biosim.simulation.BioSim` of its own, without
+animals, whose figure it updates from the snapshots with the Agg backend.
+Frames are saved as image files or piped into ffmpeg, as in the simulation
+itself, but no window is shown.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import collections
+import multiprocessing
+import queue
+
+Snapshot = collections.namedtuple(
+    "Snapshot", ["year", "final_year", "herbivores", "carnivores",
+                 "herbivore_grid", "carnivore_grid", "fodder_grid", "save"])
+Snapshot.__doc__ = """
+The state of a simulation in one visualization year.
+
+:param year: int, the year of the snapshot.
+:param final_year: int, the last year of the current simulation.
+:param herbivores: list, total number of herbivores in each year since the
+                   last snapshot.
+:param carnivores: list, total number of carnivores in each year since the
+                   last snapshot.
+:param herbivore_grid: numpy.ndarray, number of herbivores in each cell.
+:param carnivore_grid: numpy.ndarray, number of carnivores in each cell.
+:param fodder_grid: numpy.ndarray, fodder in each cell.
+:param save: bool, True if the frame is to be saved.
+"""
+
+
+def _render(settings, snapshots, rendered):
+    """
+    Draws the snapshots from the queue until it receives None, and reports
+    the year of each snapshot drawn. A movie piped into ffmpeg is finished
+    at the end.
+
+    :param settings: dict, keyword arguments of
+                     :class:`biosim.simulation.BioSim` for the figure.
+    :param snapshots: multiprocessing.Queue, snapshots to draw.
+    :param rendered: multiprocessing.Queue, years drawn.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+
+    from biosim.simulation import BioSim
+
+    view = BioSim(ini_pop=[], seed=0, **settings)
+    view.herbivore_list, view.carnivore_list = [], []
+    while True:
+        snapshot = snapshots.get()
+        if snapshot is None:
+            break
+        view.herbivore_list.extend(snapshot.herbivores)
+        view.carnivore_list.extend(snapshot.carnivores)
+        view.last_year_simulated = snapshot.year
+        view._final_year = snapshot.final_year
+
+        view._start_graphics(snapshot.save)
+        view.update_graphics(
+            (snapshot.herbivore_grid, snapshot.carnivore_grid),
+            snapshot.fodder_grid)
+        if snapshot.save:
+            view.save_graphics()
+        rendered.put(snapshot.year)
+
+    if view._movie_writer is not None:
+        view._close_movie_writer()
+
+
+class RenderingWorker:
+    """
+    This class starts the rendering process and hands the snapshots over to
+    it.
+    """
+
+    def __init__(self, settings, queue_size=4):
+        """
+        This method creates variables needed for the class.
+
+        :param settings: dict, keyword arguments of
+                         :class:`biosim.simulation.BioSim` for the figure.
+        :param queue_size: int, largest number of snapshots waiting to be
+                           drawn.
+        """
+        if queue_size < 1:
+            raise ValueError("The queue size must be at least 1.")
+        self._snapshots = multiprocessing.Queue(queue_size)
+        self._rendered = multiprocessing.Queue()
+        self._pending = 0
+        self._process = multiprocessing.Process(
+            target=_render, args=(settings, self._snapshots, self._rendered),
+            daemon=True)
+        self._process.start()
+
+    def _check_alive(self):
+        """
+        Raises RuntimeError if the rendering process has stopped.
+        """
+        if not self._process.is_alive():
+            raise RuntimeError(
+                "The rendering process failed with exit code {}.".format(
+                    self._process.exitcode))
+
+    def put(self, snapshot):
+        """
+        Puts a snapshot into the queue, and waits while the queue is full.
+
+        :param snapshot: Snapshot.
+        """
+        while True:
+            try:
+                self._snapshots.put(snapshot, timeout=0.1)
+                break
+            except queue.Full:
+                self._check_alive()
+        self._pending += 1
+
+    def wait(self):
+        """
+        Waits until all snapshots in the queue have been drawn and saved.
+        """
+        while self._pending > 0:
+            try:
+                self._rendered.get(timeout=0.1)
+                self._pending -= 1
+            except queue.Empty:
+                self._check_alive()
+
+    def close(self):
+        """
+        Waits for the snapshots in the queue, and stops the rendering
+        process, which finishes a movie piped into ffmpeg.
+        """
+        self.wait()
+        self._snapshots.put(None)
+        self._process.join()
+        if self._process.exitcode != 0:
+            raise RuntimeError(
+                "The rendering process failed with exit code {}.".format(
+                    self._process.exitcode))
+
+    def __del__(self):
+        if getattr(self, "_process", None) is not None and \
+                self._process.is_alive():
+            self._process.terminate()
@@ -9,20 +9,35 @@ __author__ = "Erik Rullestad", "Håvard Molversmyr"
 __email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
 
 
+import collections.abc
+import os
 import random
-import subprocess
+import warnings
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
 
 import biosim.island as bi
-import biosim.landscape as bl
-import biosim.animals as ba
+import biosim.population as bp
+
+# matplotlib, pandas, subprocess, and the modules of the 'numba' engine, the
+# tiled island, the rendering process, the recorder and checkpoints, are
+# imported where they are first needed, to keep importing this module fast
+# for simulations without graphics.
 
 # update this variable to point to your ffmpeg binaries
 _FFMPEG_BINARY = 'ffmpeg'
 
 
+def _pyplot():
+    """
+    Imports matplotlib.pyplot when it is first needed, so that simulations
+    without graphics never load matplotlib or choose a backend.
+
+    :return: module, matplotlib.pyplot.
+    """
+    import matplotlib.pyplot as plt
+    return plt
+
+
 class BioSim:
     """
     This class generates the outline for the simulation of Rossumøya's
@@ -37,10 +52,22 @@ class BioSim:
         cmax_animals=None,
         img_base=None,
         img_fmt="png",
+        movie_fmt=None,
+        engine="object",
+        active_set=False,
+        workers=None,
+        graphics=True,
+        background_graphics=False,
+        render_queue_size=4,
+        record_years=0,
+        record_metrics=None,
+        history=None,
+        parameters=None,
     ):
         """
         :param island_map: Multi-line string specifying island geography
-        :param ini_pop: List of dictionaries specifying initial population
+        :param ini_pop: List of dictionaries specifying initial population,
+            or columns of animals, see :meth:`add_population`
         :param seed: Integer used as random number seed
         :param ymax_animals: Number specifying y-axis limit for graph showing
             animal numbers
@@ -49,6 +76,49 @@ class BioSim:
         :param img_base: String with beginning of file name for figures,
             including path
         :param img_fmt: String with file type for figures, e.g. 'png'
+        :param movie_fmt: String with file type for a movie, e.g. 'mp4'. If
+            given, the saved visualizations are piped into ffmpeg as raw
+            RGB frames, and no image files are written, see
+            :meth:`make_movie`
+        :param engine: String, 'object' to represent every animal as a
+            Herbivore or Carnivore object, 'array' to store the animals
+            of each species as NumPy arrays, see :mod:`biosim.population`,
+            or 'numba' to store them as in 'array', with the annual cycle
+            carried out by the compiled kernels of :mod:`biosim.compiled`.
+            If numba is not installed, 'numba' falls back to 'array' with a
+            warning. The engine is 'tiled' when workers is given
+        :param active_set: Bool, if True, the 'object' engine skips cells
+            without animals, see :meth:`biosim.island.Island.annual_cycle`.
+            The 'array' engine always processes all cells at once.
+        :param workers: Integer, if given, the map is split into this many
+            tiles of rows, whose animals are stored as in the 'array' engine
+            and processed by as many worker processes, see
+            :mod:`biosim.tiled`. Results are reproducible for a fixed seed
+            and number of workers. The engine option is then ignored. The
+            worker processes are stopped by :meth:`close`, or when the
+            simulation is used as a context manager, e.g.
+            ``with BioSim(..., workers=4) as sim:``
+        :param graphics: Bool, if False, simulate never creates figures or
+            imports matplotlib, whatever the values of vis_years and
+            img_years
+        :param background_graphics: Bool, if True, the graphics are drawn
+            and saved by a worker process, from snapshots put into a queue
+            by simulate, see :mod:`biosim.rendering`. The figure is drawn
+            with the Agg backend and not shown
+        :param render_queue_size: Integer, largest number of snapshots
+            waiting to be drawn. When the queue is full, the simulation
+            waits for the worker
+        :param record_years: Integer, years between the years whose
+            per-cell statistics are recorded, see :attr:`recorder`, or 0 to
+            record nothing
+        :param record_metrics: List of the names of the metrics to record,
+            see :mod:`biosim.recorder`. All metrics are recorded if None
+        :param history: Sink that writes a snapshot of every simulated year
+            to disk in chunks, e.g. :class:`biosim.export.NpzSink`. It is
+            closed by the caller when the simulations are done
+        :param parameters: Dict mapping species names and landscape codes
+            to dicts of parameter values, set before the initial population
+            is placed, see :meth:`biosim.island.Island.set_parameters`
 
         If ymax_animals is None, the y-axis limit should be adjusted
         automatically.
@@ -57,6 +127,11 @@ class BioSim:
         cmax_animals is a dict mapping species names to numbers, e.g.,
            {'Herbivore': 50, 'Carnivore': 20}
 
+        The simulation has its own animal and landscape parameters, which
+        start from those of the animal and landscape classes when it is
+        created. Parameters set on the simulation do not change those of the
+        classes or of other simulations.
+
         If img_base is None, no figures are written to file.
         Filenames are formed as
 
@@ -64,13 +139,58 @@ class BioSim:
 
         where img_no are consecutive image numbers starting from 0.
         img_base should contain a path and beginning of a file name.
+
+        If movie_fmt is given as well, the movie is written to
+
+            '{}.{}'.format(img_base, movie_fmt)
+
+        while the simulation runs, instead of the image files.
+
+        The 'object' engine draws from the random module and, for migration,
+        from a NumPy generator, both seeded with seed. The 'array' engine
+        draws all its random numbers from a NumPy generator, so its results
+        are statistically equivalent to, but not identical with, those of the
+        'object' engine. The same holds for the 'numba' engine, whose
+        carnivores hunt with a generator seeded from the one of the island.
         """
         random.seed(seed)
         self.last_year_simulated = 0
         self.island_map = island_map
         self.ini_pop = ini_pop
-        self.island = bi.Island(island_map=island_map)
-        self.island.populate_the_island(ini_pop)
+        if workers is not None:
+            import biosim.tiled as bt
+            engine = "tiled"
+            self.island = bt.TiledIsland(island_map=island_map,
+                                         workers=workers, seed=seed)
+        elif engine == "tiled":
+            raise ValueError("The 'tiled' engine needs the number of "
+                             "workers.")
+        elif engine == "object":
+            self.island = bi.Island(island_map=island_map,
+                                    active_set=active_set, seed=seed)
+        elif engine == "array":
+            self.island = bi.ArrayIsland(island_map=island_map, seed=seed)
+        elif engine == "numba":
+            import biosim.compiled as bc
+            if bc.NUMBA_AVAILABLE:
+                self.island = bc.CompiledIsland(island_map=island_map,
+                                                seed=seed)
+            else:
+                warnings.warn("numba is not installed, using the 'array' "
+                              "engine instead.", RuntimeWarning)
+                engine = "array"
+                self.island = bi.ArrayIsland(island_map=island_map,
+                                             seed=seed)
+        else:
+            raise ValueError("Unknown engine " + repr(engine) +
+                             ". Allowed engines: 'object', 'array' and "
+                             "'numba'.")
+        self.engine = engine
+        self.active_set = active_set
+        self.workers = workers
+        if parameters is not None:
+            self.island.set_parameters(parameters)
+        self._populate(ini_pop)
         self.herbivore_list = [
             self.island.total_species_population[0]
         ]
@@ -79,68 +199,152 @@ class BioSim:
         ]
         self.ymax_animals = ymax_animals
         self.cmax_animals = cmax_animals
+        self.graphics = graphics
+        self.background_graphics = background_graphics
+        self.render_queue_size = render_queue_size
+        self.recorder = None
+        if record_years > 0:
+            import biosim.recorder as br
+            self.recorder = br.Recorder(self.island.numpy_map.shape,
+                                        metrics=record_metrics,
+                                        interval=record_years)
+        self.history = history
 
         self.img_base = img_base
         self.img_fmt = img_fmt
+        self.movie_fmt = movie_fmt
         self._img_ctr = 0
+        self._movie_writer = None
+        self._frame_size = None
 
         # the following will be initialized by setup_graphics
         self._fig = None
         self._map_ax = None
         self._map_axis = None
         self._pop_ax = None
-        self._pop_axis = None
+        self._herb_line = None
+        self._carn_line = None
+        self._herb_tail = None
+        self._carn_tail = None
+        self._line_years = 0
+        self._drawn_index = 0
         self._herb_heat_ax = None
         self._herb_heat_axis = None
         self._carn_heat_ax = None
         self._carn_heat_axis = None
+        self._fodder_ax = None
+        self._fodder_axis = None
+        self._blit = False
+        self._background = None
+        self._window_shown = False
+        self._final_year = 0
+        self._renderer = None
+        self._snapshot_start = 0
+
+    def close(self):
+        """
+        Stops the worker processes of the island, if it is split into tiles,
+        see :meth:`biosim.tiled.TiledIsland.close`. The simulation can still
+        be continued, and starts them again if needed. The rendering process
+        of background_graphics is stopped once it has drawn the snapshots in
+        its queue.
+        """
+        self._close_renderer()
+        if self.workers is not None:
+            self.island.close()
+
+    def _close_renderer(self):
+        """
+        Stops the rendering process of background_graphics, if it is
+        running, see :meth:`biosim.rendering.RenderingWorker.close`.
+        """
+        if self._renderer is not None:
+            renderer, self._renderer = self._renderer, None
+            renderer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def set_animal_parameters(self, species, params):
         """
-        Set parameters for animal species.
+        Set parameters for animal species, in this simulation only.
 
         :param species: String, name of animal species
         :param params: Dict with valid parameter specification for species
         """
-        if species == "Herbivore":
-            ba.Herbivore.set_animal_parameters(params)
-        elif species == "Carnivore":
-            ba.Carnivore.set_animal_parameters(params)
+        self.island.set_animal_parameters(species, params)
 
     def set_landscape_parameters(self, landscape, params):
         """
-        Set parameters for landscape type.
+        Set parameters for landscape type, in this simulation only.
 
         :param landscape: String, code letter for landscape
         :param params: Dict with valid parameter specification for landscape
         """
-        if landscape == "J":
-            bl.Jungle.set_landscape_parameters(params)
-        elif landscape == "S":
-            bl.Savannah.set_landscape_parameters(params)
-        elif landscape == "D":
-            bl.Desert.set_landscape_parameters(params)
-        elif landscape == "M":
-            bl.Mountain.set_landscape_parameters(params)
-        elif landscape == "O":
-            bl.Ocean.set_landscape_parameters(params)
+        self.island.set_landscape_parameters(landscape, params)
 
-    def simulate(self, num_years, vis_years=1, img_years=None):
+    def simulate(self, num_years, vis_years=1, img_years=None,
+                 checkpoint_years=0, checkpoint_path=None):
         """
         Run simulation while visualizing the result.
 
         :param num_years: number of years to simulate
-        :param vis_years: years between visualization updates
+        :param vis_years: years between visualization updates, or 0 to
+            simulate without graphics
         :param img_years: years between visualizations saved to files
             (default: vis_years)
+        :param checkpoint_years: years between checkpoints, see
+            :meth:`save_checkpoint`, or 0 to save none
+        :param checkpoint_path: path of the checkpoints. It is formatted
+            with the year, e.g. 'run_{year:05d}.npz', so that every
+            checkpoint is kept, or the same file is replaced each time
 
         Image files will be numbered consecutively.
+
+        Graphics are updated and saved in the years that are multiples of
+        vis_years and img_years, counted from the first year of the first
+        simulation, so that the intervals are kept across calls. If graphics
+        is False or vis_years is 0, no figure is created.
+
+        If movie_fmt was given, the first call starts ffmpeg, and the saved
+        visualizations of this and later calls are sent to it as frames.
+        Call :meth:`make_movie` to finish the movie.
+
+        If background_graphics is True, the visualization years are drawn
+        by the rendering process while the simulation goes on, and simulate
+        returns when all of them have been drawn and saved.
+
+        If record_years is given, the statistics of the years that are
+        multiples of it are appended to :attr:`recorder`, starting with the
+        state before the first simulation. The same holds for every year
+        and the history sink, which is handed the years simulated so far
+        when simulate returns.
         """
         if img_years is None:
             img_years = vis_years
-
-        self.setup_graphics()
-        self.plot_island_map()
+        if checkpoint_years > 0 and checkpoint_path is None:
+            raise ValueError("checkpoint_path must be given with "
+                             "checkpoint_years")
+
+        self._final_year = self.year + num_years
+        show_graphics = self.graphics and vis_years > 0
+        if show_graphics:
+            if img_years % vis_years != 0:
+                raise ValueError("img_years must be multiple of vis_years")
+            if not self.background_graphics:
+                self._start_graphics(img_years > 0)
+            elif self._renderer is None:
+                import biosim.rendering as br
+                self._renderer = br.RenderingWorker(
+                    self._render_settings(), self.render_queue_size)
+
+        if self.recorder is not None and len(self.recorder) == 0:
+            self.recorder.record(self.year, self.island)
+        if self.history is not None and self.history.last_year is None:
+            self.history.write(self.year, self.island)
 
         for _ in range(num_years):
             new_island_population = self.island.annual_cycle()
@@ -150,22 +354,134 @@ class BioSim:
             self.carnivore_list.append(
                 new_island_population[1]
             )
+            self.last_year_simulated += 1
+            if self.recorder is not None:
+                self.recorder.record(self.year, self.island)
+            if self.history is not None:
+                self.history.write(self.year, self.island)
+            if checkpoint_years > 0 and self.year % checkpoint_years == 0:
+                self.save_checkpoint(
+                    os.fspath(checkpoint_path).format(year=self.year))
+
+            if show_graphics and self.year % vis_years == 0:
+                save = img_years > 0 and self.year % img_years == 0
+                if self._renderer is not None:
+                    self._renderer.put(self.snapshot(save))
+                else:
+                    self.update_graphics()
+                    if save:
+                        self.save_graphics()
+
+        if self._renderer is not None:
+            self._renderer.wait()
+        if self.history is not None:
+            self.history.flush()
+
+    def _start_graphics(self, save_images):
+        """
+        Sets up the figure and plots the island map, the first time, and
+        starts ffmpeg if the saved visualizations are piped into a movie.
+
+        :param save_images: bool, True if visualizations will be saved.
+        """
+        if self._fig is None:
+            self.setup_graphics()
+            self.plot_island_map()
+        if (save_images and self.movie_fmt is not None and
+                self.img_base is not None and self._movie_writer is None):
+            self._open_movie_writer()
 
-            if num_years % vis_years == 0:
-                self.update_graphics()
+    def _render_settings(self):
+        """
+        The arguments the rendering process needs to draw the figure of this
+        simulation.
 
-            if num_years % img_years == 0:
-                self.save_graphics()
+        :return: dict.
+        """
+        return {"island_map": self.island_map,
+                "ymax_animals": self.ymax_animals,
+                "cmax_animals": self.cmax_animals,
+                "img_base": self.img_base,
+                "img_fmt": self.img_fmt,
+                "movie_fmt": self.movie_fmt}
 
-            self.last_year_simulated += 1
+    def snapshot(self, save=False):
+        """
+        Copies the state needed to draw the current year: the population
+        totals since the last snapshot, and the count and fodder grids.
+
+        :param save: bool, True if the frame is to be saved.
+        :return: biosim.rendering.Snapshot.
+        """
+        import biosim.rendering as br
+
+        herbivore_grid, carnivore_grid = self.island.count_grids
+        start, self._snapshot_start = (self._snapshot_start,
+                                       len(self.herbivore_list))
+        return br.Snapshot(
+            year=self.year, final_year=self._final_year,
+            herbivores=self.herbivore_list[start:],
+            carnivores=self.carnivore_list[start:],
+            herbivore_grid=herbivore_grid, carnivore_grid=carnivore_grid,
+            fodder_grid=self.island.fodder.copy(), save=save)
+
+    def save_checkpoint(self, path):
+        """
+        Saves the state of the simulation, see :mod:`biosim.checkpoint`.
+
+        :param path: str or os.PathLike, path of the checkpoint file.
+        """
+        import biosim.checkpoint as bc
+
+        bc.save(self, path)
+
+    @classmethod
+    def load_checkpoint(cls, path, **options):
+        """
+        Creates a simulation in the state saved by :meth:`save_checkpoint`.
+        Simulating on from it gives the same results as if the saved
+        simulation had not been interrupted.
+
+        :param path: str or os.PathLike, path of the checkpoint file.
+        :param options: keyword arguments of BioSim that are not part of the
+            state, e.g. img_base or ymax_animals
+        :return: BioSim.
+        """
+        import biosim.checkpoint as bc
+
+        return bc.load(cls, path, **options)
 
     def add_population(self, population):
         """
         Add a population to the island
 
-        :param population: List of dictionaries specifying population
+        :param population: List of dictionaries specifying population, or
+            any other sequence of them. For large populations, the animals
+            can instead be given as columns with one element per animal: a
+            dict or structured array indexed by 'loc_row', 'loc_col',
+            'species', 'age' and 'weight', a pandas.DataFrame with these
+            columns, or the path of a .npy or .npz file holding them, see
+            :func:`biosim.population.read_population`
         """
-        self.island.populate_the_island(population)
+        self._populate(population)
+
+    def _populate(self, population):
+        """
+        Adds a population given as dictionaries or as columns to the island.
+
+        :param population: sequence of dicts, dict, numpy.ndarray,
+            pandas.DataFrame or str, see :meth:`add_population`
+        """
+        if isinstance(population, (str, os.PathLike)):
+            population = bp.read_population(population)
+        if (isinstance(population, collections.abc.Mapping) or
+                getattr(population, "dtype", None) is not None and
+                population.dtype.names is not None or
+                hasattr(population, "columns")):
+            self.island.populate_from_arrays(
+                *(population[column] for column in bp.POPULATION_COLUMNS))
+        else:
+            self.island.populate_the_island(population)
 
     @property
     def year(self):
@@ -196,7 +512,11 @@ class BioSim:
     def animal_distribution(self):
         """
         Pandas DataFrame with animal count per species for each cell on island.
+        It is built when requested, and not used by the graphics, see
+        :attr:`biosim.island.Island.count_grids`.
         """
+        import pandas as pd
+
         pandas_population = pd.DataFrame(
             self.island.population_in_each_cell,
             columns=["Row", "Col",
@@ -205,15 +525,32 @@ class BioSim:
         )
         return pandas_population
 
-    def make_movie(self, movie_fmt):
+    def make_movie(self, movie_fmt="mp4"):
         """
         Create MPEG4 movie from visualization images saved.
 
+        If the frames were piped into ffmpeg while simulating, see movie_fmt
+        in :class:`BioSim`, this closes the pipe and waits for ffmpeg to
+        finish the movie. Otherwise, ffmpeg is run on the image files. With
+        background_graphics, the rendering process is stopped first.
+
         :param movie_fmt: str, movie format
         """
+        rendered_in_background = self._renderer is not None
+        self._close_renderer()
+
         if self.img_base is None:
             raise RuntimeError("No filename defined.")
 
+        if rendered_in_background and self.movie_fmt is not None:
+            return
+
+        if self._movie_writer is not None:
+            self._close_movie_writer()
+            return
+
+        import subprocess
+
         if movie_fmt == "mp4":
             try:
                 # Parameters chosen according to
@@ -232,32 +569,99 @@ class BioSim:
                 raise RuntimeError(
                     "ERROR: ffmpeg failed with: {}".format(err))
 
+    def _open_movie_writer(self):
+        """
+        Starts ffmpeg, reading raw RGB frames of the size of the figure from
+        its standard input and encoding them as the movie
+        '{img_base}.{movie_fmt}'.
+        """
+        import subprocess
+
+        width, height = (int(size) for size in self._fig.bbox.size)
+        self._frame_size = (height, width)
+        try:
+            # Same encoding parameters as in make_movie. The padding makes
+            # the size even, as required by yuv420p.
+            self._movie_writer = subprocess.Popen(
+                [_FFMPEG_BINARY,
+                 '-f', 'rawvideo',
+                 '-pix_fmt', 'rgb24',
+                 '-s', '{}x{}'.format(width, height),
+                 '-framerate', '5',
+                 '-i', '-',
+                 '-y',
+                 '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2',
+                 '-profile:v', 'baseline',
+                 '-level', '3.0',
+                 '-pix_fmt', 'yuv420p',
+                 '{}.{}'.format(self.img_base, self.movie_fmt)],
+                stdin=subprocess.PIPE)
+        except OSError as err:
+            raise RuntimeError("ERROR: ffmpeg could not be started: "
+                               "{}".format(err))
+
+    def _write_frame(self):
+        """
+        Sends the current content of the canvas to ffmpeg as one frame.
+        """
+        frame = np.asarray(self._fig.canvas.buffer_rgba())
+        if frame.shape[:2] != self._frame_size:
+            raise RuntimeError("The figure has changed size while writing "
+                               "the movie.")
+        try:
+            self._movie_writer.stdin.write(frame[:, :, :3].tobytes())
+        except BrokenPipeError:
+            self._close_movie_writer()
+
+    def _close_movie_writer(self):
+        """
+        Closes the pipe to ffmpeg and waits for it to finish the movie.
+        """
+        writer, self._movie_writer = self._movie_writer, None
+        try:
+            writer.stdin.close()
+        except BrokenPipeError:
+            pass
+        if writer.wait() != 0:
+            raise RuntimeError(
+                "ERROR: ffmpeg failed with exit status {}".format(
+                    writer.returncode))
+
     def setup_graphics(self):
         """
         Creates the subplots needed for the final plot.
         """
+        plt = _pyplot()
+
         # create new figure window
         if self._fig is None:
             self._fig = plt.figure(figsize=(12, 6))
+            # Lines and heatmaps are animated, i.e. drawn on top of a stored
+            # background, if the backend supports blitting
+            self._blit = getattr(self._fig.canvas, "supports_blit", False)
+            self._fig.canvas.mpl_connect("draw_event", self._store_background)
 
         # Add left subplot for images created with imshow().
         # We cannot create the actual ImageAxis object before we know
         # the size of the image, so we delay its creation.
         if self._map_ax is None:
-            self._map_ax = self._fig.add_subplot(2, 2, 1)
+            self._map_ax = self._fig.add_subplot(2, 3, 1)
             self._map_axis = None
 
         # Add right subplot for line graph of mean.
         if self._pop_ax is None:
-            self._pop_ax = self._fig.add_subplot(2, 2, 2)
+            self._pop_ax = self._fig.add_subplot(2, 3, (2, 3))
             if self.ymax_animals is not None:
                 self._pop_ax.set_ylim(0, self.ymax_animals)
 
         if self._herb_heat_ax is None:
-            self._herb_heat_ax = self._fig.add_subplot(2, 2, 3)
+            self._herb_heat_ax = self._fig.add_subplot(2, 3, 4)
 
         if self._carn_heat_ax is None:
-            self._carn_heat_ax = self._fig.add_subplot(2, 2, 4)
+            self._carn_heat_ax = self._fig.add_subplot(2, 3, 5)
+
+        if self._fodder_ax is None:
+            self._fodder_ax = self._fig.add_subplot(2, 3, 6)
 
     def plot_island_map(self):
         """
@@ -276,11 +680,12 @@ class BioSim:
         axim = self._map_ax  # llx, lly, w, h
         axim.imshow(map_rgb)
         axim.set_xticks(np.arange(0, len(map_rgb[0]), 5))
-        axim.set_xticklabels(np.arange(0, 1 + len(map_rgb[0]), 5))
+        axim.set_xticklabels(np.arange(1, 1 + len(map_rgb[0]), 5))
         axim.set_yticks(np.arange(0, len(map_rgb), 2))
-        axim.set_yticklabels(np.arange(0, 1 + len(map_rgb), 2))
+        axim.set_yticklabels(np.arange(1, 1 + len(map_rgb), 2))
 
-        axlg = self._fig.add_axes([0.04, 0.55, 0.1, 0.3])  # llx, lly, w, h
+        plt = _pyplot()
+        axlg = self._fig.add_axes([0.01, 0.55, 0.07, 0.3])  # llx, lly, w, h
         axlg.axis('off')
         for ix, name in enumerate(('Ocean', 'Mountain', 'Jungle',
                                    'Savannah', 'Desert')):
@@ -291,36 +696,85 @@ class BioSim:
 
     def plot_population_graph(self):
         """
-        Plots the total herbivore and carnivore population for a given year.
-        """
-        if self._pop_axis is None:
-            self._pop_ax.plot(
-                [i for i in range(len(self.herbivore_list))],
-                self.herbivore_list, 'g-')
-            self._pop_ax.plot(
-                [i for i in range(len(self.carnivore_list))],
-                self.carnivore_list, 'r-')
+        Plots the total herbivore and carnivore population up to the current
+        year. The lines are created once, on a year axis reaching the final
+        year of the simulation, and only their data are updated afterwards.
+        The axis is extended when a later simulation goes further.
+        """
+        final_year = max(self._final_year, self.year)
+        if self._herb_line is None:
+            years = np.arange(final_year + 1)
+            self._herb_line = self._pop_ax.plot(
+                years, np.full(len(years), np.nan), 'g-',
+                animated=self._blit)[0]
+            self._carn_line = self._pop_ax.plot(
+                years, np.full(len(years), np.nan), 'r-',
+                animated=self._blit)[0]
+            self._line_years = 0
             self._pop_ax.legend(
                 ["Herbivores", "Carnivores"], loc="upper left")
-
-    def plot_heatmap(self):
-        """
-        Plots the herbivore and carnivore distribution as heatmaps.
-        """
-        df = self.animal_distribution
-        herbivore_array = df.pivot_table(
-            columns="Col", index="Row", values="Herbivore")
-        carnivore_array = df.pivot_table(
-            columns="Col", index="Row", values="Carnivore")
+            if self._blit:
+                # Only the years since the last frame are drawn, on top of
+                # the lines already on the canvas
+                self._herb_tail = self._pop_ax.plot(
+                    [], [], 'g-', animated=True,
+                    solid_capstyle='butt')[0]
+                self._carn_tail = self._pop_ax.plot(
+                    [], [], 'r-', animated=True,
+                    solid_capstyle='butt')[0]
+            self._pop_ax.set_xlim(0, final_year)
+            self._background = None
+        elif len(self._herb_line.get_xdata()) <= final_year:
+            years = np.arange(final_year + 1)
+            for line in (self._herb_line, self._carn_line):
+                y_data = np.full(len(years), np.nan)
+                y_data[:len(line.get_ydata())] = line.get_ydata()
+                line.set_data(years, y_data)
+            self._pop_ax.set_xlim(0, final_year)
+            self._background = None
+
+        # Only the totals of the years since the last update are copied
+        start = self._line_years
+        for line, counts in ((self._herb_line, self.herbivore_list),
+                             (self._carn_line, self.carnivore_list)):
+            y_data = line.get_ydata()
+            y_data[start:len(counts)] = counts[start:]
+            line.set_ydata(y_data)
+        self._line_years = len(self.herbivore_list)
+
+        if self.ymax_animals is None:
+            largest = max(self.herbivore_list[-1], self.carnivore_list[-1])
+            if largest > self._pop_ax.get_ylim()[1]:
+                self._pop_ax.set_ylim(0, 1.2 * largest)
+                self._background = None
+
+    def plot_heatmap(self, count_grids=None, fodder_grid=None):
+        """
+        Plots the herbivore and carnivore distribution as heatmaps, from the
+        count grids of the island, and the fodder of every cell. The colour
+        scale of the fodder reaches the largest f_max of the island.
+
+        :param count_grids: tuple, herbivore and carnivore counts with the
+                            shape of the map, to plot instead of those of
+                            the island.
+        :param fodder_grid: numpy.ndarray, fodder with the shape of the map,
+                            to plot instead of that of the island.
+        """
+        if count_grids is None:
+            count_grids = self.island.count_grids
+        herbivore_array, carnivore_array = count_grids
+        if fodder_grid is None:
+            fodder_grid = self.island.fodder
 
         if self.cmax_animals is None:
             self.cmax_animals = 100
 
+        plt = _pyplot()
         if self._herb_heat_axis is None:
             self._herb_heat_axis = self._herb_heat_ax.imshow(
                 herbivore_array, cmap="BuGn",
                 interpolation="nearest",
-                vmax=self.cmax_animals)
+                vmax=self.cmax_animals, animated=self._blit)
             plt.colorbar(self._herb_heat_axis, ax=self._herb_heat_ax)
         else:
             self._herb_heat_axis.set_data(herbivore_array)
@@ -329,26 +783,123 @@ class BioSim:
             self._carn_heat_axis = self._carn_heat_ax.imshow(
                 carnivore_array, cmap="OrRd",
                 interpolation="nearest",
-                vmax=self.cmax_animals)
+                vmax=self.cmax_animals, animated=self._blit)
             plt.colorbar(self._carn_heat_axis, ax=self._carn_heat_ax)
         else:
             self._carn_heat_axis.set_data(carnivore_array)
 
-    def update_graphics(self):
+        if self._fodder_axis is None:
+            self._fodder_axis = self._fodder_ax.imshow(
+                fodder_grid, cmap="YlGn", interpolation="nearest",
+                vmin=0, vmax=max(self.island.f_max.max(), 1),
+                animated=self._blit)
+            plt.colorbar(self._fodder_axis, ax=self._fodder_ax)
+        else:
+            self._fodder_axis.set_data(fodder_grid)
+
+    def update_graphics(self, count_grids=None, fodder_grid=None):
         """
-        Updates the images.
+        Updates the images. If the backend supports blitting, only the
+        heatmaps are drawn, on top of their background stored after the last
+        full redraw, and the population lines are extended by the years
+        since the last frame, so that every frame takes the same time. The
+        figure is redrawn in full the first time, and when the axis limits
+        have changed.
+
+        :param count_grids: tuple, herbivore and carnivore counts to plot
+                            instead of those of the island, see
+                            :meth:`plot_heatmap`.
+        :param fodder_grid: numpy.ndarray, fodder to plot instead of that of
+                            the island.
         """
         self.plot_population_graph()
-        self.plot_heatmap()
-        plt.pause(1e-3)
+        self.plot_heatmap(count_grids, fodder_grid)
+
+        canvas = self._fig.canvas
+        if self._blit and self._background is not None:
+            for region in self._background:
+                canvas.restore_region(region)
+            self._fig.draw_artist(self._herb_heat_axis)
+            self._fig.draw_artist(self._carn_heat_axis)
+            self._fig.draw_artist(self._fodder_axis)
+            self._draw_tails()
+            canvas.blit(self._fig.bbox)
+            canvas.flush_events()
+        else:
+            # The figure is drawn once, when the window is shown or the
+            # events are processed
+            canvas.draw_idle()
+            if self._window_shown:
+                canvas.flush_events()
+            else:
+                _pyplot().pause(1e-3)
+                self._window_shown = True
+
+    def _draw_tails(self):
+        """
+        Draws the population lines from the last year drawn to the current
+        year.
+        """
+        start = self._drawn_index
+        end = len(self.herbivore_list)
+        if end - start < 2:
+            return
+        years = np.arange(start, end)
+        self._herb_tail.set_data(years, self.herbivore_list[start:end])
+        self._carn_tail.set_data(years, self.carnivore_list[start:end])
+        self._fig.draw_artist(self._herb_tail)
+        self._fig.draw_artist(self._carn_tail)
+        self._drawn_index = end - 1
+
+    def _animated_artists(self):
+        """
+        The artists that change between updates.
+
+        :return: list.
+        """
+        return [artist for artist in (self._herb_line, self._carn_line,
+                                      self._herb_heat_axis,
+                                      self._carn_heat_axis,
+                                      self._fodder_axis)
+                if artist is not None]
+
+    def _draw_animated(self):
+        """
+        Draws the animated artists on the canvas.
+        """
+        for artist in self._animated_artists():
+            self._fig.draw_artist(artist)
+
+    def _store_background(self, event):
+        """
+        Stores the heatmap axes without the heatmaps after a full redraw,
+        e.g. when the window is resized, and draws the animated artists on
+        top, with the population lines up to the current year.
+
+        :param event: matplotlib.backend_bases.DrawEvent.
+        """
+        if self._blit:
+            self._background = [
+                self._fig.canvas.copy_from_bbox(axes.bbox)
+                for axes in (self._herb_heat_ax, self._carn_heat_ax,
+                             self._fodder_ax)]
+            self._draw_animated()
+            self._drawn_index = max(len(self.herbivore_list) - 1, 0)
 
     def save_graphics(self):
         """
-        Saves the images.
+        Saves the images, or sends them to ffmpeg if a movie is being
+        written.
         """
         if self.img_base is None:
             return
 
-        plt.savefig(f"{self.img_base}_{self._img_ctr:05d}.{self.img_fmt}")
+        if self._movie_writer is not None:
+            self._write_frame()
+            self._img_ctr += 1
+            return
+
+        _pyplot().savefig(
+            f"{self.img_base}_{self._img_ctr:05d}.{self.img_fmt}")
 
         self._img_ctr += 1
@@ -0,0 +1,457 @@
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`biosim.sweep` runs a simulation for every combination of parameter
+values and seeds, in a pool of worker processes.
+
+Every run is a simulation with its own parameters: those of the animal and
+landscape classes when the sweep was created, updated with those of the
+run. The parameters of the classes in the workers are never changed, so the
+workers can be reused for many runs without one run affecting the next.
+
+The results are streamed back as the runs finish, as :class:`RunResult`, and
+can be collected into one array or DataFrame. A run is only handed to a
+worker when the worker is idle, so a sweep of many thousand runs does not
+queue them all at once, and the runs in progress can be limited further by
+``max_pending``.
+
+A run that exceeds its timeout is stopped after the year in progress, and
+returns the years simulated so far. A run still busy ``TIMEOUT_GRACE``
+seconds after its timeout, e.g. because a year never ends, is stopped by
+terminating its worker, which is replaced by a new one. Such a run returns
+no years.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import collections
+import itertools
+import multiprocessing
+import multiprocessing.connection
+import os
+import time
+
+import numpy as np
+
+import biosim.animals as ba
+import biosim.landscape as bl
+
+ANIMAL_CLASSES = {"Herbivore": ba.Herbivore, "Carnivore": ba.Carnivore}
+LANDSCAPE_CLASSES = {"J": bl.Jungle, "S": bl.Savannah, "D": bl.Desert,
+                     "M": bl.Mountain, "O": bl.Ocean}
+
+# Seconds a run may take after its timeout before its worker is terminated
+TIMEOUT_GRACE = 1.0
+
+RunResult = collections.namedtuple(
+    "RunResult", ["index", "parameters", "seed", "herbivores", "carnivores",
+                  "status", "seconds"])
+RunResult.__doc__ = """
+The result of one run of a sweep.
+
+:param index: int, number of the run, see :attr:`Sweep.runs`.
+:param parameters: dict, parameters of the run, by species or landscape.
+:param seed: int, seed of the run.
+:param herbivores: numpy.ndarray, number of herbivores in each year,
+                   starting with year 0.
+:param carnivores: numpy.ndarray, number of carnivores in each year.
+:param status: str, "done", "timeout", or the error that stopped the run.
+:param seconds: float, time of the run.
+"""
+
+_base_parameters = None
+
+
+def current_parameters():
+    """
+    Copies the current parameters of all animal and landscape classes.
+
+    :return: dict, parameters by species or landscape code.
+    """
+    parameters = {name: species.parameters.as_dict()
+                  for name, species in ANIMAL_CLASSES.items()}
+    parameters.update({code: landscape.parameters.as_dict()
+                       for code, landscape in LANDSCAPE_CLASSES.items()})
+    return parameters
+
+
+def set_parameters(parameters):
+    """
+    Sets the parameters of animal and landscape classes, which new
+    simulations start from.
+
+    :param parameters: dict, parameters by species or landscape code.
+    """
+    for name, values in parameters.items():
+        if name in ANIMAL_CLASSES:
+            ANIMAL_CLASSES[name].set_animal_parameters(values)
+        elif name in LANDSCAPE_CLASSES:
+            LANDSCAPE_CLASSES[name].set_landscape_parameters(values)
+        else:
+            raise ValueError("Unknown species or landscape " + repr(name) +
+                             ".")
+
+
+def parameter_grid(grid):
+    """
+    Lists every combination of the parameter values of a grid.
+
+    :param grid: dict, for each species or landscape code a dict of the
+                 values of each parameter, e.g.
+                 {"Herbivore": {"zeta": [3.0, 3.5]}, "Carnivore": {"F": [50]}}
+    :return: list, dicts of parameters by species or landscape code.
+    """
+    keys = [(name, parameter) for name, values in grid.items()
+            for parameter in values]
+    combinations = []
+    for values in itertools.product(*(grid[name][parameter]
+                                      for name, parameter in keys)):
+        parameters = {name: {} for name in grid}
+        for (name, parameter), value in zip(keys, values):
+            parameters[name][parameter] = value
+        combinations.append(parameters)
+    return combinations
+
+
+def merge_parameters(base, parameters):
+    """
+    Updates parameters by species or landscape code with those of a run.
+
+    :param base: dict, parameters by species or landscape code.
+    :param parameters: dict, the parameters that replace those of base.
+    :return: dict, a new dict of parameters.
+    """
+    merged = {name: dict(values) for name, values in base.items()}
+    for name, values in parameters.items():
+        merged.setdefault(name, {}).update(values)
+    return merged
+
+
+def _initialize(base_parameters):
+    """
+    Stores the parameters every run of a worker starts from.
+
+    :param base_parameters: dict, parameters by species or landscape code.
+    """
+    global _base_parameters
+    _base_parameters = base_parameters
+
+
+def _run(task):
+    """
+    Simulates one run of a sweep, one year at a time, until all years are
+    simulated or the timeout has passed.
+
+    :param task: tuple, the index, parameters and seed of the run, the
+                 island map, the initial population, the number of years,
+                 the timeout and keyword arguments of BioSim.
+    :return: RunResult.
+    """
+    from biosim.simulation import BioSim
+
+    (index, parameters, seed, island_map, ini_pop, num_years, timeout,
+     options) = task
+    start = time.perf_counter()
+    status = "done"
+    sim = None
+    try:
+        sim = BioSim(island_map, ini_pop, seed, graphics=False,
+                     parameters=merge_parameters(_base_parameters or {},
+                                                 parameters), **options)
+        for _ in range(num_years):
+            if timeout is not None and time.perf_counter() - start > timeout:
+                status = "timeout"
+                break
+            sim.simulate(1, vis_years=0)
+    except Exception as error:
+        status = "{}: {}".format(type(error).__name__, error)
+    herbivores = carnivores = []
+    if sim is not None:
+        herbivores, carnivores = sim.herbivore_list, sim.carnivore_list
+    return RunResult(index, parameters, seed,
+                     np.array(herbivores, dtype=np.int64),
+                     np.array(carnivores, dtype=np.int64), status,
+                     time.perf_counter() - start)
+
+
+def _work(connection, base_parameters):
+    """
+    Runs the tasks received on a connection, and sends back their results,
+    until None is received.
+
+    :param connection: multiprocessing.connection.Connection.
+    :param base_parameters: dict, parameters by species or landscape code.
+    """
+    _initialize(base_parameters)
+    for task in iter(connection.recv, None):
+        connection.send(_run(task))
+
+
+class _Worker:
+    """
+    This class holds a worker process of a sweep, and the run it is busy
+    with.
+    """
+
+    def __init__(self, base_parameters):
+        """
+        This method starts the worker process.
+
+        :param base_parameters: dict, parameters by species or landscape
+                                code.
+        """
+        self.connection, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_work, args=(child, base_parameters))
+        self.process.start()
+        child.close()
+        self.task = None
+        self.started = None
+        self.runs = 0
+
+    def submit(self, task):
+        """
+        Hands a run to the worker.
+
+        :param task: tuple, see :func:`_run`.
+        """
+        self.connection.send(task)
+        self.task = task
+        self.started = time.perf_counter()
+
+    def result(self):
+        """
+        Receives the result of the run the worker is busy with.
+
+        :return: RunResult.
+        """
+        try:
+            result = self.connection.recv()
+        except EOFError:
+            self.process.join()
+            result = self.failed("WorkerError: worker exited with code "
+                                 "{}".format(self.process.exitcode))
+        self.task = None
+        self.runs += 1
+        return result
+
+    def failed(self, status):
+        """
+        Creates the result of a run that did not return one.
+
+        :param status: str, status of the run.
+        :return: RunResult.
+        """
+        index, parameters, seed = self.task[:3]
+        return RunResult(index, parameters, seed, np.array([], np.int64),
+                         np.array([], np.int64), status,
+                         time.perf_counter() - self.started)
+
+    def stop(self):
+        """
+        Stops the worker process, waiting for it if it is idle and
+        terminating it if it is busy.
+        """
+        if self.task is None and self.process.is_alive():
+            try:
+                self.connection.send(None)
+            except OSError:
+                pass
+            self.process.join(TIMEOUT_GRACE)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self.connection.close()
+
+
+class Sweep:
+    """
+    This class runs a simulation for every combination of parameter values
+    and seeds in a pool of worker processes.
+    """
+
+    def __init__(self, island_map, ini_pop, grid, seeds, num_years,
+                 processes=None, max_pending=None, timeout=None,
+                 max_runs_per_worker=None, **options):
+        """
+        This method creates variables needed for the class.
+
+        :param island_map: str, multi-line string specifying the island.
+        :param ini_pop: list, initial population of every run.
+        :param grid: dict, values of each parameter, see
+                     :func:`parameter_grid`.
+        :param seeds: list, seeds, each of which is run with every
+                      combination of parameter values.
+        :param num_years: int, number of years of each run.
+        :param processes: int, number of worker processes. Defaults to the
+                          number of cores.
+        :param max_pending: int, largest number of runs in progress at a
+                            time. As every worker runs one run at a time,
+                            it is at most the number of processes, which
+                            is also the default.
+        :param timeout: float, seconds after which a run is stopped at the
+                        end of the year in progress, or None. A run still
+                        busy TIMEOUT_GRACE seconds later is stopped by
+                        terminating its worker.
+        :param max_runs_per_worker: int, number of runs after which a worker
+                                    is replaced, or None to reuse the
+                                    workers for the whole sweep.
+        :param options: keyword arguments of
+                        :class:`biosim.simulation.BioSim`, e.g. engine.
+        """
+        self.island_map = island_map
+        self.ini_pop = ini_pop
+        self.grid = grid
+        self.parameter_sets = parameter_grid(grid)
+        self.seeds = list(seeds)
+        self.num_years = num_years
+        self.processes = processes
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.max_runs_per_worker = max_runs_per_worker
+        self.options = options
+        self.base_parameters = current_parameters()
+
+    @property
+    def runs(self):
+        """
+        The parameters and seed of every run, with all seeds of the first
+        parameter set first.
+
+        :return: list, tuples of parameters and seed.
+        """
+        return [(parameters, seed) for parameters in self.parameter_sets
+                for seed in self.seeds]
+
+    def stream(self):
+        """
+        Runs the sweep, and yields the result of each run as it finishes.
+
+        :return: generator of RunResult.
+        """
+        tasks = [
+            (index, parameters, seed, self.island_map, self.ini_pop,
+             self.num_years, self.timeout, self.options)
+            for index, (parameters, seed) in enumerate(self.runs)]
+        tasks.reverse()
+        processes = self.processes or os.cpu_count() or 1
+        max_pending = processes
+        if self.max_pending is not None:
+            max_pending = min(self.max_pending, processes)
+        workers = []
+        try:
+            while True:
+                busy = [worker for worker in workers
+                        if worker.task is not None]
+                for _ in range(min(len(tasks), max_pending - len(busy))):
+                    worker = next((worker for worker in workers
+                                   if worker.task is None), None)
+                    if worker is None:
+                        if len(workers) == processes:
+                            break
+                        worker = _Worker(self.base_parameters)
+                        workers.append(worker)
+                    worker.submit(tasks.pop())
+                    busy.append(worker)
+                if not busy:
+                    return
+
+                wait = None
+                if self.timeout is not None:
+                    wait = max(0.0, min(
+                        worker.started for worker in busy) + self.timeout +
+                        TIMEOUT_GRACE - time.perf_counter())
+                ready = multiprocessing.connection.wait(
+                    [worker.connection for worker in busy], wait)
+
+                for worker in busy:
+                    if worker.connection in ready:
+                        result = worker.result()
+                        replace = not worker.process.is_alive() or (
+                            self.max_runs_per_worker is not None and
+                            worker.runs >= self.max_runs_per_worker)
+                    elif (self.timeout is not None and
+                          time.perf_counter() - worker.started >
+                          self.timeout + TIMEOUT_GRACE):
+                        result = worker.failed("timeout")
+                        replace = True
+                    else:
+                        continue
+                    if replace:
+                        worker.stop()
+                        workers.remove(worker)
+                    yield result
+        finally:
+            # Runs not yet started are dropped if the caller stops early
+            for worker in workers:
+                worker.stop()
+
+    def run(self):
+        """
+        Runs the sweep.
+
+        :return: list, RunResult of every run, in the order of :attr:`runs`.
+        """
+        return sorted(self.stream(), key=lambda result: result.index)
+
+    def to_array(self, results):
+        """
+        Collects the population time series of the runs into one array.
+        Years not simulated, because of a timeout or an error, are NaN.
+
+        :param results: list, RunResult of the runs.
+        :return: numpy.ndarray, shape (parameter sets, seeds, 2, years + 1),
+                 with herbivores before carnivores on the third axis.
+        """
+        array = np.full((len(self.parameter_sets), len(self.seeds), 2,
+                         self.num_years + 1), np.nan)
+        for result in results:
+            parameter_set, seed = divmod(result.index, len(self.seeds))
+            for species, counts in enumerate((result.herbivores,
+                                              result.carnivores)):
+                array[parameter_set, seed, species, :len(counts)] = counts
+        return array
+
+    def to_dataframe(self, results):
+        """
+        Collects the population time series of the runs into one DataFrame,
+        with one row per run and year, and one column per swept parameter,
+        named by species or landscape code and parameter, e.g.
+        "Herbivore.zeta". A run without any years, because it was stopped or
+        failed before its first year, has one row with its status and a
+        missing year and counts, which are nullable integers.
+
+        :param results: list, RunResult of the runs.
+        :return: pandas.DataFrame.
+        """
+        import pandas as pd
+
+        if not results:
+            columns = ["run", "seed"] + [
+                name + "." + parameter
+                for name, values in self.grid.items()
+                for parameter in values] + [
+                "year", "herbivores", "carnivores", "status"]
+            return pd.DataFrame(columns=columns)
+        frames = []
+        for result in results:
+            # A run without years, e.g. one stopped inside its first year,
+            # keeps one row with its status, and missing counts
+            years = list(range(len(result.herbivores))) or [None]
+            n_rows = len(years)
+            frame = {"run": np.full(n_rows, result.index),
+                     "seed": np.full(n_rows, result.seed)}
+            for name, values in result.parameters.items():
+                for parameter, value in values.items():
+                    frame[name + "." + parameter] = np.full(n_rows, value)
+            frame.update(
+                year=pd.array(years, dtype="Int64"),
+                herbivores=pd.array(result.herbivores.tolist() or [None],
+                                    dtype="Int64"),
+                carnivores=pd.array(result.carnivores.tolist() or [None],
+                                    dtype="Int64"),
+                status=np.full(n_rows, result.status))
+            frames.append(pd.DataFrame(frame))
+        return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,827 @@
+# -*- coding: utf-8 -*-
+
+"""
+:mod:`biosim.tiled` defines an island that spreads the annual cycle over
+several processes. The map is partitioned into tiles of whole rows. Each
+tile is kept by a worker process, which holds the animals of its cells,
+stored as in :mod:`biosim.population`, and their fodder from one year to
+the next. Every year, the island exchanges three rounds of messages with
+the tiles:
+
+1. Each tile regrows its fodder, and its animals feed and procreate. The
+   tile sends back the exponents of the migration propensities of its first
+   and last row, see :meth:`biosim.island.Island.propensity_exponents`.
+2. Each tile receives the exponents of the rows bordering it from the
+   neighbouring tiles, computes the migration probabilities of its cells
+   and lets its animals migrate. The animals that have moved to a cell of
+   another tile are sent back.
+3. Each tile receives the animals that have moved into it from other tiles,
+   and all its animals age, lose weight and die. The tile sends back the
+   number of animals of each species.
+
+Only the border rows and the migrants are thus sent between processes.
+Each tile draws its random numbers from a generator seeded by the island
+every year, so the result only depends on the seed and the number of
+tiles, not on how the operating system schedules the workers.
+
+The animals are collected in the main process only when they are read or
+changed there, e.g. through :attr:`TiledIsland.herbivores` or by placing a
+population, and are handed back to the tiles at the start of the next year.
+The counts, statistics and arrays used for graphics, recorders and
+checkpoints are computed by the tiles, and leave the animals where they
+are. The fodder read in the main process is sent back the next year.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import multiprocessing
+
+import numpy as np
+
+import biosim.animals as ba
+import biosim.island as bi
+import biosim.population as bp
+
+
+def _population(species, arrays, first_cell=0):
+    """
+    Builds a population from the arrays sent between processes. The fitness
+    is sent along, so that it is not recomputed.
+
+    :param species: class, :class:`biosim.animals.Herbivore` or
+                    :class:`biosim.animals.Carnivore`.
+    :param arrays: tuple, age, weight, fitness and cell index of the
+                   animals, with cell indices referring to the whole island.
+    :param first_cell: int, flat index of the first cell of the tile the
+                       population belongs to.
+    :return: SpeciesPopulation.
+    """
+    population = bp.SpeciesPopulation(species)
+    _extend(population, arrays, first_cell)
+    return population
+
+
+def _extend(population, arrays, first_cell=0):
+    """
+    Appends the animals sent between processes to a population.
+
+    :param population: SpeciesPopulation.
+    :param arrays: tuple, age, weight, fitness and cell index of the
+                   animals, with cell indices referring to the whole island.
+    :param first_cell: int, flat index of the first cell of the tile the
+                       population belongs to.
+    """
+    age, weight, fitness, cell = arrays
+    population.age = np.concatenate(
+        (population.age, np.asarray(age, dtype=np.int64)))
+    population.weight = np.concatenate(
+        (population.weight, np.asarray(weight, dtype=float)))
+    population.fitness = np.concatenate(
+        (population.fitness, np.asarray(fitness, dtype=float)))
+    population.cell = np.concatenate(
+        (population.cell, np.asarray(cell, dtype=np.intp) - first_cell))
+
+
+def _arrays(population, first_cell=0, mask=None):
+    """
+    Copies the animals of a population into the arrays sent between
+    processes.
+
+    :param population: SpeciesPopulation.
+    :param first_cell: int, flat index of the first cell of the tile the
+                       population belongs to.
+    :param mask: numpy.ndarray, bool, the animals to copy, or None for all.
+    :return: tuple, age, weight, fitness and cell index of the animals, with
+             cell indices referring to the whole island.
+    """
+    if mask is None:
+        mask = slice(None)
+    return (population.age[mask], population.weight[mask],
+            population.fitness[mask], population.cell[mask] + first_cell)
+
+
+def _concatenate(arrays):
+    """
+    Joins the arrays sent by several tiles.
+
+    :param arrays: list, age, weight, fitness and cell arrays of each tile.
+    :return: tuple, age, weight, fitness and cell arrays.
+    """
+    return tuple(np.concatenate(column) for column in zip(*arrays))
+
+
+def _species(parameters):
+    """
+    Binds the animal parameters sent between processes to species classes
+    of the worker, see :meth:`biosim.animals.Animal.bind`.
+
+    :param parameters: tuple, herbivore and carnivore parameter sets.
+    :return: tuple, herbivore and carnivore classes.
+    """
+    return tuple(species.bind(species_parameters)
+                 for species, species_parameters in zip(
+                     (ba.Herbivore, ba.Carnivore), parameters))
+
+
+class Tile:
+    """
+    This class holds the animals and fodder of one tile, and carries out the
+    annual cycle for them. Cell indices within the tile count from its first
+    cell.
+    """
+
+    def __init__(self, first_cell, n_cells, n_cols, neighbours, habitable):
+        """
+        This method creates variables needed for the class.
+
+        :param first_cell: int, flat index of the first cell of the tile.
+        :param n_cells: int, number of cells of the tile.
+        :param n_cols: int, number of columns of the map.
+        :param neighbours: numpy.ndarray, shape (n_cells, 4), flat indices of
+                           the neighbours of each cell of the tile, -1
+                           outside the map.
+        :param habitable: numpy.ndarray, bool, whether each cell of the tile
+                          is habitable.
+        """
+        self.first_cell = first_cell
+        self.n_cells = n_cells
+        self.n_cols = n_cols
+        self.habitable = habitable
+        # Neighbours in other tiles get indices outside the tile
+        self.neighbours = neighbours - first_cell
+        # Index of each neighbour in the exponents of the row above the
+        # tile, the tile and the row below it. The last element is looked
+        # up by neighbours outside the map.
+        self.border_neighbours = np.where(
+            neighbours < 0, n_cells + 2 * n_cols,
+            neighbours - first_cell + n_cols)
+
+        self.fodder = np.zeros(n_cells)
+        self.f_max = np.zeros(n_cells)
+        self.alpha = np.zeros(n_cells)
+        self.animal_types = _species((ba.Herbivore.parameters,
+                                      ba.Carnivore.parameters))
+        self.herbivores = bp.SpeciesPopulation(self.animal_types[0])
+        self.carnivores = bp.SpeciesPopulation(self.animal_types[1])
+        self.rng = None
+        self.exponents = None
+
+    @property
+    def populations(self):
+        """
+        The herbivores and carnivores of the tile.
+
+        :return: tuple.
+        """
+        return self.herbivores, self.carnivores
+
+    def load(self, parameters=None, animals=None, fodder=None):
+        """
+        Replaces the parts of the state of the tile that have been changed
+        in the main process.
+
+        :param parameters: tuple, the herbivore and carnivore parameter sets
+                           and the maximum fodder and regrowth rate of each
+                           cell, or None to keep them.
+        :param animals: tuple, the herbivore and carnivore arrays, or None
+                        to keep the animals.
+        :param fodder: numpy.ndarray, fodder of each cell, or None to keep
+                       it.
+        """
+        if parameters is not None:
+            animal_parameters, self.f_max, self.alpha = parameters
+            self.animal_types = _species(animal_parameters)
+            for population, species in zip(self.populations,
+                                           self.animal_types):
+                population.species = species
+        if animals is not None:
+            self.herbivores, self.carnivores = (
+                _population(species, arrays, self.first_cell)
+                for species, arrays in zip(self.animal_types, animals))
+        if fodder is not None:
+            self.fodder = fodder
+
+    def feed(self, seed):
+        """
+        Regrows the fodder, lets the animals feed and procreate, and finds
+        the exponents of the migration propensities of all cells.
+
+        :param seed: int, seed of the random number generator of the tile
+                     for this year.
+        :return: tuple, for both species the exponents of the first and the
+                 last row of the tile.
+        """
+        self.rng = np.random.default_rng(seed)
+        self.fodder = self.f_max - (1 - self.alpha) * (
+                self.f_max - self.fodder)
+        self.herbivores.sort_by_fitness()
+        self.herbivores.eat_fodder(self.fodder)
+        self.carnivores.hunt(self.herbivores, self.rng, self.n_cells)
+        for population in self.populations:
+            population.reproduction(self.rng, self.n_cells)
+
+        self.exponents = self.propensity_exponents()
+        return tuple((exponent[:self.n_cols], exponent[-self.n_cols:])
+                     for exponent in self.exponents)
+
+    def propensity_exponents(self):
+        """
+        Calculates the exponents of the migration propensities of all cells
+        of the tile, see :meth:`biosim.island.Island.propensity_exponents`.
+
+        :return: tuple, herbivore and carnivore arrays.
+        """
+        return bi.Island.propensity_exponents(
+            self.animal_types, self.fodder,
+            self.herbivores.count_per_cell(self.n_cells),
+            self.carnivores.count_per_cell(self.n_cells),
+            self.herbivores.mass_per_cell(self.n_cells), self.habitable)
+
+    def migration_probability(self, above, below):
+        """
+        Calculates the probability of moving from each cell of the tile to
+        each of its neighbours, from the exponents of the tile and of the
+        rows bordering it.
+
+        :param above: tuple, herbivore and carnivore exponents of the row
+                      above the tile, -inf outside the map.
+        :param below: tuple, herbivore and carnivore exponents of the row
+                      below the tile, -inf outside the map.
+        :return: tuple, arrays of shape (cells, 4) for herbivores and
+                 carnivores.
+        """
+        return tuple(
+            bi.Island.normalise_propensities(np.concatenate(
+                (row_above, exponent, row_below, [-np.inf]))[
+                self.border_neighbours])
+            for exponent, row_above, row_below in zip(
+                self.exponents, above, below))
+
+    def migrate(self, above, below):
+        """
+        Migrates the animals, and takes those that have left the tile out
+        of it.
+
+        :param above: tuple, herbivore and carnivore exponents of the row
+                      above the tile, -inf outside the map.
+        :param below: tuple, herbivore and carnivore exponents of the row
+                      below the tile, -inf outside the map.
+        :return: tuple, the herbivore and carnivore arrays of the animals
+                 that have left the tile.
+        """
+        emigrants = []
+        for population, probability in zip(
+                self.populations, self.migration_probability(above, below)):
+            population.migrate(self.rng, probability, self.neighbours)
+            leaving = (population.cell < 0) | (
+                    population.cell >= self.n_cells)
+            emigrants.append(_arrays(population, self.first_cell, leaving))
+            population.keep(~leaving)
+        return tuple(emigrants)
+
+    def settle(self, immigrants):
+        """
+        Adds the animals that have moved into the tile, and lets all animals
+        age, lose weight and die.
+
+        :param immigrants: tuple, the herbivore and carnivore arrays of the
+                           animals that have moved into the tile.
+        :return: tuple, number of herbivores and carnivores in the tile.
+        """
+        for population, arrays in zip(self.populations, immigrants):
+            _extend(population, arrays, self.first_cell)
+            population.aging()
+            population.weight_loss()
+            population.death(self.rng)
+        return self.sizes()
+
+    def sizes(self):
+        """
+        Finds the number of animals of each species in the tile.
+
+        :return: tuple.
+        """
+        return len(self.herbivores), len(self.carnivores)
+
+    def animals(self):
+        """
+        Copies the animals of the tile into the arrays sent between
+        processes.
+
+        :return: tuple, the herbivore and carnivore arrays.
+        """
+        return tuple(_arrays(population, self.first_cell)
+                     for population in self.populations)
+
+    def get_fodder(self):
+        """
+        The fodder of each cell of the tile.
+
+        :return: numpy.ndarray.
+        """
+        return self.fodder
+
+    def statistics(self):
+        """
+        Finds, for both species, the number of animals, their total weight
+        and the sum of their fitness in every cell of the tile.
+
+        :return: tuple, for each species a tuple of three arrays.
+        """
+        return tuple(
+            (population.count_per_cell(self.n_cells),
+             population.mass_per_cell(self.n_cells),
+             np.bincount(population.cell, weights=population.fitness,
+                         minlength=self.n_cells))
+            for population in self.populations)
+
+
+def _serve(connection, tile):
+    """
+    Answers the requests of the island to a tile in a worker process, until
+    it receives None. A request is the name of a method of the tile and its
+    arguments. The result is sent back, or the error the method raised.
+
+    :param connection: multiprocessing.connection.Connection.
+    :param tile: Tile.
+    """
+    while True:
+        request = connection.recv()
+        if request is None:
+            break
+        name, args = request
+        try:
+            connection.send((True, getattr(tile, name)(*args)))
+        except Exception as error:
+            connection.send((False, error))
+    connection.close()
+
+
+class LocalTile:
+    """
+    This class calls the methods of a tile in the main process, with the
+    same interface as :class:`TileProcess`. It is used when there is a
+    single worker.
+    """
+
+    def __init__(self, tile):
+        """
+        This method creates variables needed for the class.
+
+        :param tile: Tile.
+        """
+        self.tile = tile
+        self._result = None
+
+    def send(self, name, *args):
+        """
+        Calls a method of the tile.
+
+        :param name: str, name of the method.
+        :param args: arguments of the method.
+        """
+        self._result = getattr(self.tile, name)(*args)
+
+    def receive(self):
+        """
+        The result of the last method called.
+        """
+        return self._result
+
+    def close(self):
+        """
+        Nothing to shut down.
+        """
+
+    def terminate(self):
+        """
+        Nothing to shut down.
+        """
+
+
+class TileProcess:
+    """
+    This class keeps a tile in a worker process, and sends it requests
+    through a pipe. Requests are answered in the order they are sent, so
+    the requests to all tiles can be sent before any result is received.
+    """
+
+    def __init__(self, tile):
+        """
+        This method creates variables needed for the class, and starts the
+        worker process.
+
+        :param tile: Tile.
+        """
+        self.connection, worker_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_serve, args=(worker_connection, tile), daemon=True)
+        self.process.start()
+        worker_connection.close()
+
+    def send(self, name, *args):
+        """
+        Asks the tile to call one of its methods.
+
+        :param name: str, name of the method.
+        :param args: arguments of the method.
+        """
+        self.connection.send((name, args))
+
+    def receive(self):
+        """
+        Waits for the result of the oldest request, and raises the error of
+        the method if it failed.
+        """
+        success, result = self.connection.recv()
+        if not success:
+            raise result
+        return result
+
+    def close(self):
+        """
+        Stops the worker process.
+        """
+        self.connection.send(None)
+        self.process.join()
+        self.connection.close()
+
+    def terminate(self):
+        """
+        Kills the worker process.
+        """
+        self.process.terminate()
+
+
+class TiledIsland(bi.ArrayIsland):
+    """
+    This class generates the island with the annual cycle carried out tile
+    by tile, each tile kept by its own worker process.
+    """
+
+    def __init__(self, island_map=None, workers=2, seed=None):
+        """
+        This method creates variables needed for the class.
+
+        :param island_map: str, multi-line string specifying the island.
+        :param workers: int, number of tiles and worker processes. With one
+                        worker, the tile is kept in the main process.
+        :param seed: int, seed of the random number generator.
+        """
+        self._tiles = None
+        self._animals_in_tiles = False
+        self._fodder_in_tiles = False
+        super().__init__(island_map, seed=seed)
+        if workers < 1:
+            raise ValueError("The number of workers must be at least 1.")
+        self.workers = workers
+
+        rows, cols = self.numpy_map.shape
+        self.tile_rows = [(band[0], band[-1] + 1) for band in
+                          np.array_split(np.arange(rows), workers)
+                          if len(band) > 0]
+        self.tile_bounds = np.array(
+            [first * cols for first, _ in self.tile_rows] + [self.n_cells])
+        self._sent_parameters = None
+        self._sizes = (0, 0)
+
+    @property
+    def n_tiles(self):
+        """
+        Number of tiles on the island.
+        """
+        return len(self.tile_rows)
+
+    @property
+    def herbivores(self):
+        """
+        The herbivores of the island. Reading them collects the animals from
+        the tiles, which get them back at the start of the next year.
+        """
+        self._collect()
+        return self._herbivores
+
+    @herbivores.setter
+    def herbivores(self, population):
+        self._collect()
+        self._herbivores = population
+
+    @property
+    def carnivores(self):
+        """
+        The carnivores of the island. Reading them collects the animals from
+        the tiles, which get them back at the start of the next year.
+        """
+        self._collect()
+        return self._carnivores
+
+    @carnivores.setter
+    def carnivores(self, population):
+        self._collect()
+        self._carnivores = population
+
+    @property
+    def fodder(self):
+        """
+        The fodder of every cell, as an array with the shape of the map.
+        Reading it copies the fodder from the tiles, and the tiles get the
+        array back at the start of the next year, with any changes made to
+        it.
+        """
+        self._collect_fodder()
+        return self._fodder
+
+    @fodder.setter
+    def fodder(self, fodder):
+        self._fodder_in_tiles = False
+        self._fodder = fodder
+
+    def _start(self):
+        """
+        Creates the tiles, in worker processes if there is more than one.
+        """
+        tiles = [
+            Tile(start, end - start, self.numpy_map.shape[1],
+                 self.neighbours[start:end], self.habitable[start:end])
+            for start, end in zip(self.tile_bounds[:-1],
+                                  self.tile_bounds[1:])]
+        if self.workers == 1:
+            self._tiles = [LocalTile(tile) for tile in tiles]
+        else:
+            self._tiles = [TileProcess(tile) for tile in tiles]
+        self._sent_parameters = None
+        self._animals_in_tiles = False
+        self._fodder_in_tiles = False
+
+    def _ask_all(self, name, args=None):
+        """
+        Asks every tile to call one of its methods. All requests are sent
+        before the first result is received, so the tiles work in parallel.
+
+        :param name: str, name of the method.
+        :param args: list, tuple of arguments for each tile, or None if the
+                     method takes no arguments.
+        :return: list, the result of each tile.
+        """
+        if args is None:
+            args = [()] * self.n_tiles
+        for tile, tile_args in zip(self._tiles, args):
+            tile.send(name, *tile_args)
+        results = []
+        error = None
+        # Every result is received, so that the pipes stay in step when a
+        # tile fails
+        for tile in self._tiles:
+            try:
+                results.append(tile.receive())
+            except Exception as tile_error:
+                error = tile_error if error is None else error
+        if error is not None:
+            raise error
+        return results
+
+    def _collect(self):
+        """
+        Moves the animals from the tiles to the main process, if the tiles
+        hold them.
+        """
+        if not self._animals_in_tiles:
+            return
+        self._animals_in_tiles = False
+        animals = self._ask_all("animals")
+        self._herbivores, self._carnivores = (
+            _population(species, _concatenate(
+                [tile_animals[index] for tile_animals in animals]))
+            for index, species in enumerate(self.animal_types))
+
+    def _collect_fodder(self):
+        """
+        Copies the fodder from the tiles to the main process, if the tiles
+        hold it.
+        """
+        if not self._fodder_in_tiles:
+            return
+        self._fodder_in_tiles = False
+        self._fodder.reshape(-1)[:] = np.concatenate(
+            self._ask_all("get_fodder"))
+
+    def _scatter(self):
+        """
+        Hands the parameters, animals and fodder that have been changed in
+        the main process over to the tiles.
+        """
+        if self._tiles is None:
+            self._start()
+
+        parameters = self.parameters
+        if parameters != self._sent_parameters:
+            self.update_fodder_parameters()
+            f_max, alpha = self.f_max.reshape(-1), self.alpha.reshape(-1)
+            animal_parameters = tuple(species.parameters
+                                      for species in self.animal_types)
+            tile_parameters = [
+                (animal_parameters, f_max[start:end].copy(),
+                 alpha[start:end].copy())
+                for start, end in zip(self.tile_bounds[:-1],
+                                      self.tile_bounds[1:])]
+            self._sent_parameters = parameters
+        else:
+            tile_parameters = [None] * self.n_tiles
+
+        tile_animals = [None] * self.n_tiles
+        if not self._animals_in_tiles:
+            tile_animals = list(zip(
+                *(self.split_by_tile(population) for population in
+                  (self._herbivores, self._carnivores))))
+            self._sizes = (len(self._herbivores), len(self._carnivores))
+            self._herbivores = bp.SpeciesPopulation(self.animal_types[0])
+            self._carnivores = bp.SpeciesPopulation(self.animal_types[1])
+
+        tile_fodder = [None] * self.n_tiles
+        if not self._fodder_in_tiles:
+            fodder = self._fodder.reshape(-1)
+            tile_fodder = [fodder[start:end].copy() for start, end in
+                           zip(self.tile_bounds[:-1], self.tile_bounds[1:])]
+
+        if not (self._animals_in_tiles and self._fodder_in_tiles and
+                tile_parameters[0] is None):
+            self._ask_all("load", list(zip(tile_parameters, tile_animals,
+                                           tile_fodder)))
+        self._animals_in_tiles = True
+        self._fodder_in_tiles = True
+
+    def close(self):
+        """
+        Moves the animals and the fodder back to the main process and stops
+        the worker processes. They are started again if needed.
+        """
+        if self._tiles is None:
+            return
+        self._collect()
+        self._collect_fodder()
+        for tile in self._tiles:
+            tile.close()
+        self._tiles = None
+
+    def __del__(self):
+        for tile in getattr(self, "_tiles", None) or []:
+            tile.terminate()
+
+    def __getstate__(self):
+        """
+        Collects the animals and the fodder for pickling, without the
+        worker processes.
+
+        :return: dict.
+        """
+        if self._tiles is not None:
+            self._collect()
+            self._collect_fodder()
+        state = self.__dict__.copy()
+        state["_tiles"] = None
+        return state
+
+    def tile_of(self, cells):
+        """
+        Finds the tile each cell belongs to.
+
+        :param cells: numpy.ndarray, flat cell indices.
+        :return: numpy.ndarray.
+        """
+        return np.searchsorted(self.tile_bounds, cells, side="right") - 1
+
+    def split_by_tile(self, arrays):
+        """
+        Splits animals into one tuple of age, weight, fitness and cell
+        arrays per tile. The animals of each tile keep their order.
+
+        :param arrays: SpeciesPopulation, or tuple of age, weight, fitness
+                       and cell arrays.
+        :return: list.
+        """
+        if isinstance(arrays, bp.SpeciesPopulation):
+            arrays = _arrays(arrays)
+        order = np.argsort(self.tile_of(arrays[3]), kind="stable")
+        arrays = tuple(column[order] for column in arrays)
+        ends = np.searchsorted(self.tile_of(arrays[3]),
+                               np.arange(self.n_tiles), side="right")
+        starts = np.concatenate(([0], ends[:-1]))
+        return [tuple(column[start:end] for column in arrays)
+                for start, end in zip(starts, ends)]
+
+    def _seeds(self):
+        """
+        Draws one seed for each tile from the random number generator of the
+        island.
+
+        :return: list.
+        """
+        return self.rng.integers(2 ** 63, size=self.n_tiles).tolist()
+
+    def annual_cycle(self):
+        """
+        This method carries out one cycle on the island, tile by tile.
+
+        :return total_species_population: tuple, first element is
+                                         herbivore population and second
+                                         element is carnivore population.
+        """
+        self._scatter()
+        borders = self._ask_all("feed", [(seed,) for seed in self._seeds()])
+
+        outside = np.full(self.numpy_map.shape[1], -np.inf)
+        rows_above = [(outside, outside)] + [
+            tuple(last for first, last in tile_borders)
+            for tile_borders in borders[:-1]]
+        rows_below = [
+            tuple(first for first, last in tile_borders)
+            for tile_borders in borders[1:]] + [(outside, outside)]
+        emigrants = self._ask_all("migrate",
+                                  list(zip(rows_above, rows_below)))
+
+        immigrants = zip(*(
+            self.split_by_tile(_concatenate(
+                [tile_emigrants[index] for tile_emigrants in emigrants]))
+            for index in range(2)))
+        sizes = self._ask_all("settle", [(arrays,) for arrays in immigrants])
+        self._sizes = tuple(int(total) for total in np.sum(sizes, axis=0))
+        return self.total_species_population
+
+    @property
+    def total_species_population(self):
+        """
+        Finds the total number of herbivores and carnivores on the island, in
+        the first and second element of the returned tuple, respectively.
+
+        :return: tuple.
+        """
+        if self._animals_in_tiles:
+            return self._sizes
+        return len(self._herbivores), len(self._carnivores)
+
+    def species_counts(self):
+        """
+        Finds the number of herbivores and the number of carnivores in every
+        cell, in the tiles if they hold the animals.
+
+        :return: tuple, two arrays with one element per cell.
+        """
+        if not self._animals_in_tiles:
+            return super().species_counts()
+        return tuple(statistics[0] for statistics in
+                     self.species_statistics())
+
+    def species_statistics(self):
+        """
+        Finds, for both species, the number of animals, their total weight
+        and the sum of their fitness in every cell, in the tiles if they
+        hold the animals.
+
+        :return: tuple, for each species a tuple of three arrays with one
+                 element per cell.
+        """
+        if not self._animals_in_tiles:
+            return super().species_statistics()
+        statistics = self._ask_all("statistics")
+        return tuple(
+            tuple(np.concatenate([tile_statistics[index][column]
+                                  for tile_statistics in statistics])
+                  for column in range(3))
+            for index in range(2))
+
+    def animal_arrays(self):
+        """
+        Copies the age, weight and flat cell index of every animal, for both
+        species, from the tiles if they hold the animals.
+
+        :return: tuple, for each species a tuple of three arrays with one
+                 element per animal.
+        """
+        if not self._animals_in_tiles:
+            return super().animal_arrays()
+        animals = self._ask_all("animals")
+        return tuple(
+            (age, weight, cell) for age, weight, _, cell in
+            (_concatenate([tile_animals[index] for tile_animals in animals])
+             for index in range(2)))
+
+    def animal_state(self):
+        """
+        Copies the arrays of both species, for checkpoints, from the tiles
+        if they hold the animals.
+
+        :return: dict, arrays named by species and attribute.
+        """
+        if not self._animals_in_tiles:
+            return super().animal_state()
+        animals = self._ask_all("animals")
+        state = {}
+        for index, name in enumerate(("herbivore", "carnivore")):
+            arrays = _concatenate([tile_animals[index]
+                                   for tile_animals in animals])
+            for attribute, column in zip(
+                    ("age", "weight", "fitness", "cell"), arrays):
+                state[name + "_" + attribute] = column
+        return state
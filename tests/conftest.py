@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+
+"""
+Fixtures shared by all test sets.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import pytest
+
+import biosim.animals as ba
+import biosim.landscape as bl
+
+ANIMAL_PARAMETERS = {species: species.parameters.as_dict()
+                     for species in (ba.Herbivore, ba.Carnivore)}
+LANDSCAPE_PARAMETERS = {
+    landscape: landscape.parameters.as_dict()
+    for landscape in (bl.Jungle, bl.Savannah, bl.Desert, bl.Mountain,
+                      bl.Ocean)}
+
+
+@pytest.fixture(autouse=True)
+def reset_parameters():
+    """
+    Resets all animal and landscape parameters to the defaults before each
+    test.
+    """
+    for species, parameters in ANIMAL_PARAMETERS.items():
+        species.set_animal_parameters(parameters)
+    for landscape, parameters in LANDSCAPE_PARAMETERS.items():
+        landscape.set_landscape_parameters(parameters)
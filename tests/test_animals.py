@@ -14,25 +14,13 @@ __author__ = "Erik Rullestad", "Håvard Molversmyr"
 __email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
 
 
+import random
+import warnings
 import pytest
 
 import biosim.animals as ba
 
 
-@pytest.fixture(autouse=True)
-def reset_parameters():
-    """
-    Resets all carnivore parameters.
-    """
-    ba.Carnivore.set_animal_parameters({"w_birth": 6.0, "sigma_birth": 1.0,
-                                        "beta": 0.75, "eta": 0.125,
-                                        "a_half": 60.0, "phi_age": 0.4,
-                                        "w_half": 4.0, "phi_weight": 0.4,
-                                        "mu": 0.4, "lambda": 1.0, "gamma": 0.8,
-                                        "zeta": 3.5, "xi": 1.1, "omega": 0.9,
-                                        "F": 50.0, "DeltaPhiMax": 10.0})
-
-
 def test_set_animal_parameters():
     """
     Test that manual setting of animal parameters follows the given
@@ -146,50 +134,15 @@ def test_animals_fitness():
     assert value3 < value2
     
     
-def test_animals_reproduction_probability():
-    """
-    Tests that the Herbivore reproduce after given specifications.
-    """
-    herb = ba.Herbivore(weight=30)
-    assert not herb.reproduction_probability(n_animals=1)
-    herb2 = ba.Herbivore(weight=50)
-    assert not herb2.reproduction_probability(n_animals=1)
-    assert herb2.reproduction_probability(n_animals=1000)
-    herb3 = ba.Herbivore(weight=2)
-    assert not herb3.reproduction_probability(n_animals=1000)
-
-    carn = ba.Carnivore(weight=30)
-    assert not carn.reproduction_probability(n_animals=1)
-    carn2 = ba.Carnivore(weight=50)
-    assert not carn2.reproduction_probability(n_animals=1)
-    assert carn2.reproduction_probability(n_animals=1000)
-    carn3 = ba.Carnivore(weight=2)
-    assert not carn3.reproduction_probability(n_animals=1000)
-
-
-def test_animal_update_weight_after_birth():
-    """
-    Tests that a herbivore weight is reduced following birth.
-    """
-    newborn_weight = 8
-    initial_weight = 50
-    herb = ba.Herbivore(weight=initial_weight)
-    herb.newborn_weight = 8
-    herb.update_weight_after_birth()
-    assert herb.weight < initial_weight
-    assert herb.weight == pytest.approx(initial_weight - (
-            herb.default_parameters["xi"] * newborn_weight
-    ), rel=1e-1)
-
-    newborn_weight = 8
-    initial_weight = 50
-    carn = ba.Carnivore(weight=initial_weight)
-    carn.newborn_weight = 8
-    carn.update_weight_after_birth()
-    assert carn.weight < initial_weight
-    assert carn.weight == pytest.approx(initial_weight - (
-            carn.default_parameters["xi"] * newborn_weight
-    ), rel=1e-1)
+def test_no_newborn_weight_drawn_when_created(mocker):
+    """
+    Tests that no newborn weight is drawn when an animal is created with an
+    age above 0.
+    """
+    normalvariate = mocker.spy(random, "normalvariate")
+    ba.Herbivore(weight=50, age=5)
+    ba.Carnivore(weight=50, age=5)
+    assert normalvariate.call_count == 0
 
 
 def test_animal_death(mocker):
@@ -199,7 +152,7 @@ def test_animal_death(mocker):
     the probability of animal death.
     """
     herb = ba.Herbivore()
-    herb.default_parameters["omega"] = 1
+    herb.set_animal_parameters({"omega": 1})
     mocker.patch("biosim.animals.Animal.fitness",
                  new_callable=mocker.PropertyMock, return_value=0)
     assert herb.death()
@@ -208,7 +161,7 @@ def test_animal_death(mocker):
     assert not herb.death()
 
     carn = ba.Carnivore()
-    carn.default_parameters["omega"] = 1
+    carn.set_animal_parameters({"omega": 1})
     mocker.patch("biosim.animals.Animal.fitness",
                  new_callable=mocker.PropertyMock, return_value=0)
     assert carn.death()
@@ -275,6 +228,34 @@ def test_carnivore_eating():
     assert carn.weight == 537.5
 
 
+def test_carnivore_hunt():
+    """
+    Tests that a carnivore skips herbivores that are already killed, marks
+    the herbivores it kills, and stops hunting when it is satiated.
+    """
+    ba.Carnivore.set_animal_parameters({"DeltaPhiMax": 0.000001})
+    prey = [ba.Herbivore(weight=15, age=5) for _ in range(8)]
+    killed = [True, True] + [False] * 6
+    carn = ba.Carnivore(weight=500, age=5)
+    carn.hunt(prey, [herb.fitness for herb in prey], killed)
+    assert killed == [True] * 6 + [False] * 2
+    assert carn.weight == 537.5
+
+
+def test_carnivore_hunt_unfit():
+    """
+    Tests that a carnivore that is less fit than all herbivores kills none
+    of them, without drawing random numbers.
+    """
+    prey = [ba.Herbivore(weight=50, age=5) for _ in range(5)]
+    killed = [False] * 5
+    carn = ba.Carnivore(weight=1, age=80)
+    state = random.getstate()
+    carn.hunt(prey, [herb.fitness for herb in prey], killed)
+    assert not any(killed)
+    assert random.getstate() == state
+
+
 def test_migration_probability(mocker):
     """
     Tests that the migration probability formula works in the corresponding
@@ -285,3 +266,53 @@ def test_migration_probability(mocker):
     mocker.patch("biosim.animals.Herbivore.fitness",
                  new_callable=mocker.PropertyMock, return_value=1)
     assert herb.migration_probability()
+
+
+def test_batch_fitness():
+    """
+    Tests that the batch fitness agrees with the fitness of each animal.
+    """
+    ages_and_weights = [(1, 10), (30, 50), (60, 5)]
+    herbs = [ba.Herbivore(weight=w, age=a) for a, w in ages_and_weights]
+    phi = ba.Herbivore.batch_fitness([herb.age for herb in herbs],
+                                     [herb.weight for herb in herbs])
+    assert phi == pytest.approx([herb.fitness for herb in herbs])
+
+
+def test_population_fitness():
+    """
+    Tests that the population fitness is stored in every animal.
+    """
+    carns = [ba.Carnivore(weight=w, age=5) for w in (10, 20, 30)]
+    phi = ba.Carnivore.population_fitness(carns)
+    for carn, fitness in zip(carns, phi):
+        assert not carn._recompute_phi
+        assert carn.fitness == fitness
+
+
+def test_fitness_extreme_age():
+    """
+    Tests that the fitness of very old animals is zero without any overflow
+    warnings or errors.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        phi = ba.Herbivore.batch_fitness([10000, 5], [20, -10000])
+        herb = ba.Herbivore(weight=20, age=10000)
+        assert herb.fitness == 0
+    assert list(phi) == [0, 0]
+
+
+@pytest.mark.parametrize("species", [ba.Herbivore, ba.Carnivore,
+                                     ba.Herbivore.bind()])
+def test_animals_have_slots(species):
+    """
+    Tests that animals store their attributes in slots, without a
+    __dict__, also when the species is bound by an island.
+    """
+    animal = species(weight=20, age=5)
+    assert not hasattr(animal, "__dict__")
+    with pytest.raises(AttributeError):
+        animal.colour = "brown"
+    animal.weight = 30
+    assert animal.weight == 30
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test set for checkpoints of BioSim.
+
+This set of tests checks that a simulation resumed from a checkpoint gives
+exactly the same results as one that was not interrupted.
+
+Notes:
+     - The functions should pass all tests in this set.
+     - The tests check that the functions work correctly.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import random
+
+import pytest
+import numpy as np
+
+import biosim.animals as ba
+import biosim.landscape as bl
+from biosim.simulation import BioSim
+
+ISLAND_MAP = """\
+OOOOOOO
+OJJSJJO
+OJSDSJO
+OJJJMJO
+OOOOOOO"""
+
+POPULATION = [
+    {"loc": (2, 2), "pop": [
+        {"species": "Herbivore", "age": 5, "weight": 20}
+        for _ in range(40)] + [
+        {"species": "Carnivore", "age": 5, "weight": 20}
+        for _ in range(8)] + [
+        {"species": "Herbivore", "age": 0, "weight": 8}]}]
+
+ENGINES = [dict(engine="object"), dict(engine="object", active_set=True),
+           dict(engine="array"), dict(engine="numba"), dict(workers=1),
+           dict(workers=2)]
+
+
+def create_simulation(options):
+    """
+    Creates a simulation with changed parameters, which the checkpoint must
+    restore.
+
+    :param options: dict, keyword arguments of BioSim.
+    :return: BioSim.
+    """
+    simulation = BioSim(ISLAND_MAP, POPULATION, seed=3, **options)
+    simulation.set_animal_parameters("Carnivore", {"DeltaPhiMax": 5.0})
+    simulation.set_landscape_parameters("J", {"f_max": 500.0})
+    return simulation
+
+
+def assert_same_state(first, second):
+    """
+    Asserts that two simulations are in exactly the same state.
+
+    :param first: BioSim.
+    :param second: BioSim.
+    """
+    assert first.year == second.year
+    assert first.herbivore_list == second.herbivore_list
+    assert first.carnivore_list == second.carnivore_list
+    assert np.array_equal(first.island.fodder, second.island.fodder)
+    first_state = first.island.animal_state()
+    second_state = second.island.animal_state()
+    assert first_state.keys() == second_state.keys()
+    for name in first_state:
+        assert np.array_equal(first_state[name], second_state[name],
+                              equal_nan=True), name
+
+
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+@pytest.mark.parametrize("options", ENGINES)
+def test_resume_is_identical(tmp_path, options):
+    """
+    Tests that a simulation saved, disturbed and resumed ends in the same
+    state as one that was not interrupted.
+    """
+    path = str(tmp_path / "checkpoint.npz")
+    interrupted = create_simulation(options)
+    interrupted.simulate(6, vis_years=0)
+    interrupted.save_checkpoint(path)
+
+    uninterrupted = create_simulation(options)
+    uninterrupted.simulate(12, vis_years=0)
+
+    random.random()
+    ba.Carnivore.set_animal_parameters({"DeltaPhiMax": 10.0})
+    bl.Jungle.set_landscape_parameters({"f_max": 800.0})
+    resumed = BioSim.load_checkpoint(path)
+    assert resumed.year == 6
+    resumed.simulate(6, vis_years=0)
+    assert_same_state(resumed, uninterrupted)
+    for simulation in (interrupted, uninterrupted, resumed):
+        simulation.close()
+
+
+def test_checkpoint_interval(tmp_path):
+    """
+    Tests that simulate saves a checkpoint every checkpoint_years years,
+    from which the simulation can be resumed.
+    """
+    path = str(tmp_path / "checkpoint_{year:03d}.npz")
+    simulation = create_simulation(dict(engine="object"))
+    simulation.simulate(7, vis_years=0, checkpoint_years=3,
+                        checkpoint_path=path)
+    assert sorted(file.name for file in tmp_path.iterdir()) == [
+        "checkpoint_003.npz", "checkpoint_006.npz"]
+
+    resumed = BioSim.load_checkpoint(path.format(year=3))
+    resumed.simulate(4, vis_years=0)
+    assert_same_state(resumed, simulation)
+
+
+def test_checkpoint_pathlib_path(tmp_path):
+    """
+    Tests that checkpoints can be saved to and loaded from a pathlib.Path,
+    and that no temporary file is left behind.
+    """
+    path = tmp_path / "ckpt.npz"
+    simulation = create_simulation(dict(engine="object"))
+    simulation.simulate(2, vis_years=0)
+    simulation.save_checkpoint(path)
+    assert [file.name for file in tmp_path.iterdir()] == ["ckpt.npz"]
+
+    simulation.simulate(3, vis_years=0)
+    resumed = BioSim.load_checkpoint(path)
+    resumed.simulate(3, vis_years=0)
+    assert_same_state(resumed, simulation)
+
+    simulation.simulate(2, vis_years=0, checkpoint_years=1,
+                        checkpoint_path=tmp_path / "ckpt_{year}.npz")
+    assert (tmp_path / "ckpt_7.npz").exists()
+
+
+def test_checkpoint_path_required(tmp_path):
+    """
+    Tests that checkpoint_years without checkpoint_path raises ValueError.
+    """
+    simulation = create_simulation(dict(engine="array"))
+    with pytest.raises(ValueError):
+        simulation.simulate(2, vis_years=0, checkpoint_years=1)
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test set for the kernels in biosim.compiled.
+
+This set of tests checks that the kernels agree with the NumPy
+implementation in :mod:`biosim.population`, whether or not they are compiled
+with numba, and that BioSim falls back to the 'array' engine without numba.
+
+Notes:
+     - The class should pass all tests in this set.
+     - The tests check that the class functions work correctly.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import importlib.util
+import sys
+
+import pytest
+import numpy as np
+
+import biosim.animals as ba
+import biosim.compiled as bc
+import biosim.island as bi
+import biosim.population as bp
+from biosim.simulation import BioSim
+
+
+def populations(population_class, seed):
+    """
+    Creates herbivores and carnivores in two cells, with the herbivores
+    sorted by fitness.
+
+    :return: tuple, herbivores and carnivores.
+    """
+    rng = np.random.default_rng(seed)
+    herbivores = population_class(ba.Herbivore)
+    herbivores.add(rng.integers(0, 20, 80), rng.uniform(5, 40, 80),
+                   rng.integers(0, 2, 80))
+    carnivores = population_class(ba.Carnivore)
+    carnivores.add(rng.integers(0, 20, 15), rng.uniform(5, 40, 15),
+                   rng.integers(0, 2, 15))
+    herbivores.sort_by_fitness()
+    return herbivores, carnivores
+
+
+def test_fitness_kernel():
+    """
+    Tests that the fitness kernel agrees with Herbivore.batch_fitness.
+    """
+    herbivores, _ = populations(bc.CompiledPopulation, 1)
+    expected = ba.Herbivore.batch_fitness(herbivores.age, herbivores.weight)
+    herbivores.update_fitness()
+    assert herbivores.fitness == pytest.approx(expected)
+
+
+def test_same_as_numpy():
+    """
+    Tests that eating fodder, reproduction and death give the same result as
+    the NumPy implementation, given the same random numbers.
+    """
+    results = []
+    for population_class in (bp.SpeciesPopulation, bc.CompiledPopulation):
+        herbivores, _ = populations(population_class, 2)
+        fodder = np.array([300.0, 120.0])
+        herbivores.eat_fodder(fodder)
+        herbivores.reproduction(np.random.default_rng(3), 2)
+        herbivores.death(np.random.default_rng(4))
+        results.append((fodder, herbivores.weight, herbivores.cell))
+    for numpy_result, kernel_result in zip(*results):
+        assert kernel_result == pytest.approx(numpy_result)
+
+
+@pytest.mark.parametrize("population_class",
+                         [bp.SpeciesPopulation, bc.CompiledPopulation])
+def test_hunt_statistics(population_class):
+    """
+    Tests that the mean number of herbivores killed, and of weight eaten, is
+    the same with and without the kernels.
+    """
+    killed, eaten = [], []
+    for seed in range(200):
+        herbivores, carnivores = populations(population_class, seed)
+        weight = carnivores.weight.sum()
+        carnivores.hunt(herbivores, np.random.default_rng(seed), 2)
+        killed.append(80 - len(herbivores))
+        eaten.append(carnivores.weight.sum() - weight)
+    assert np.mean(killed) == pytest.approx(13.0, rel=0.08)
+    assert np.mean(eaten) == pytest.approx(150.5, rel=0.08)
+
+
+def test_hunt_satiated():
+    """
+    Tests that a carnivore stops hunting when it has eaten F, and that no
+    herbivore is killed twice.
+    """
+    herbivores, carnivores = populations(bc.CompiledPopulation, 5)
+    herbivores.cell[:] = 0
+    carnivores.keep(np.array([0]))
+    carnivores.cell[:] = 0
+    carnivores.weight[:] = 80
+    carnivores.update_fitness()
+    ba.Carnivore.set_animal_parameters({"DeltaPhiMax": 0.01})
+    weight = carnivores.weight[0]
+    carnivores.hunt(herbivores, np.random.default_rng(1), 1)
+    assert carnivores.weight[0] - weight == pytest.approx(0.75 * 50)
+    assert len(herbivores) < 80
+
+
+def test_compiled_island_reproducible():
+    """
+    Tests that the compiled island gives the same result for the same seed.
+    """
+    results = []
+    for _ in range(2):
+        island = bc.CompiledIsland("OOOO\nOJSO\nOOOO", seed=7)
+        island.populate_the_island([{"loc": (1, 1), "pop": [
+            {"species": "Herbivore", "age": 5, "weight": 20}
+            for _ in range(40)] + [
+            {"species": "Carnivore", "age": 5, "weight": 20}
+            for _ in range(10)]}])
+        for _ in range(10):
+            island.annual_cycle()
+        results.append(island.population_in_each_cell)
+    assert np.array_equal(results[0], results[1])
+
+
+def test_numba_engine_fallback(mocker):
+    """
+    Tests that BioSim uses the compiled island when numba is installed, and
+    the array island with a warning otherwise.
+    """
+    island_map = "OOO\nOJO\nOOO"
+    mocker.patch("biosim.compiled.NUMBA_AVAILABLE", True)
+    sim = BioSim(island_map, [], seed=1, engine="numba")
+    assert isinstance(sim.island, bc.CompiledIsland)
+    mocker.patch("biosim.compiled.NUMBA_AVAILABLE", False)
+    with pytest.warns(RuntimeWarning):
+        sim = BioSim(island_map, [], seed=1, engine="numba")
+    assert type(sim.island) is bi.ArrayIsland
+
+
+def test_fallback_leaves_numpy_generator(mocker):
+    """
+    Tests that the kernels without numba do not draw from or seed the
+    global generator of NumPy, and that they give the same result as the
+    compiled kernels for the same seed.
+    """
+    mocker.patch.dict(sys.modules, {"numba": None})
+    spec = importlib.util.spec_from_file_location("fallback", bc.__file__)
+    fallback = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(fallback)
+    mocker.stopall()
+    assert not fallback.NUMBA_AVAILABLE
+
+    results = []
+    for module in (bc, fallback):
+        herbivores, carnivores = populations(module.CompiledPopulation, 6)
+        np.random.seed(11)
+        carnivores.hunt(herbivores, np.random.default_rng(2), 2)
+        results.append((herbivores.weight, carnivores.weight,
+                        np.random.random()))
+    np.random.seed(11)
+    assert results[0][2] == results[1][2] == np.random.random()
+    for compiled_result, fallback_result in zip(*results):
+        assert fallback_result == pytest.approx(compiled_result)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test set for the history sinks and readers.
+
+This set of tests checks that the history written in chunks while simulating
+is read back unchanged, year by year.
+
+Notes:
+     - The classes should pass all tests in this set.
+     - The tests check that the class functions work correctly.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import pytest
+import numpy as np
+
+import biosim.export as be
+from biosim.simulation import BioSim
+
+ISLAND_MAP = """\
+OOOOO
+OJSJO
+OJDMO
+OOOOO"""
+
+POPULATION = [
+    {"loc": (1, 1), "pop": [
+        {"species": "Herbivore", "age": 5, "weight": 20}
+        for _ in range(20)] + [
+        {"species": "Carnivore", "age": 5, "weight": 20}
+        for _ in range(3)]}]
+
+
+def simulate(sink, engine="array"):
+    """
+    Simulates 7 years, writing the history to the sink and recording the
+    same grids.
+
+    :param sink: biosim.export.HistorySink.
+    :param engine: str, passed on to BioSim.
+    :return: BioSim.
+    """
+    simulation = BioSim(ISLAND_MAP, POPULATION, seed=1, engine=engine,
+                        history=sink, record_years=1,
+                        record_metrics=be.GRIDS)
+    simulation.simulate(5, vis_years=0)
+    simulation.simulate(2, vis_years=0)
+    sink.close()
+    return simulation
+
+
+@pytest.mark.parametrize("engine", ["object", "array"])
+def test_npz_history(tmp_path, engine):
+    """
+    Tests that the grids of every year are written in shards of chunk_years
+    years, and read back memory-mapped.
+    """
+    simulation = simulate(be.NpzSink(str(tmp_path), chunk_years=3), engine)
+    history = be.NpzHistory(str(tmp_path))
+    assert len(history.paths) == 3
+    assert list(history.years) == list(range(8))
+    assert all(isinstance(shard, np.memmap)
+               for shard in history.grid("fodder"))
+    for year in history.years:
+        grids = history.grids(year)
+        for index, name in enumerate(be.GRIDS):
+            assert np.array_equal(grids[name],
+                                  simulation.recorder.data[year, ..., index])
+
+
+def test_npz_animals(tmp_path):
+    """
+    Tests that the animals of every year are written, and that those of the
+    last year are the animals on the island.
+    """
+    simulation = simulate(be.NpzSink(str(tmp_path), chunk_years=3,
+                                     animals=True))
+    history = be.NpzHistory(str(tmp_path))
+    animals = history.animals(7)
+    herbivores = animals["species"] == 0
+    age, weight, cell = simulation.island.animal_arrays()[0]
+    assert np.array_equal(animals["age"][herbivores], age)
+    assert np.array_equal(animals["weight"][herbivores], weight)
+    assert np.array_equal(animals["row"][herbivores] * 5 +
+                          animals["col"][herbivores], cell)
+    assert len(history.animals(0)["age"]) == 23
+
+
+def test_history_missing_year(tmp_path):
+    """
+    Tests that a year that has not been written raises KeyError.
+    """
+    simulate(be.NpzSink(str(tmp_path)))
+    with pytest.raises(KeyError):
+        be.NpzHistory(str(tmp_path)).grids(8)
+
+
+def test_writer_failure(tmp_path):
+    """
+    Tests that an error in the writer thread is raised when the sink is
+    closed.
+    """
+    class FailingSink(be.NpzSink):
+        def write_chunk(self, path, chunk):
+            raise OSError("disk full")
+
+    with pytest.raises(RuntimeError):
+        simulate(FailingSink(str(tmp_path), chunk_years=2))
+
+
+def test_incomplete_subclasses(tmp_path):
+    """
+    Tests that sinks and histories missing a method of their format can not
+    be created, so that they fail before the simulation starts.
+    """
+    class IncompleteSink(be.HistorySink):
+        extension = ".bin"
+
+    class IncompleteHistory(be.History):
+        extension = ".bin"
+
+        def read_years(self, path):
+            return np.empty(0, dtype=np.int64)
+
+    with pytest.raises(TypeError):
+        IncompleteSink(str(tmp_path))
+    with pytest.raises(TypeError):
+        IncompleteHistory(str(tmp_path))
+
+
+def test_parquet_history(tmp_path):
+    """
+    Tests that the Parquet shards are read back with the same grids and
+    animals as the npz shards.
+    """
+    pytest.importorskip("pyarrow")
+    simulate(be.NpzSink(str(tmp_path / "npz"), chunk_years=3, animals=True))
+    simulate(be.ParquetSink(str(tmp_path / "parquet"), chunk_years=3,
+                            animals=True))
+    npz = be.NpzHistory(str(tmp_path / "npz"))
+    parquet = be.ParquetHistory(str(tmp_path / "parquet"))
+    assert list(parquet.years) == list(npz.years)
+    for name, grid in parquet.grids(4).items():
+        assert np.array_equal(grid, npz.grids(4)[name])
+    for name, values in parquet.animals(4).items():
+        assert np.array_equal(values, npz.animals(4)[name])
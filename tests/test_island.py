@@ -14,9 +14,12 @@ __author__ = "Erik Rullestad, Håvard Molversmyr"
 __email__ = "erikrull@nmbu.no, havardmo@nmbu.no"
 
 
+import random
+import pytest
 import numpy as np
 
 import examples.population_generator as pg
+import biosim.animals as ba
 import biosim.island as bi
 import biosim.landscape as bl
 
@@ -172,4 +175,324 @@ def test_animals_on_island():
     ini_pop = []
     island = bi.Island(island_map)
     island.populate_the_island(ini_pop)
-    assert island.total_island_population == 0
\ No newline at end of file
+    assert island.total_island_population == 0
+
+
+def test_array_island_populate():
+    """
+    Tests that the array island stores the population in each cell.
+    """
+    island = bi.ArrayIsland("OOOO\nOJSO\nOOOO", seed=1)
+    island.populate_the_island(
+        [{"loc": (1, 1), "pop": [
+            {"species": "Herbivore", "age": 1, "weight": 10.0},
+            {"species": "Carnivore", "age": 1, "weight": 10.0}]},
+         {"loc": (1, 2), "pop": [
+             {"species": "Herbivore", "age": 1, "weight": 10.0},
+             {"species": "Herbivore", "age": 1, "weight": 10.0}]}])
+    assert island.total_species_population == (3, 1)
+    cell_populations = island.population_in_each_cell
+    assert list(cell_populations[5]) == [1, 1, 1, 1]
+    assert list(cell_populations[6]) == [1, 2, 2, 0]
+
+
+def test_regenerate():
+    """
+    Tests that fodder regenerates in jungle and savannah cells, and that the
+    cells see the fodder of the island.
+    """
+    island = bi.Island("OOOOO\nOJSDO\nOOOOO")
+    assert list(island.fodder[1]) == [0, 800, 300, 0, 0]
+    island.fodder[...] = 0
+    island.regenerate()
+    assert island.fodder[1] == pytest.approx([0, 800, 90, 0, 0])
+    assert island.numpy_map[1, 2].f == pytest.approx(90)
+    island.numpy_map[1, 1].f = 10
+    assert island.fodder[1, 1] == 10
+
+
+def test_regenerate_after_parameter_change():
+    """
+    Tests that regeneration uses landscape parameters set on the island
+    after it was created, and not those set on the landscape classes.
+    """
+    island = bi.Island("OOOO\nOJSO\nOOOO")
+    island.set_landscape_parameters("J", {"f_max": 700})
+    bl.Jungle.set_landscape_parameters({"f_max": 600})
+    island.regenerate()
+    assert island.fodder[1, 1] == 700
+
+
+def test_regenerate_reads_no_parameters(mocker):
+    """
+    Tests that the yearly regeneration does not read the landscape
+    parameters of every cell, which are only read when they are set.
+    """
+    island = bi.Island("OOOO\nOJSO\nOOOO")
+    spy = mocker.spy(island, "landscape_parameter")
+    island.regenerate()
+    assert spy.call_count == 0
+    island.set_landscape_parameters("S", {"alpha": 0.5})
+    assert spy.call_count == 2
+    island.fodder[...] = 0
+    island.regenerate()
+    assert island.fodder[1, 2] == pytest.approx(150)
+
+
+def test_neighbour_table():
+    """
+    Tests that the neighbour table agrees with find_surrounding_cells.
+    """
+    island = bi.Island("OOOO\nODOO\nOSJO\nOMOO\nOOOO")
+    assert list(island.neighbours[0]) == [4, -1, 1, -1]
+    neighbours = island.numpy_map.flatten()[island.neighbours[9]]
+    assert island.find_cell_position(island.numpy_map[2, 1]) == (2, 1)
+    assert list(neighbours) == list(island.find_surrounding_cells([2, 1]))
+
+
+def test_array_island_predation():
+    """
+    Tests that carnivores kill herbivores on average as often as in the
+    object representation.
+    """
+    herbs = [{"species": "Herbivore", "age": age, "weight": weight}
+             for age, weight in zip(range(1, 41), range(5, 45))]
+    carns = [{"species": "Carnivore", "age": 5, "weight": 30}
+             for _ in range(5)]
+    object_survivors = []
+    array_survivors = []
+    for seed in range(100):
+        random.seed(seed)
+        jungle = bl.Jungle()
+        jungle.cell_population(herbs + carns)
+        jungle.sort_by_fitness()
+        jungle.eat_request_carnivore()
+        object_survivors.append(jungle.number_of_herbivores)
+
+        island = bi.ArrayIsland("OOO\nOJO\nOOO", seed=seed)
+        island.populate_the_island([{"loc": (1, 1), "pop": herbs + carns}])
+        island.herbivores.sort_by_fitness()
+        island.eat_request_carnivore()
+        array_survivors.append(len(island.herbivores))
+    assert np.mean(array_survivors) == pytest.approx(
+        np.mean(object_survivors), rel=0.1)
+
+
+def test_array_island_annual_cycle():
+    """
+    Tests that a year can be simulated with the array island, also for an
+    animal with no habitable neighbours.
+    """
+    island = bi.ArrayIsland("OOO\nOJO\nOOO", seed=1)
+    island.populate_the_island(
+        [{"loc": (1, 1), "pop": [
+            {"species": "Herbivore", "age": 5, "weight": 20}
+            for _ in range(50)]}])
+    for _ in range(10):
+        herbivores, carnivores = island.annual_cycle()
+    assert herbivores > 0
+    assert carnivores == 0
+    assert np.all(island.herbivores.cell == 4)
+
+
+def test_habitable_and_regenerating_cells():
+    """
+    Tests that only habitable cells are indexed for the annual cycle, and
+    that only Jungle and Savannah cells regrow fodder.
+    """
+    island = bi.Island("OOOOOO\nOJSDMO\nOOOOOO")
+    assert list(island.habitable_cells) == [7, 8, 9]
+    assert list(island.alpha[1]) == [0, 1, 0.3, 0, 0, 0]
+
+
+def test_active_set_same_result():
+    """
+    Tests that skipping empty cells gives the same result as visiting all
+    cells, on a map where the fodder of all cells is either full or zero.
+    """
+    island_map = "OOOOOOO\nOJJJJJO\nOJJDJJO\nOJJJJJO\nOOOOOOO"
+    pop = [{"loc": (2, 3), "pop": [
+        {"species": "Herbivore", "age": 5, "weight": 20}
+        for _ in range(20)]}]
+    populations = []
+    for active_set in (False, True):
+        random.seed(2)
+        island = bi.Island(island_map, active_set=active_set)
+        island.populate_the_island(pop)
+        for _ in range(5):
+            island.annual_cycle()
+        populations.append(island.population_in_each_cell)
+    assert np.array_equal(populations[0], populations[1])
+
+
+def test_visited_cells_found_twice_a_year(mocker):
+    """
+    Tests that in active set mode, the visited cells are found at the start
+    of the annual cycle and after migration only, and that they are the
+    cells with animals.
+    """
+    island = bi.Island("OOOOO\nOJJJO\nOJJJO\nOOOOO", active_set=True)
+    island.populate_the_island([{"loc": (1, 2), "pop": [
+        {"species": "Herbivore", "age": 5, "weight": 20}]}])
+    assert list(island.visited_cells()) == [7]
+    spy = mocker.spy(island, "find_visited_cells")
+    island.annual_cycle()
+    assert spy.call_count == 2
+    counts = island.species_counts()[0]
+    assert list(island.visited_cells()) == list(np.flatnonzero(counts))
+
+
+def test_migration_probability():
+    """
+    Tests that the migration probabilities of the island agree with the
+    propensities of the neighbouring cells.
+    """
+    island = bi.Island("OOOOO\nOJSJO\nOJDMO\nOOOOO")
+    island.populate_the_island([{"loc": (1, 1), "pop": [
+        {"species": "Herbivore", "age": 5, "weight": 20},
+        {"species": "Carnivore", "age": 5, "weight": 20}]}])
+    herb_probability, carn_probability = island.migration_probability()
+    propensities = np.array([
+        neighbour.propensity()
+        for neighbour in island.find_surrounding_cells((1, 2))])
+    assert herb_probability[7] == pytest.approx(
+        propensities[:, 0] / propensities[:, 0].sum())
+    assert carn_probability[7] == pytest.approx(
+        propensities[:, 1] / propensities[:, 1].sum())
+    assert not herb_probability[0].any()
+
+
+def test_migrate_phase_after_procreation():
+    """
+    Tests that all animals stay on a map where they have nowhere to go, and
+    that animals moved during the year are counted at the end of it.
+    """
+    random.seed(3)
+    island = bi.Island("OOOO\nOJOO\nOOOO")
+    island.populate_the_island([{"loc": (1, 1), "pop": [
+        {"species": "Herbivore", "age": 5, "weight": 20}
+        for _ in range(10)]}])
+    island.annual_cycle()
+    assert island.numpy_map[1, 1].number_of_herbivores == \
+        island.total_species_population[0]
+
+
+def test_migrate_double_buffered():
+    """
+    Tests that migration moves every animal at most one cell and keeps all
+    animals, also when every animal migrates.
+    """
+    ba.Herbivore.set_animal_parameters({"mu": 10})
+    island = bi.Island("OOOOOO\nOJJJJO\nOOOOOO", seed=5)
+    island.populate_the_island([{"loc": (1, 1), "pop": [
+        {"species": "Herbivore", "age": 5, "weight": 40}
+        for _ in range(50)]}])
+    island.migrate()
+    counts = island.population_in_each_cell[:, 2]
+    assert sum(counts) == 50
+    assert island.numpy_map[1, 1].number_of_herbivores == 0
+    assert island.numpy_map[1, 2].number_of_herbivores == 50
+
+
+@pytest.mark.parametrize("island_class", [bi.Island, bi.ArrayIsland])
+def test_count_grids(island_class):
+    """
+    Tests that the count grids have the shape of the map, and agree with the
+    population in each cell.
+    """
+    island = island_class("OOOOO\nOJSJO\nOJDMO\nOOOOO")
+    island.populate_the_island([{"loc": (1, 2), "pop": [
+        {"species": "Herbivore", "age": 5, "weight": 20},
+        {"species": "Herbivore", "age": 5, "weight": 20},
+        {"species": "Carnivore", "age": 5, "weight": 20}]},
+        {"loc": (2, 2), "pop": [
+            {"species": "Carnivore", "age": 5, "weight": 20}]}])
+    herbivores, carnivores = island.count_grids
+    assert herbivores.shape == carnivores.shape == (4, 5)
+    assert herbivores[1, 2] == 2 and herbivores.sum() == 2
+    assert carnivores[1, 2] == carnivores[2, 2] == 1
+    population = island.population_in_each_cell
+    assert np.array_equal(herbivores.reshape(-1), population[:, 2])
+    assert np.array_equal(carnivores.reshape(-1), population[:, 3])
+
+
+def population_columns():
+    """
+    Creates a mixed population in two cells, as columns and as the
+    equivalent list of dictionaries.
+
+    :return: tuple, dictionary of columns and list of dictionaries.
+    """
+    columns = {"loc_row": np.array([1, 1, 2, 1, 2]),
+               "loc_col": np.array([1, 2, 1, 1, 1]),
+               "species": np.array(["Herbivore", "Carnivore", "Herbivore",
+                                    "Herbivore", "Carnivore"]),
+               "age": np.array([5, 3, 0, 1, 7]),
+               "weight": np.array([20.0, 15.0, 8.0, 12.5, 30.0])}
+    population = [{"loc": (row, col), "pop": [
+        {"species": species, "age": int(age), "weight": float(weight)}]}
+        for row, col, species, age, weight in zip(*columns.values())]
+    return columns, population
+
+
+def test_populate_from_arrays_as_dictionaries():
+    """
+    Tests that animals given as columns are the same, with the same random
+    numbers drawn, as when given as dictionaries in the same order.
+    """
+    columns, population = population_columns()
+    states = []
+    for populate in (
+            lambda island: island.populate_from_arrays(*columns.values()),
+            lambda island: island.populate_the_island(population)):
+        random.seed(1)
+        island = bi.Island("OOOO\nOJSO\nOJDO\nOOOO")
+        populate(island)
+        states.append(island.animal_state())
+    for name in states[0]:
+        assert np.array_equal(states[0][name], states[1][name],
+                              equal_nan=True)
+
+
+def test_array_island_populate_from_arrays():
+    """
+    Tests that animals given as columns, with species codes, are added to
+    the arrays of the array island.
+    """
+    columns, _ = population_columns()
+    columns["species"] = (columns["species"] == "Carnivore").astype(int)
+    island = bi.ArrayIsland("OOOO\nOJSO\nOJDO\nOOOO", seed=1)
+    island.populate_from_arrays(*columns.values())
+    assert island.total_species_population == (3, 2)
+    assert island.herbivores.age.tolist() == [5, 0, 1]
+    assert island.carnivores.cell.tolist() == [6, 9]
+    assert island.herbivores.weight[1] != 8.0
+
+
+@pytest.mark.parametrize("column, values", [
+    ("loc_row", [1, 1, 4, 1, 2]), ("loc_col", [1, 2, 1, -1, 1]),
+    ("loc_col", [1, 2, 1, 0, 1]), ("species", ["Herbivore", "Rabbit",
+                                               "Herbivore", "Herbivore",
+                                               "Carnivore"]),
+    ("species", [0, 1, 257, 0, 1]), ("species", [0, 1, 256, 0, 1]),
+    ("species", [0, 1, -1, 0, 1]),
+    ("loc_row", [1, 1, 1.5, 1, 2]), ("loc_col", [1, 2, 1, 1, np.nan]),
+    ("age", [5, 3, -1, 1, 7]), ("age", [5, 3, 0.5, 1, 7]),
+    ("age", [5, 3, np.nan, 1, 7]), ("age", [5, 3, np.inf, 1, 7]),
+    ("weight", [20.0, -15.0, 8.0, 12.5, 30.0]), ("weight", [20.0]),
+    ("weight", [20.0, np.nan, 8.0, 12.5, 30.0]),
+    ("weight", [20.0, 15.0, 8.0, np.inf, 30.0])])
+@pytest.mark.parametrize("island_class", [bi.Island, bi.ArrayIsland])
+def test_populate_from_arrays_invalid(island_class, column, values):
+    """
+    Tests that positions outside the map, in Ocean or not integer, unknown
+    species or species codes, invalid or non-finite ages or weights, and
+    columns of different lengths raise ValueError, without adding any
+    animals.
+    """
+    columns, _ = population_columns()
+    columns[column] = np.array(values)
+    island = island_class("OOOO\nOJSO\nOJDO\nOOOO")
+    with pytest.raises(ValueError):
+        island.populate_from_arrays(*columns.values())
+    assert island.total_island_population == 0
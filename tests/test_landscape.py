@@ -22,31 +22,6 @@ import biosim.landscape as bl
 import biosim.animals as ba
 
 
-@pytest.fixture(autouse=True)
-def reset_parameters():
-    """
-    Resets all carnivore parameters.
-    """
-    ba.Herbivore.set_animal_parameters({"w_birth": 8.0, "sigma_birth": 1.5,
-                                        "beta": 0.9, "eta": 0.05,
-                                        "a_half": 40.0, "phi_age": 0.2,
-                                        "w_half": 10.0, "phi_weight": 0.1,
-                                        "mu": 0.25, "lambda": 1.0,
-                                        "gamma": 0.2, "zeta": 3.5, "xi": 1.2,
-                                        "omega": 0.4, "F": 10.0})
-
-    ba.Carnivore.set_animal_parameters({"w_birth": 6.0, "sigma_birth": 1.0,
-                                        "beta": 0.75, "eta": 0.125,
-                                        "a_half": 60.0, "phi_age": 0.4,
-                                        "w_half": 4.0, "phi_weight": 0.4,
-                                        "mu": 0.4, "lambda": 1.0, "gamma": 0.8,
-                                        "zeta": 3.5, "xi": 1.1, "omega": 0.9,
-                                        "F": 50.0, "DeltaPhiMax": 10.0})
-
-    bl.Jungle.set_landscape_parameters({"f_max": 800})
-    bl.Savannah.set_landscape_parameters({"f_max": 300,
-                                          "alpha": 0.3})
-
 def test_set_landscape_parameters():
     """
     Test that manual setting of landscape parameters works.
@@ -240,6 +215,57 @@ def test_reproduction():
     assert new_carns > ini_carns
 
 
+def test_reproduction_batch():
+    """
+    Tests that every animal heavy enough gives birth when the probability
+    is 1, that the newborns get the drawn weights, by which the weights of
+    their mothers are reduced, and that light animals do not give birth.
+    """
+    ba.Herbivore.set_animal_parameters({"gamma": 10})
+    land = bl.Landscape()
+    land.cell_population(
+        [{"species": "Herbivore", "age": 5, "weight": 40}
+         for _ in range(3)] +
+        [{"species": "Herbivore", "age": 5, "weight": 20}])
+    land.reproduction(np.random.default_rng(2))
+    mothers, newborns = (land.animal_population[0][:4],
+                         land.animal_population[0][4:])
+    assert len(newborns) == 3
+    assert mothers[3].weight == 20
+    for mother, newborn in zip(mothers, newborns):
+        assert newborn.age == 0
+        assert mother.weight == pytest.approx(40 - 1.2 * newborn.weight)
+
+
+def test_no_reproduction_alone():
+    """
+    Tests that an animal alone in its cell never gives birth, also when the
+    probability would otherwise be above 1.
+    """
+    ba.Herbivore.set_animal_parameters({"gamma": 10})
+    land = bl.Landscape()
+    land.cell_population([{"species": "Herbivore", "age": 5, "weight": 50}])
+    land.reproduction(np.random.default_rng(2))
+    assert len(land.animal_population[0]) == 1
+    assert land.animal_population[0][0].weight == 50
+
+
+def test_reproduction_reproducible():
+    """
+    Tests that reproduction gives the same result with generators of the
+    same seed.
+    """
+    weights = []
+    for _ in range(2):
+        land = bl.Landscape()
+        land.cell_population([{"species": "Carnivore", "age": 5,
+                               "weight": 40} for _ in range(200)])
+        land.reproduction(np.random.default_rng(7))
+        weights.append([carn.weight for carn in land.animal_population[1]])
+    assert weights[0] == weights[1]
+    assert len(weights[0]) > 200
+
+
 def test_eat_request_herbivore():
     """
     Test if herbivores eats as expected.
@@ -277,6 +303,35 @@ def test_eat_request_carnivore():
     assert new_weight > start_weight
 
 
+def test_eat_request_carnivore_kill_statistics():
+    """
+    Tests that the number of herbivores killed by a carnivore that is never
+    satiated follows a binomial distribution, and that the surviving
+    herbivores keep their order.
+    """
+    random.seed(2)
+    ba.Carnivore.set_animal_parameters({"beta": 0, "F": 1000})
+    carn_fitness = ba.Carnivore(weight=20, age=5).fitness
+    herb_fitness = ba.Herbivore(weight=20, age=5).fitness
+    ba.Carnivore.set_animal_parameters(
+        {"DeltaPhiMax": (carn_fitness - herb_fitness) / 0.3})
+    killed = []
+    for _ in range(300):
+        land = bl.Jungle()
+        land.cell_population(
+            [{"species": "Herbivore", "age": 5, "weight": 20}
+             for _ in range(20)] +
+            [{"species": "Carnivore", "age": 5, "weight": 20}])
+        herbivores = land.animal_population[0]
+        land.eat_request_carnivore()
+        survivors = land.animal_population[0]
+        assert survivors == [herb for herb in herbivores
+                             if herb in survivors]
+        killed.append(20 - len(survivors))
+    assert np.mean(killed) == pytest.approx(6, rel=0.05)
+    assert np.var(killed) == pytest.approx(4.2, rel=0.2)
+
+
 def test_regenerate():
     """
     Tests that fodder regenerates as expected in the landscape types jungle
@@ -375,120 +430,24 @@ def test_propensity_carnivore():
         assert landscape.propensity()[0] == 0
 
 
-def test_directional_probability():
+def test_migration_destinations():
     """
-    Tests that the probabilities of moving to the adjacent cells are computed
-    correctly.
+    Tests that migrating animals move to the only neighbours they can move
+    to, and that no animal moves when the directional probabilities of its
+    species are all zero.
     """
-    current_cell_pop = [{"species": "Herbivore", "age": 10, "weight": 15},
-           {"species": "Carnivore", "age": 5, "weight": 40},
-           {"species": "Carnivore", "age": 15, "weight": 25}]
+    ba.Herbivore.set_animal_parameters({"mu": 1})
     current_cell = bl.Jungle()
-    current_cell.cell_population(current_cell_pop)
-    jungle_right = bl.Jungle()
-    jungle_left = bl.Jungle()
-    desert = bl.Desert()
-    jungle_right.animal_population[0].append(ba.Herbivore(weight=15))
-    jungle_pop = [{"species": "Herbivore", "age": 10, "weight": 15},
-                  {"species": "Herbivore", "age": 5, "weight": 15}]
-    jungle_left.cell_population(jungle_pop)
-    desert_pop = [{"species": "Herbivore", "age": 10, "weight": 20},
-                  {"species": "Herbivore", "age": 5, "weight": 15},
-                  {"species": "Herbivore", "age": 10, "weight": 35}]
-    desert.cell_population(desert_pop)
-
-    neighbour_cells = [desert, bl.Mountain(), jungle_right, jungle_left]
-
-    herbivore_probabilities = current_cell.directional_probability(
-        current_cell.animal_population[0][0], neighbour_cells)
-    carnivore_probabilities = current_cell.directional_probability(
-        current_cell.animal_population[1][0], neighbour_cells)
-
-    assert herbivore_probabilities != carnivore_probabilities
-    # The numbers below are calculated manually.
-    assert carnivore_probabilities == pytest.approx([0.56, 0.0, 0.18, 0.25],
-                                                    rel=1e-1)
-
-
-def test_choose_migration_cell(mocker):
-    """
-    Tests whether animals are migrating to the correct cell, given the animals
-    probability to move to a specific cell.
-    """
-    current_cell = bl.Desert()
-    current_cell.animal_population[0].append(ba.Herbivore())
-    desert = bl.Desert()
-    jungle = bl.Jungle()
-    savannah = bl.Savannah()
-    neighbour_cells = [desert, bl.Mountain(), jungle, savannah]
-    probability_list = [0.25, 0.0, 0.5, 0.25]
-    mocker.patch("random.random", return_value=0.7)
-    current_cell.choose_migration_cell(current_cell.animal_population[0][0],
-                                       neighbour_cells, probability_list)
-    assert len(current_cell.new_population[0]) == 0
-    assert len(jungle.new_population[0]) == 1
-
-
-def test_migrate():
-    """
-    Tests that migration of animals work as expected.
-    """
-    current_cell_pop = [{"species": "Herbivore", "age": 10, "weight": 15},
-                        {"species": "Herbivore", "age": 20, "weight": 35},
-                        {"species": "Carnivore", "age": 5, "weight": 40},
-                        {"species": "Carnivore", "age": 15, "weight": 25}]
-    current_cell = bl.Savannah()
-    current_cell.cell_population(current_cell_pop)
-    jungle_right = bl.Jungle()
-    jungle_left = bl.Jungle()
-    desert = bl.Desert()
-    jungle_right.animal_population[0].append(ba.Herbivore(weight=15))
-    jungle_pop = [{"species": "Herbivore", "age": 10, "weight": 15},
-                  {"species": "Herbivore", "age": 5, "weight": 15}]
-    jungle_left.cell_population(jungle_pop)
-    desert_pop = [{"species": "Herbivore", "age": 10, "weight": 20},
-                  {"species": "Herbivore", "age": 5, "weight": 15},
-                  {"species": "Herbivore", "age": 10, "weight": 35}]
-    desert.cell_population(desert_pop)
-
-    neighbour_cells = [desert, bl.Mountain(), jungle_right, jungle_left]
-
-    random.seed(124)
-    current_cell.migrate(neighbour_cells)
-
-    neighbour_cells.append(current_cell)
-    for cell in neighbour_cells:
-        if not isinstance(cell, bl.Mountain):
-            assert cell.new_population != cell.animal_population
-
-
-def test_update_cell_population(mocker):
-    """
-    Tests whether the cells animal population is updated after a migration
-    cycle.
-    """
-    current_cell = bl.Desert()
-    current_cell.animal_population[0].append(ba.Herbivore())
-    desert = bl.Desert()
-    jungle = bl.Jungle()
-    savannah = bl.Savannah()
-
-    neighbour_cells = [desert, bl.Mountain(), jungle, savannah]
-    probability_list = [0.25, 0.0, 0.5, 0.25]
-    mocker.patch("random.random", return_value=0.7)
-
-    current_cell_old_population = current_cell.animal_population
-    jungle_cell_old_population = jungle.animal_population
-
-    current_cell.choose_migration_cell(current_cell.animal_population[0][0],
-                                       neighbour_cells, probability_list)
-
-    neighbour_cells.append(current_cell)
-    for cell in neighbour_cells:
-        cell.update_cell_population()
-
-    current_cell_new_population = current_cell.animal_population
-    jungle_cell_new_population = jungle.animal_population
-
-    assert current_cell_new_population != current_cell_old_population
-    assert jungle_cell_new_population != jungle_cell_old_population
+    current_cell.cell_population(
+        [{"species": "Herbivore", "age": 5, "weight": 100}
+         for _ in range(100)] +
+        [{"species": "Carnivore", "age": 5, "weight": 100}
+         for _ in range(10)])
+    herb_destinations, carn_destinations = \
+        current_cell.migration_destinations(
+            [[0, 0.5, 0.5, 0], [0] * 4], np.random.default_rng(5))
+    moved = np.bincount(herb_destinations + 1, minlength=5)
+    assert moved[1] == moved[4] == 0
+    assert moved[2] > 30 and moved[3] > 30
+    assert len(herb_destinations) == 100
+    assert list(carn_destinations) == [-1] * 10
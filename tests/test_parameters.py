@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test set for the parameter sets.
+
+This set of tests checks that parameter sets can not be changed, and that
+every island, and thereby every simulation, has its own parameters, which
+are not shared with the animal and landscape classes or other simulations.
+
+Notes:
+     - The class should pass all tests in this set.
+     - The tests check that the class functions work correctly.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import pickle
+import random
+import threading
+
+import pytest
+import numpy as np
+
+import biosim.animals as ba
+import biosim.island as bi
+import biosim.landscape as bl
+import biosim.parameters as bpa
+import biosim.sweep as bs
+from biosim.simulation import BioSim
+
+ISLAND_MAP = "OOOOO\nOJJSO\nOJDJO\nOOOOO"
+POPULATION = [{"loc": (1, 1), "pop": [
+    {"species": "Herbivore", "age": 5, "weight": 20} for _ in range(40)] + [
+    {"species": "Carnivore", "age": 5, "weight": 20} for _ in range(8)]}]
+
+
+def test_parameter_set_immutable():
+    """
+    Tests that the values of a parameter set can not be changed, and that
+    replace creates a new set.
+    """
+    parameters = ba.Herbivore.parameters
+    with pytest.raises(AttributeError):
+        parameters.beta = 0.5
+    new_parameters = parameters.replace({"beta": 0.5})
+    assert new_parameters.beta == 0.5
+    assert parameters.beta == 0.9
+    assert new_parameters.F == parameters.F
+
+
+def test_parameter_set_names():
+    """
+    Tests that lambda is read as lambda_ or by name, that unknown names are
+    rejected, and that missing parameters are None.
+    """
+    parameters = ba.Herbivore.parameters
+    assert parameters.lambda_ == parameters["lambda"] == 1.0
+    assert parameters.DeltaPhiMax is None
+    assert dict(parameters) == parameters.as_dict()
+    with pytest.raises(ValueError):
+        parameters.replace({"delta": 1})
+    with pytest.raises(ValueError):
+        bpa.LandscapeParameters({"f_max": 1, "beta": 2})
+
+
+def test_parameter_set_pickle():
+    """
+    Tests that parameter sets can be sent to other processes.
+    """
+    parameters = ba.Carnivore.parameters
+    assert pickle.loads(pickle.dumps(parameters)) == parameters
+
+
+def test_class_parameters():
+    """
+    Tests that setting parameters on a class replaces its parameter set.
+    """
+    old_parameters = ba.Carnivore.parameters
+    ba.Carnivore.set_animal_parameters({"F": 20.0})
+    assert ba.Carnivore.parameters.F == 20.0
+    assert ba.Carnivore.default_parameters["F"] == 20.0
+    assert old_parameters.F == 50.0
+
+
+def test_bound_classes():
+    """
+    Tests that parameters set on a bound class do not change those of the
+    species, and that its animals are animals of the species.
+    """
+    herbivore = ba.Herbivore.bind()
+    herbivore.set_animal_parameters({"beta": 0.1})
+    assert ba.Herbivore.parameters.beta == 0.9
+    assert isinstance(herbivore(), ba.Herbivore)
+    assert herbivore.__name__ == "Herbivore"
+
+
+def test_islands_do_not_share_parameters():
+    """
+    Tests that every island starts with the parameters of the classes, and
+    that parameters set on one island change neither the classes nor other
+    islands.
+    """
+    bl.Jungle.set_landscape_parameters({"f_max": 700.0})
+    first = bi.Island(ISLAND_MAP)
+    second = bi.ArrayIsland(ISLAND_MAP)
+    first.set_animal_parameters("Herbivore", {"zeta": 1.0})
+    first.set_landscape_parameters("J", {"f_max": 500.0})
+    assert first.parameters["Herbivore"].zeta == 1.0
+    assert first.f_max[1, 1] == 500.0
+    assert second.parameters["Herbivore"].zeta == 3.5
+    assert second.herbivores.parameters.zeta == 3.5
+    assert second.fodder[1, 1] == 700.0
+    assert ba.Herbivore.parameters.zeta == 3.5
+    assert bl.Jungle.parameters.f_max == 700.0
+
+
+def test_unknown_species_and_landscape():
+    """
+    Tests that parameters of unknown species and landscapes are rejected.
+    """
+    island = bi.Island(ISLAND_MAP)
+    with pytest.raises(ValueError):
+        island.set_animal_parameters("Omnivore", {"F": 1.0})
+    with pytest.raises(ValueError):
+        island.set_landscape_parameters("X", {"f_max": 1.0})
+    with pytest.raises(ValueError):
+        island.set_parameters({"Omnivore": {"F": 1.0}})
+
+
+@pytest.mark.parametrize("engine", ["object", "array"])
+def test_simulation_parameters(engine):
+    """
+    Tests that parameters given to the simulation apply to its animals only,
+    and give the same result as the same parameters set on the classes.
+    """
+    parameters = {"Herbivore": {"zeta": 1.0, "xi": 0.5},
+                  "Carnivore": {"F": 5.0}, "S": {"alpha": 0.5}}
+    sim = BioSim(ISLAND_MAP, POPULATION, seed=4, engine=engine,
+                 parameters=parameters)
+    sim.simulate(10, vis_years=0)
+    assert ba.Herbivore.parameters.zeta == 3.5
+
+    bs.set_parameters(parameters)
+    expected = BioSim(ISLAND_MAP, POPULATION, seed=4, engine=engine)
+    expected.simulate(10, vis_years=0)
+    assert sim.herbivore_list == expected.herbivore_list
+    assert sim.carnivore_list == expected.carnivore_list
+
+
+def test_concurrent_simulations():
+    """
+    Tests that simulations with different parameters, run at the same time
+    in different threads, give the same results as when run one by one.
+    """
+    def run(parameters, results, index):
+        sim = BioSim(ISLAND_MAP, POPULATION, seed=2, engine="array",
+                     parameters=parameters)
+        sim.simulate(20, vis_years=0)
+        results[index] = sim.herbivore_list, sim.carnivore_list
+
+    parameter_sets = [{"Herbivore": {"gamma": gamma}}
+                      for gamma in (0.05, 0.2, 0.8)]
+    serial = [None] * len(parameter_sets)
+    for index, parameters in enumerate(parameter_sets):
+        run(parameters, serial, index)
+
+    concurrent = [None] * len(parameter_sets)
+    threads = [threading.Thread(target=run,
+                                args=(parameters, concurrent, index))
+               for index, parameters in enumerate(parameter_sets)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert concurrent == serial
+    assert serial[0] != serial[2]
+
+
+def test_bound_animal_pickle():
+    """
+    Tests that an animal of a bound class can be pickled, and that its
+    class is unpickled as a bound class with the same parameters.
+    """
+    herbivore = ba.Herbivore.bind()
+    herbivore.set_animal_parameters({"beta": 0.1})
+    animal = herbivore(weight=20, age=3)
+    copy = pickle.loads(pickle.dumps(animal))
+    assert isinstance(copy, ba.Herbivore)
+    assert type(copy) is not ba.Herbivore
+    assert type(copy).parameters == herbivore.parameters
+    assert (copy.weight, copy.age) == (animal.weight, animal.age)
+    assert ba.Herbivore.parameters.beta == 0.9
+
+
+@pytest.mark.parametrize("island_class", [bi.Island, bi.ArrayIsland])
+def test_island_pickle(island_class):
+    """
+    Tests that an island with its own parameters can be pickled, and that
+    the copy keeps the parameters, shares the bound classes between its
+    cells, and continues exactly as the original.
+    """
+    island = island_class(ISLAND_MAP, seed=3)
+    island.set_animal_parameters("Herbivore", {"zeta": 1.0})
+    island.set_landscape_parameters("J", {"f_max": 500.0})
+    island.populate_the_island(POPULATION)
+    island.annual_cycle()
+    copy = pickle.loads(pickle.dumps(island))
+    assert copy.parameters == island.parameters
+    assert copy.landscape_types["J"].animal_types == copy.animal_types
+    assert ba.Herbivore.parameters.zeta == 3.5
+
+    for simulated in (island, copy):
+        random.seed(5)
+        for _ in range(3):
+            simulated.annual_cycle()
+    assert np.array_equal(copy.fodder, island.fodder)
+    copy_state, state = copy.animal_state(), island.animal_state()
+    for name in state:
+        assert np.array_equal(copy_state[name], state[name], equal_nan=True)
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test set for class SpeciesPopulation.
+
+This set of tests checks that the array representation of a population works
+as expected, and agrees with the object representation in
+:mod:`biosim.animals`.
+
+Notes:
+     - The class should pass all tests in this set.
+     - The tests check that the class functions work correctly.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import pytest
+import numpy as np
+
+import biosim.animals as ba
+import biosim.population as bp
+
+
+@pytest.fixture
+def herbivores():
+    """
+    Creates a herbivore population of 4 animals in two cells.
+    """
+    population = bp.SpeciesPopulation(ba.Herbivore)
+    population.add(age=[10, 5, 15, 20], weight=[15, 40, 25, 35],
+                   cell=[1, 1, 2, 2])
+    return population
+
+
+@pytest.fixture
+def rng():
+    """
+    Creates a seeded random number generator.
+    """
+    return np.random.default_rng(12345)
+
+
+def test_add(herbivores):
+    """
+    Tests that animals are added to all arrays.
+    """
+    assert len(herbivores) == 4
+    herbivores.add([1], [10], [3])
+    assert len(herbivores) == 5
+    assert len(herbivores.fitness) == 5
+    assert herbivores.cell[-1] == 3
+
+
+def test_fitness_agrees_with_animal(herbivores):
+    """
+    Tests that the fitness of the arrays is the same as for Herbivore
+    objects.
+    """
+    for age, weight, fitness in zip(herbivores.age, herbivores.weight,
+                                    herbivores.fitness):
+        herb = ba.Herbivore(age=int(age), weight=float(weight))
+        assert fitness == pytest.approx(herb.fitness)
+
+
+def test_sort_by_fitness(herbivores):
+    """
+    Tests that animals are sorted by cell, and by descending fitness within
+    each cell.
+    """
+    herbivores.sort_by_fitness()
+    assert list(herbivores.cell) == [1, 1, 2, 2]
+    assert herbivores.fitness[0] > herbivores.fitness[1]
+    assert herbivores.fitness[2] > herbivores.fitness[3]
+
+
+def test_count_and_mass_per_cell(herbivores):
+    """
+    Tests that the number and weight of the animals are summed per cell.
+    """
+    assert list(herbivores.count_per_cell(4)) == [0, 2, 2, 0]
+    assert list(herbivores.mass_per_cell(4)) == [0, 55, 60, 0]
+
+
+def test_eat_fodder(herbivores):
+    """
+    Tests that the herbivores eat in order of fitness until the fodder is
+    gone.
+    """
+    herbivores.sort_by_fitness()
+    start_weight = herbivores.weight.copy()
+    fodder = np.array([0, 15, 800, 0], dtype=float)
+    herbivores.eat_fodder(fodder)
+    assert list(fodder) == [0, 0, 780, 0]
+    gain = herbivores.weight - start_weight
+    assert gain == pytest.approx([9, 4.5, 9, 9])
+
+
+def test_aging_and_weight_loss(herbivores):
+    """
+    Tests that animals age and lose weight.
+    """
+    herbivores.aging()
+    herbivores.weight_loss()
+    assert list(herbivores.age) == [11, 6, 16, 21]
+    assert herbivores.weight == pytest.approx([14.25, 38, 23.75, 33.25])
+
+
+def test_death(rng):
+    """
+    Tests that the death rate is :math:`\\omega(1-\\Phi)`.
+    """
+    population = bp.SpeciesPopulation(ba.Herbivore)
+    population.add(np.full(10000, 5), np.full(10000, 20), np.zeros(10000))
+    expected = 10000 * (1 - ba.Herbivore.default_parameters["omega"] * (
+            1 - population.fitness[0]))
+    population.death(rng)
+    assert len(population) == pytest.approx(expected, rel=0.05)
+
+
+def test_reproduction(rng):
+    """
+    Tests that heavy animals reproduce, and that mothers lose weight.
+    """
+    population = bp.SpeciesPopulation(ba.Carnivore)
+    population.add(np.full(1000, 5), np.full(1000, 40), np.zeros(1000))
+    population.reproduction(rng, n_cells=1)
+    assert len(population) > 1000
+    newborns = population.age == 0
+    assert np.all(population.weight[:1000][newborns[:1000] == 0] <= 40)
+    assert population.weight[newborns].mean() == pytest.approx(6, rel=0.1)
+
+
+def test_no_reproduction_alone(rng):
+    """
+    Tests that a single animal in a cell can not reproduce.
+    """
+    population = bp.SpeciesPopulation(ba.Herbivore)
+    population.add([5, 5], [50, 50], [1, 2])
+    population.reproduction(rng, n_cells=3)
+    assert len(population) == 2
+
+
+def test_migrate(rng):
+    """
+    Tests that migrating animals move to the only cell with non-zero
+    probability, and that animals with nowhere to go stay.
+    """
+    ba.Herbivore.set_animal_parameters({"mu": 1})
+    population = bp.SpeciesPopulation(ba.Herbivore)
+    population.add(np.full(100, 5), np.full(100, 100), np.repeat([0, 1], 50))
+    probability = np.array([[0, 0, 1, 0], [0, 0, 0, 0]], dtype=float)
+    neighbours = np.array([[1, 1, 1, 1], [0, 0, 0, 0]])
+    population.migrate(rng, probability, neighbours)
+    assert np.count_nonzero(population.cell == 1) > 50
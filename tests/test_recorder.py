@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test set for class Recorder.
+
+This set of tests checks that the recorder stores the statistics of every
+cell in the chosen years and metrics, and grows its buffer as needed.
+
+Notes:
+     - The class should pass all tests in this set.
+     - The tests check that the class functions work correctly.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import pytest
+import numpy as np
+
+import biosim.animals as ba
+import biosim.island as bi
+import biosim.recorder as br
+from biosim.simulation import BioSim
+
+ISLAND_MAP = """\
+OOOOO
+OJSJO
+OJDMO
+OOOOO"""
+
+POPULATION = [
+    {"loc": (1, 1), "pop": [
+        {"species": "Herbivore", "age": 5, "weight": 20},
+        {"species": "Herbivore", "age": 10, "weight": 30},
+        {"species": "Carnivore", "age": 5, "weight": 20}]},
+    {"loc": (2, 2), "pop": [
+        {"species": "Herbivore", "age": 3, "weight": 15}]}]
+
+
+@pytest.mark.parametrize("island_class", [bi.Island, bi.ArrayIsland])
+def test_record_statistics(island_class):
+    """
+    Tests that the counts, biomass, mean fitness and fodder of every cell
+    are recorded, with NaN mean fitness in cells without animals.
+    """
+    island = island_class(ISLAND_MAP)
+    island.populate_the_island(POPULATION)
+    recorder = br.Recorder(island.numpy_map.shape)
+    recorder.record(0, island)
+    assert recorder.data.shape == (1, 4, 5, 7)
+    assert np.array_equal(recorder.metric("herbivores")[0],
+                          island.count_grids[0])
+    assert np.array_equal(recorder.metric("carnivores")[0],
+                          island.count_grids[1])
+    assert recorder.metric("herbivore_mass")[0, 1, 1] == pytest.approx(50)
+    assert recorder.metric("carnivore_mass")[0, 2, 2] == 0
+    fitness = ba.Herbivore.batch_fitness([5, 10], [20, 30]).mean()
+    assert recorder.metric("herbivore_fitness")[0, 1, 1] == pytest.approx(
+        fitness)
+    assert np.isnan(recorder.metric("carnivore_fitness")[0, 2, 2])
+    assert np.array_equal(recorder.metric("fodder")[0], island.fodder)
+
+
+def test_record_interval_and_growth():
+    """
+    Tests that only years that are multiples of the interval are recorded,
+    that the buffer grows beyond its initial capacity, and that the
+    recorded values are copies.
+    """
+    island = bi.ArrayIsland(ISLAND_MAP)
+    recorder = br.Recorder(island.numpy_map.shape, metrics=["fodder"],
+                           interval=3, capacity=1)
+    for year in range(10):
+        island.regenerate()
+        recorder.record(year, island)
+    assert list(recorder.years) == [0, 3, 6, 9]
+    assert recorder.data.shape == (4, 4, 5, 1)
+    assert np.array_equal(recorder.data[-1, ..., 0], island.fodder)
+    island.fodder[...] = -1
+    assert np.all(recorder.data >= 0)
+
+
+def test_record_metric_subset():
+    """
+    Tests that the chosen metrics are recorded in the given order.
+    """
+    island = bi.Island(ISLAND_MAP)
+    island.populate_the_island(POPULATION)
+    recorder = br.Recorder(island.numpy_map.shape,
+                           metrics=["carnivores", "herbivores"])
+    recorder.record(0, island)
+    assert recorder.data.shape == (1, 4, 5, 2)
+    assert recorder.data[0, 1, 1].tolist() == [1, 2]
+
+
+@pytest.mark.parametrize("metrics, interval", [
+    (["herbivores", "rabbits"], 1), (["fodder", "fodder"], 1),
+    (None, 0)])
+def test_recorder_invalid(metrics, interval):
+    """
+    Tests that unknown or repeated metrics and intervals below 1 raise
+    ValueError.
+    """
+    with pytest.raises(ValueError):
+        br.Recorder((4, 5), metrics=metrics, interval=interval)
+
+
+@pytest.mark.parametrize("engine", ["object", "array"])
+def test_simulation_records(engine):
+    """
+    Tests that a simulation records the initial state and every
+    record_years year, also across several calls, in agreement with the
+    population totals.
+    """
+    simulation = BioSim(ISLAND_MAP, POPULATION, seed=1, engine=engine,
+                        record_years=2)
+    simulation.simulate(5, vis_years=0)
+    simulation.simulate(3, vis_years=0)
+    recorder = simulation.recorder
+    assert list(recorder.years) == [0, 2, 4, 6, 8]
+    totals = recorder.metric("herbivores").sum(axis=(1, 2))
+    assert totals.tolist() == [simulation.herbivore_list[year]
+                               for year in recorder.years]
+    assert BioSim(ISLAND_MAP, POPULATION, seed=1).recorder is None
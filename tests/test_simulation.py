@@ -0,0 +1,390 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test set for class BioSim.
+
+This set of tests checks that simulations run with and without graphics, and
+that graphics are updated and saved in the requested years.
+
+Notes:
+     - The class should pass all tests in this set.
+     - The tests check that the class functions work correctly.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+import numpy as np
+
+from biosim.simulation import BioSim
+
+ISLAND_MAP = "OOOO\nOJSO\nOOOO"
+INI_POP = [{"loc": (1, 1), "pop": [
+    {"species": "Herbivore", "age": 5, "weight": 20} for _ in range(10)]}]
+
+
+@pytest.fixture
+def sim():
+    """
+    Creates a simulation with a few herbivores.
+    """
+    return BioSim(ISLAND_MAP, INI_POP, seed=1)
+
+
+def test_headless_does_not_import_pyplot():
+    """
+    Tests that a simulation without graphics never imports matplotlib.pyplot.
+    """
+    code = ("import sys\n"
+            "from biosim.simulation import BioSim\n"
+            "sim = BioSim({!r}, {!r}, seed=1, graphics=False)\n"
+            "sim.simulate(5, vis_years=1)\n"
+            "BioSim({!r}, {!r}, seed=1).simulate(5, vis_years=0)\n"
+            "assert 'matplotlib.pyplot' not in sys.modules\n"
+            ).format(ISLAND_MAP, INI_POP, ISLAND_MAP, INI_POP)
+    subprocess.run([sys.executable, "-c", code], check=True,
+                   env=dict(os.environ,
+                            PYTHONPATH=os.pathsep.join(sys.path)))
+
+
+@pytest.mark.parametrize("graphics, vis_years", [(False, 1), (True, 0)])
+def test_headless_no_figure(mocker, graphics, vis_years):
+    """
+    Tests that no figure is set up or updated without graphics.
+    """
+    simulation = BioSim(ISLAND_MAP, INI_POP, seed=1, graphics=graphics)
+    setup = mocker.patch.object(BioSim, "setup_graphics")
+    update = mocker.patch.object(BioSim, "update_graphics")
+    simulation.simulate(4, vis_years=vis_years)
+    assert setup.call_count == 0
+    assert update.call_count == 0
+    assert simulation.year == 4
+
+
+def test_graphics_cadence(sim, mocker):
+    """
+    Tests that graphics are updated and saved in the years that are
+    multiples of vis_years and img_years, also across several calls.
+    """
+    mocker.patch.object(BioSim, "setup_graphics")
+    mocker.patch.object(BioSim, "plot_island_map")
+    updated, saved = [], []
+    mocker.patch.object(BioSim, "update_graphics",
+                        lambda self: updated.append(self.year))
+    mocker.patch.object(BioSim, "save_graphics",
+                        lambda self: saved.append(self.year))
+    sim.simulate(7, vis_years=2, img_years=4)
+    sim.simulate(5, vis_years=2, img_years=4)
+    assert updated == [2, 4, 6, 8, 10, 12]
+    assert saved == [4, 8, 12]
+
+
+def test_img_years_multiple_of_vis_years(sim):
+    """
+    Tests that img_years must be a multiple of vis_years.
+    """
+    with pytest.raises(ValueError):
+        sim.simulate(2, vis_years=2, img_years=3)
+
+
+def test_plot_island_map_tick_labels():
+    """
+    Tests that the island map can be plotted when the number of columns is a
+    multiple of the tick spacing, with one-based tick labels.
+    """
+    simulation = BioSim("OOOOOOOOOO\nOJJJJSSSSO\nOOOOOOOOOO", [], seed=1)
+    simulation.setup_graphics()
+    simulation.plot_island_map()
+    labels = [label.get_text()
+              for label in simulation._map_ax.get_xticklabels()]
+    assert labels == ["1", "6"]
+
+
+def test_import_is_lazy():
+    """
+    Tests that importing the simulation module does not import matplotlib,
+    pandas or numba.
+    """
+    code = ("import sys\n"
+            "import biosim.simulation\n"
+            "print(sorted(name for name in ('matplotlib', 'pandas', 'numba')"
+            " if name in sys.modules))\n")
+    result = subprocess.run([sys.executable, "-c", code], check=True,
+                            capture_output=True, text=True,
+                            env=dict(os.environ,
+                                     PYTHONPATH=os.pathsep.join(sys.path)))
+    assert result.stdout.strip() == "[]"
+
+
+def test_animal_distribution(sim):
+    """
+    Tests that the animal distribution is a DataFrame with one row per cell.
+    """
+    distribution = sim.animal_distribution
+    assert list(distribution.columns) == ["Row", "Col", "Herbivore",
+                                          "Carnivore"]
+    assert len(distribution) == 12
+    assert distribution["Herbivore"].sum() == 10
+
+
+def test_population_lines_reused(sim):
+    """
+    Tests that the population graph keeps two lines, whose year axis is
+    extended when a later simulation goes further, and whose data are the
+    population totals.
+    """
+    sim.simulate(4, vis_years=1)
+    lines = list(sim._pop_ax.get_lines())
+    sim.simulate(3, vis_years=1)
+    assert sim._pop_ax.get_lines() == lines
+    assert len(sim._herb_line.get_xdata()) == 8
+    assert list(sim._herb_line.get_ydata()) == sim.herbivore_list
+    assert list(sim._carn_line.get_ydata()) == sim.carnivore_list
+    assert sim._pop_ax.get_xlim() == (0, 7)
+
+
+def test_blitting_background(sim):
+    """
+    Tests that the background of the figure is stored for blitting after the
+    first update, when the backend supports it.
+    """
+    sim.simulate(2, vis_years=1)
+    if sim._blit:
+        assert sim._background is not None
+        assert sim._herb_line.get_animated()
+
+
+def test_blitting_draws_new_years():
+    """
+    Tests that each frame drawn by blitting extends the population lines by
+    the years since the previous frame only, and that a full redraw draws
+    the whole lines again.
+    """
+    sim = BioSim(ISLAND_MAP, INI_POP, seed=1, ymax_animals=200)
+    sim.simulate(6, vis_years=2)
+    if sim._blit:
+        assert list(sim._herb_tail.get_xdata()) == [4, 5, 6]
+        assert list(sim._carn_tail.get_ydata()) == sim.carnivore_list[4:]
+        assert sim._drawn_index == 6
+        sim._fig.canvas.draw()
+        assert sim._drawn_index == 6
+
+
+def test_heatmaps_from_count_grids(sim, mocker):
+    """
+    Tests that the heatmaps show the count grids and the fodder of the
+    island, and that the animal distribution is not built for them.
+    """
+    distribution = mocker.patch.object(
+        BioSim, "animal_distribution", new_callable=mocker.PropertyMock)
+    sim.simulate(2, vis_years=1)
+    assert distribution.call_count == 0
+    herbivores, carnivores = sim.island.count_grids
+    assert np.array_equal(sim._herb_heat_axis.get_array(), herbivores)
+    assert np.array_equal(sim._carn_heat_axis.get_array(), carnivores)
+    assert np.array_equal(sim._fodder_axis.get_array(), sim.island.fodder)
+
+
+@pytest.fixture
+def ffmpeg(mocker):
+    """
+    Replaces the ffmpeg process by a mock that accepts all frames.
+    """
+    popen = mocker.patch("subprocess.Popen")
+    popen.return_value.wait.return_value = 0
+    return popen
+
+
+def test_movie_frames_piped(tmp_path, ffmpeg):
+    """
+    Tests that the saved visualizations are sent to ffmpeg as raw RGB frames
+    of the size of the figure, without writing image files, and that
+    make_movie closes the pipe.
+    """
+    img_base = str(tmp_path / "sim")
+    simulation = BioSim(ISLAND_MAP, INI_POP, seed=1, img_base=img_base,
+                        movie_fmt="mp4")
+    simulation.simulate(4, vis_years=1, img_years=2)
+    simulation.simulate(2, vis_years=1, img_years=2)
+    assert ffmpeg.call_count == 1
+    assert ffmpeg.call_args.args[0][-1] == img_base + ".mp4"
+
+    frames = [call.args[0]
+              for call in ffmpeg.return_value.stdin.write.call_args_list]
+    height, width = simulation._frame_size
+    assert len(frames) == 3
+    assert all(len(frame) == height * width * 3 for frame in frames)
+    canvas = np.asarray(simulation._fig.canvas.buffer_rgba())
+    assert frames[-1] == canvas[:, :, :3].tobytes()
+    assert list(tmp_path.iterdir()) == []
+
+    simulation.make_movie()
+    ffmpeg.return_value.stdin.close.assert_called_once_with()
+    assert simulation._movie_writer is None
+
+
+def test_movie_ffmpeg_failure(tmp_path, ffmpeg):
+    """
+    Tests that make_movie raises RuntimeError if ffmpeg fails.
+    """
+    ffmpeg.return_value.wait.return_value = 1
+    simulation = BioSim(ISLAND_MAP, INI_POP, seed=1,
+                        img_base=str(tmp_path / "sim"), movie_fmt="mp4")
+    simulation.simulate(2, vis_years=1)
+    with pytest.raises(RuntimeError):
+        simulation.make_movie()
+
+
+def test_png_frames_kept(tmp_path, mocker):
+    """
+    Tests that image files are still written without movie_fmt.
+    """
+    popen = mocker.patch("subprocess.Popen")
+    simulation = BioSim(ISLAND_MAP, INI_POP, seed=1,
+                        img_base=str(tmp_path / "sim"))
+    simulation.simulate(2, vis_years=1)
+    assert popen.call_count == 0
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "sim_00000.png", "sim_00001.png"]
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None,
+                    reason="ffmpeg is not installed")
+def test_movie_written(tmp_path):
+    """
+    Tests that ffmpeg writes the movie from the piped frames.
+    """
+    simulation = BioSim(ISLAND_MAP, INI_POP, seed=1,
+                        img_base=str(tmp_path / "sim"), movie_fmt="mp4")
+    simulation.simulate(5, vis_years=1)
+    simulation.make_movie()
+    assert [path.name for path in tmp_path.iterdir()] == ["sim.mp4"]
+
+
+def test_background_frames_as_inline(tmp_path):
+    """
+    Tests that the rendering process saves the same frames as the
+    simulation itself, also across several calls.
+    """
+    import matplotlib.image as mpimg
+
+    for mode in ("inline", "background"):
+        (tmp_path / mode).mkdir()
+        simulation = BioSim(ISLAND_MAP, INI_POP, seed=1,
+                            img_base=str(tmp_path / mode / "sim"),
+                            background_graphics=mode == "background")
+        simulation.simulate(4, vis_years=1, img_years=2)
+        simulation.simulate(2, vis_years=1, img_years=2)
+        assert len(list((tmp_path / mode).iterdir())) == 3
+        simulation.make_movie("none")
+
+    for number in range(3):
+        name = "sim_{:05d}.png".format(number)
+        assert np.array_equal(mpimg.imread(tmp_path / "inline" / name),
+                              mpimg.imread(tmp_path / "background" / name))
+
+
+def test_background_stopped_by_close():
+    """
+    Tests that leaving the simulation as a context manager stops the
+    rendering process when no images are saved, and that make_movie stops
+    it before it finds that there is no file name.
+    """
+    with BioSim(ISLAND_MAP, INI_POP, seed=1,
+                background_graphics=True) as simulation:
+        simulation.simulate(2, vis_years=1)
+        process = simulation._renderer._process
+    assert simulation._renderer is None
+    assert process.exitcode == 0
+
+    simulation.simulate(1, vis_years=1)
+    process = simulation._renderer._process
+    with pytest.raises(RuntimeError):
+        simulation.make_movie()
+    assert simulation._renderer is None
+    assert process.exitcode == 0
+
+
+def test_snapshot_is_copy():
+    """
+    Tests that a snapshot holds copies of the island state, and the totals
+    since the previous snapshot.
+    """
+    simulation = BioSim(ISLAND_MAP, INI_POP, seed=1, engine="array")
+    simulation.simulate(3, vis_years=0)
+    first = simulation.snapshot()
+    simulation.simulate(2, vis_years=0)
+    second = simulation.snapshot(save=True)
+
+    assert first.herbivores == simulation.herbivore_list[:4]
+    assert second.herbivores == simulation.herbivore_list[4:]
+    assert second.year == 5 and second.save
+    assert not np.shares_memory(second.fodder_grid, simulation.island.fodder)
+    assert np.array_equal(second.fodder_grid, simulation.island.fodder)
+    assert np.array_equal(second.herbivore_grid,
+                          simulation.island.count_grids[0])
+
+
+def test_background_worker_failure(sim):
+    """
+    Tests that the simulation raises RuntimeError instead of waiting when
+    the rendering process has stopped.
+    """
+    from biosim.rendering import RenderingWorker
+
+    worker = RenderingWorker({"island_map": ISLAND_MAP}, queue_size=1)
+    worker._process.terminate()
+    worker._process.join()
+    with pytest.raises(RuntimeError):
+        for _ in range(3):
+            worker.put(sim.snapshot())
+        worker.wait()
+
+
+@pytest.mark.parametrize("extension", [".npy", ".npz"])
+def test_population_from_file(tmp_path, extension):
+    """
+    Tests that the initial population can be read from a .npy file of a
+    structured array, or an .npz file of columns.
+    """
+    population = np.zeros(10, dtype=[("loc_row", int), ("loc_col", int),
+                                     ("species", "U9"), ("age", int),
+                                     ("weight", float)])
+    population["loc_row"], population["loc_col"] = 1, 2
+    population["species"] = ["Herbivore"] * 7 + ["Carnivore"] * 3
+    population["age"], population["weight"] = 5, 20.0
+    path = tmp_path / ("population" + extension)
+    if extension == ".npy":
+        np.save(path, population)
+    else:
+        np.savez(path, **{name: population[name]
+                          for name in population.dtype.names})
+
+    simulation = BioSim(ISLAND_MAP, str(path), seed=1, engine="array")
+    assert simulation.num_animals_per_species == {"Herbivore": 7,
+                                                  "Carnivore": 3}
+    simulation.add_population(path)
+    assert simulation.island.total_island_population == 20
+
+
+def test_population_as_tuple_or_dataframe():
+    """
+    Tests that a tuple of dictionaries is placed as the list of them, and
+    that a pandas.DataFrame is placed as columns.
+    """
+    pandas = pytest.importorskip("pandas")
+    simulation = BioSim(ISLAND_MAP, tuple(INI_POP), seed=1)
+    assert simulation.num_animals == 10
+    simulation.add_population(pandas.DataFrame({
+        "loc_row": [1, 1], "loc_col": [1, 2],
+        "species": ["Herbivore", "Carnivore"], "age": [5, 5],
+        "weight": [20.0, 20.0]}))
+    assert simulation.num_animals_per_species == {"Herbivore": 11,
+                                                  "Carnivore": 1}
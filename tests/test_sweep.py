@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test set for the parameter sweep.
+
+This set of tests checks that every combination of parameter values and
+seeds is run in the worker pool with the same result as a simulation run
+on its own, and that timeouts and errors stop single runs only.
+
+Notes:
+     - The class should pass all tests in this set.
+     - The tests check that the class functions work correctly.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import multiprocessing
+import time
+
+import pytest
+import numpy as np
+
+import biosim.sweep as bs
+from biosim.simulation import BioSim
+
+ISLAND_MAP = "OOOOO\nOJJSO\nOJDJO\nOOOOO"
+INI_POP = [{"loc": (1, 1), "pop": [
+    {"species": "Herbivore", "age": 5, "weight": 20} for _ in range(20)] + [
+    {"species": "Carnivore", "age": 5, "weight": 20} for _ in range(4)]}]
+GRID = {"Herbivore": {"zeta": [3.5, 1.0]}, "Carnivore": {"F": [50.0, 5.0]}}
+
+
+def test_parameter_grid():
+    """
+    Tests that the grid lists every combination of parameter values.
+    """
+    combinations = bs.parameter_grid(GRID)
+    assert len(combinations) == 4
+    assert combinations[1] == {"Herbivore": {"zeta": 3.5},
+                               "Carnivore": {"F": 5.0}}
+
+
+def test_sweep_as_single_runs():
+    """
+    Tests that every run of a sweep, in one reused worker, gives the same
+    population time series as the same simulation run on its own, so that
+    the parameters of one run do not leak into the next.
+    """
+    sweep = bs.Sweep(ISLAND_MAP, INI_POP, GRID, seeds=[1, 2], num_years=8,
+                     processes=1, engine="array")
+    results = sweep.run()
+    assert [result.index for result in results] == list(range(8))
+    base = bs.current_parameters()
+    for result, (parameters, seed) in zip(results, sweep.runs):
+        assert result.status == "done"
+        bs.set_parameters(base)
+        bs.set_parameters(parameters)
+        sim = BioSim(ISLAND_MAP, INI_POP, seed, engine="array")
+        sim.simulate(8, vis_years=0)
+        assert result.herbivores.tolist() == sim.herbivore_list
+        assert result.carnivores.tolist() == sim.carnivore_list
+
+
+def test_sweep_stream_bounded():
+    """
+    Tests that all runs are streamed back with two workers and at most one
+    pending run, and collected into an array.
+    """
+    sweep = bs.Sweep(ISLAND_MAP, INI_POP, GRID, seeds=[1, 2, 3],
+                     num_years=4, processes=2, max_pending=1)
+    results = list(sweep.stream())
+    assert sorted(result.index for result in results) == list(range(12))
+    array = sweep.to_array(results)
+    assert array.shape == (4, 3, 2, 5)
+    assert not np.isnan(array).any()
+    assert array[2, 1, 0].tolist() == results[
+        [result.index for result in results].index(7)].herbivores.tolist()
+
+
+def test_sweep_stream_stopped_early():
+    """
+    Tests that a stream closed after the first result cancels the runs not
+    yet started, and shuts the pool down.
+    """
+    sweep = bs.Sweep(ISLAND_MAP, INI_POP, GRID, seeds=[1, 2, 3],
+                     num_years=4, processes=1, max_pending=3)
+    stream = sweep.stream()
+    first = next(stream)
+    stream.close()
+    assert first.status == "done"
+
+
+def test_sweep_max_runs_per_worker():
+    """
+    Tests that all runs are done when workers are replaced after every run.
+    """
+    sweep = bs.Sweep(ISLAND_MAP, INI_POP, GRID, seeds=[1], num_years=2,
+                     processes=1, max_runs_per_worker=1)
+    assert all(result.status == "done" for result in sweep.run())
+
+
+def test_sweep_timeout_and_error():
+    """
+    Tests that a run that times out keeps the years simulated, that a run
+    with an unknown parameter set reports the error, and that missing years
+    are NaN.
+    """
+    sweep = bs.Sweep(ISLAND_MAP, INI_POP, {"Herbivore": {"zeta": [3.5]}},
+                     seeds=[1], num_years=5, processes=1, timeout=0)
+    result, = sweep.run()
+    assert result.status == "timeout"
+    assert len(result.herbivores) == 1
+    assert np.isnan(sweep.to_array([result])[0, 0, 0, 1:]).all()
+
+    sweep = bs.Sweep(ISLAND_MAP, INI_POP, {"Rabbit": {"F": [1.0]}},
+                     seeds=[1], num_years=5, processes=1)
+    result, = sweep.run()
+    assert result.status.startswith("ValueError")
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork",
+                    reason="workers must inherit the patched simulate")
+def test_sweep_timeout_stuck_year(mocker, tmp_path):
+    """
+    Tests that a run stuck inside a year is stopped by terminating its
+    worker, that the next run is done by a new worker, and that the stopped
+    run keeps a row with its status in the DataFrame.
+    """
+    mocker.patch("biosim.sweep.TIMEOUT_GRACE", 0)
+    simulate = BioSim.simulate
+    stuck_before = tmp_path / "stuck"
+
+    def stuck(sim, *args, **kwargs):
+        if not stuck_before.exists():
+            stuck_before.touch()
+            time.sleep(60)
+        simulate(sim, *args, **kwargs)
+
+    mocker.patch.object(BioSim, "simulate", stuck)
+    sweep = bs.Sweep(ISLAND_MAP, INI_POP, {"Herbivore": {"zeta": [3.5]}},
+                     seeds=[1, 2], num_years=2, processes=1, timeout=0.5)
+    start = time.perf_counter()
+    stuck_run, other_run = sweep.run()
+    assert time.perf_counter() - start < 30
+    assert stuck_run.status == "timeout"
+    assert len(stuck_run.herbivores) == 0
+    assert other_run.status == "done"
+    assert len(other_run.herbivores) == 3
+
+    frame = sweep.to_dataframe([stuck_run, other_run])
+    assert len(frame) == 1 + 3
+    stuck_row = frame[frame["run"] == stuck_run.index]
+    assert stuck_row["status"].tolist() == ["timeout"]
+    assert stuck_row["year"].isna().all()
+    assert stuck_row["herbivores"].isna().all()
+
+
+def test_sweep_dataframe():
+    """
+    Tests that the DataFrame has one row per run and year, with a column for
+    each swept parameter.
+    """
+    sweep = bs.Sweep(ISLAND_MAP, INI_POP, GRID, seeds=[1], num_years=3,
+                     processes=2)
+    frame = sweep.to_dataframe(sweep.run())
+    assert len(frame) == 4 * 4
+    assert {"run", "seed", "Herbivore.zeta", "Carnivore.F", "year",
+            "herbivores", "carnivores", "status"} <= set(frame.columns)
+    assert set(frame["Herbivore.zeta"]) == {3.5, 1.0}
+
+
+def test_sweep_dataframe_empty():
+    """
+    Tests that no results give an empty DataFrame with the same columns.
+    """
+    sweep = bs.Sweep(ISLAND_MAP, INI_POP, GRID, seeds=[1], num_years=3)
+    frame = sweep.to_dataframe([])
+    assert len(frame) == 0
+    assert list(frame.columns) == [
+        "run", "seed", "Herbivore.zeta", "Carnivore.F", "year",
+        "herbivores", "carnivores", "status"]
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+
+"""
+Test set for class TiledIsland.
+
+This set of tests checks that the island split into tiles keeps all animals
+when they cross tile borders, is reproducible, and agrees with the island
+that is not split.
+
+Notes:
+     - The class should pass all tests in this set.
+     - The tests check that the class functions work correctly.
+"""
+
+__author__ = "Erik Rullestad", "Håvard Molversmyr"
+__email__ = "erikrull@nmbu.no", "havardmo@nmbu.no"
+
+
+import pytest
+import numpy as np
+
+import biosim.animals as ba
+import biosim.tiled as bt
+from biosim.simulation import BioSim
+
+ISLAND_MAP = """\
+OOOOOOO
+OJJJJJO
+OJSSSJO
+OJSDSJO
+OJJJJJO
+OOOOOOO"""
+
+
+@pytest.fixture
+def population():
+    """
+    Creates an initial population in every cell of the middle row.
+    """
+    return [{"loc": (3, col), "pop": [
+        {"species": "Herbivore", "age": 5, "weight": 30}
+        for _ in range(20)] + [
+        {"species": "Carnivore", "age": 5, "weight": 30}
+        for _ in range(5)]} for col in range(1, 6)]
+
+
+def run(population, workers, seed=4, years=5):
+    """
+    Simulates the population on a tiled island.
+
+    :return: numpy.ndarray, the population in each cell.
+    """
+    island = bt.TiledIsland(ISLAND_MAP, workers=workers, seed=seed)
+    island.populate_the_island(population)
+    for _ in range(years):
+        island.annual_cycle()
+    island.close()
+    return island.population_in_each_cell
+
+
+def test_tiles_cover_map():
+    """
+    Tests that the tiles are rows of the map covering all cells, and that
+    there are never more tiles than rows.
+    """
+    island = bt.TiledIsland(ISLAND_MAP, workers=4)
+    assert island.tile_rows == [(0, 2), (2, 4), (4, 5), (5, 6)]
+    assert list(island.tile_bounds) == [0, 14, 28, 35, 42]
+    assert bt.TiledIsland(ISLAND_MAP, workers=10).n_tiles == 6
+    with pytest.raises(ValueError):
+        bt.TiledIsland(ISLAND_MAP, workers=0)
+
+
+def test_migrants_cross_tile_borders(population):
+    """
+    Tests that no animal is lost or duplicated when animals migrate between
+    tiles, and that animals reach all tiles. The carnivores are too weak to
+    kill any herbivores.
+    """
+    for cell in population:
+        for animal in cell["pop"][20:]:
+            animal["weight"] = 2
+    for species in (ba.Herbivore, ba.Carnivore):
+        species.set_animal_parameters({"mu": 1, "omega": 0, "gamma": 0})
+    result = run(population, workers=3, years=4)
+    assert result[:, 2].sum() == 100
+    assert result[:, 3].sum() == 25
+    island = bt.TiledIsland(ISLAND_MAP, workers=3)
+    occupied = np.flatnonzero(result[:, 2] + result[:, 3])
+    assert len(set(island.tile_of(occupied))) == 3
+
+
+def test_reproducible(population):
+    """
+    Tests that the result only depends on the seed and number of workers,
+    also when the tiles are processed in a pool.
+    """
+    assert np.array_equal(run(population, workers=2),
+                          run(population, workers=2))
+    assert not np.array_equal(run(population, workers=2),
+                              run(population, workers=2, seed=5))
+
+
+def test_same_as_single_tile(population):
+    """
+    Tests that the total population after some years is close to the one
+    on an island that is not split.
+    """
+    split = np.mean([run(population, 3, seed)[:, 2:].sum(axis=0)
+                     for seed in range(4)], axis=0)
+    whole = np.mean([run(population, 1, seed)[:, 2:].sum(axis=0)
+                     for seed in range(4)], axis=0)
+    assert split == pytest.approx(whole, rel=0.15)
+
+
+def test_border_rows_give_island_probabilities(population):
+    """
+    Tests that the migration probabilities computed by each tile from its
+    own cells and the border rows of its neighbours are those computed for
+    the whole island.
+    """
+    island = bt.TiledIsland(ISLAND_MAP, workers=3)
+    island.populate_the_island(population)
+    island.fodder[...] = np.arange(island.n_cells).reshape(
+        island.numpy_map.shape)
+    expected = island.migration_probability()
+
+    tiles = []
+    parameters = tuple(species.parameters for species in island.animal_types)
+    for start, end, herb_arrays, carn_arrays in zip(
+            island.tile_bounds[:-1], island.tile_bounds[1:],
+            island.split_by_tile(island.herbivores),
+            island.split_by_tile(island.carnivores)):
+        tile = bt.Tile(start, end - start, island.numpy_map.shape[1],
+                       island.neighbours[start:end],
+                       island.habitable[start:end])
+        tile.load((parameters, island.f_max.reshape(-1)[start:end],
+                   island.alpha.reshape(-1)[start:end]),
+                  (herb_arrays, carn_arrays),
+                  island.fodder.reshape(-1)[start:end].copy())
+        tile.exponents = tile.propensity_exponents()
+        tiles.append(tile)
+
+    outside = (np.full(7, -np.inf),) * 2
+    probabilities = [
+        tile.migration_probability(
+            outside if index == 0 else tuple(
+                exponent[-7:] for exponent in tiles[index - 1].exponents),
+            outside if index == len(tiles) - 1 else tuple(
+                exponent[:7] for exponent in tiles[index + 1].exponents))
+        for index, tile in enumerate(tiles)]
+    for species in range(2):
+        assert np.allclose(np.concatenate(
+            [tile_probabilities[species] for tile_probabilities in
+             probabilities]), expected[species])
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_tiles_keep_animals(population, workers):
+    """
+    Tests that the tiles keep the animals between years, that counts are
+    found without taking the animals from the tiles, and that animals read,
+    placed or given new parameters in the main process reach the tiles.
+    """
+    island = bt.TiledIsland(ISLAND_MAP, workers=workers, seed=2)
+    island.populate_the_island(population)
+    island.annual_cycle()
+    sizes = island.annual_cycle()
+    assert island._animals_in_tiles
+    assert tuple(counts.sum() for counts in island.species_counts()) == sizes
+    assert len(island.animal_arrays()[0][0]) == sizes[0]
+    assert island._animals_in_tiles
+
+    assert len(island.herbivores) == sizes[0]
+    assert not island._animals_in_tiles
+    island.populate_the_island([{"loc": (1, 1), "pop": [
+        {"species": "Herbivore", "age": 5, "weight": 30}
+        for _ in range(10)]}])
+    assert island.total_species_population == (sizes[0] + 10, sizes[1])
+
+    island.annual_cycle()
+    assert island._animals_in_tiles
+    for species in ("Herbivore", "Carnivore"):
+        island.set_animal_parameters(species, {"a_half": -1e6, "omega": 1})
+    assert island.annual_cycle() == (0, 0)
+    island.close()
+    assert island._tiles is None
+    assert island.total_species_population == (0, 0)
+
+
+def test_fodder_round_trip():
+    """
+    Tests that fodder changed in the main process is used by the tiles the
+    next year.
+    """
+    island = bt.TiledIsland(ISLAND_MAP, workers=2)
+    island.annual_cycle()
+    savannah = island.landscape_types["S"].parameters
+    assert island.fodder[2, 2] == savannah.f_max
+    island.fodder[...] = 0
+    island.annual_cycle()
+    assert island.fodder[2, 2] == pytest.approx(
+        savannah.alpha * savannah.f_max)
+    island.close()
+
+
+def test_simulation_engine_and_close(population):
+    """
+    Tests that a simulation with workers reports the 'tiled' engine, and
+    stops the worker processes when used as a context manager.
+    """
+    with BioSim(ISLAND_MAP, population, seed=1, workers=2) as sim:
+        sim.simulate(2, vis_years=0)
+        assert sim.engine == "tiled"
+        assert sim.island._tiles is not None
+    assert sim.island._tiles is None
+    assert sim.num_animals == sum(sim.island.total_species_population)
+    with pytest.raises(ValueError):
+        BioSim(ISLAND_MAP, population, seed=1, engine="tiled")